@@ -4,13 +4,28 @@ Provides endpoints for Radarr and Sonarr webhooks and status information.
 """
 import os
 import json
+from datetime import datetime
 from functools import wraps
 from flask import Flask, request, jsonify, Response, g, render_template
 from werkzeug.exceptions import BadRequest, Unauthorized, InternalServerError
 
-from app.core.config import Config, setup_logging
+from app.core.config import Config, logger
+from app.core.logging import setup_logging
 from app.handlers import WebhookHandler
 from app.core.monitor import active_downloads
+from app.core.scheduler import MonitorScheduler
+from app.core.watcher import FileWatcher
+from app.core.linker import LinkExecutor
+from app.core.copier import FileCopier
+from app.core.devices import DeviceMap
+from app.core.deleter import DeletionQueue
+from app.core.webhook_queue import WebhookQueue, QueueFullError
+from app.core.history import HistoryWriter, WebhookHistory
+from app.core.storage import WebhookStorage, LastWebhookCache
+
+
+# Maximum number of entries returned by one /history page
+MAX_HISTORY_PAGE_SIZE = 500
 
 
 # Set up logging
@@ -19,6 +34,9 @@ setup_logging()
 # Create Flask application
 app = Flask(__name__)
 
+# Start the worker pool that processes accepted webhooks
+WebhookQueue.start(WebhookHandler.process_webhook)
+
 
 def auth_required(f):
     """Decorator to require authentication for endpoints"""
@@ -52,48 +70,59 @@ def healthcheck():
     return jsonify({'status': 'ok'})
 
 
-@app.route('/webhook', methods=['POST'])
-@auth_required
-def webhook():
+def _accept_webhook(service_type: str = None):
     """
-    Main webhook endpoint that handles both Radarr and Sonarr webhooks
+    Validate a webhook request and enqueue it for background processing
+
+    Args:
+        service_type: Optional service type override ('radarr' or 'sonarr')
+
+    Returns:
+        Flask response tuple
     """
     try:
         # Get JSON data from request
         data = request.json
         if not data:
             return jsonify({'error': 'No JSON data provided'}), 400
-            
-        # Process webhook
-        response_data, status_code = WebhookHandler.process_webhook(data)
-        return jsonify(response_data), status_code
-        
+
+        service_type, error = WebhookHandler.validate_webhook(data, service_type)
+        if error:
+            logger.warning(error)
+            return jsonify({'error': error}), 400
+
+        # Queue webhook for processing by the worker pool
+        event_id = WebhookQueue.enqueue(data, service_type=service_type)
+        return jsonify({
+            'message': 'Webhook accepted for processing',
+            'event_id': event_id,
+            'service_type': service_type
+        }), 202
+
     except BadRequest:
         return jsonify({'error': 'Invalid JSON data'}), 400
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
     except Exception as e:
         return jsonify({'error': f'Internal error: {str(e)}'}), 500
 
 
+@app.route('/webhook', methods=['POST'])
+@auth_required
+def webhook():
+    """
+    Main webhook endpoint that handles both Radarr and Sonarr webhooks
+    """
+    return _accept_webhook()
+
+
 @app.route('/webhook/radarr', methods=['POST'])
 @auth_required
 def radarr_webhook():
     """
     Radarr-specific webhook endpoint
     """
-    try:
-        # Get JSON data from request
-        data = request.json
-        if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
-            
-        # Process webhook as Radarr
-        response_data, status_code = WebhookHandler.process_webhook(data, service_type='radarr')
-        return jsonify(response_data), status_code
-        
-    except BadRequest:
-        return jsonify({'error': 'Invalid JSON data'}), 400
-    except Exception as e:
-        return jsonify({'error': f'Internal error: {str(e)}'}), 500
+    return _accept_webhook(service_type='radarr')
 
 
 @app.route('/webhook/sonarr', methods=['POST'])
@@ -102,22 +131,155 @@ def sonarr_webhook():
     """
     Sonarr-specific webhook endpoint
     """
+    return _accept_webhook(service_type='sonarr')
+
+
+@app.route('/hooks/qbittorrent/completed', methods=['POST'])
+@auth_required
+def qbittorrent_completed():
+    """
+    Completion hook for qBittorrent's "Run external program on torrent finished".
+    Accepts JSON or form data with the torrent hash and optional content path.
+    The final linking pass is queued on the monitor workers, 202 is returned
+    right away.
+    """
+    data = request.get_json(silent=True) or request.form
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Payload must be a JSON object or form data'}), 400
+    torrent_hash = (data.get('hash') or '').strip()
+    if not torrent_hash:
+        return jsonify({'error': 'Missing torrent hash'}), 400
+
     try:
-        # Get JSON data from request
-        data = request.json
-        if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
-            
-        # Process webhook as Sonarr
-        response_data, status_code = WebhookHandler.process_webhook(data, service_type='sonarr')
-        return jsonify(response_data), status_code
-        
-    except BadRequest:
-        return jsonify({'error': 'Invalid JSON data'}), 400
+        from app.core.monitor import DownloadMonitor
+        result = DownloadMonitor.handle_torrent_completed(torrent_hash, data.get('content_path') or None)
+        return jsonify(result), 202 if result.get('queued') else 200
     except Exception as e:
+        logger.exception(f"Error handling completion of torrent {torrent_hash}: {e}")
         return jsonify({'error': f'Internal error: {str(e)}'}), 500
 
 
+@app.route('/queue', methods=['GET'])
+@auth_required
+def queue_status():
+    """
+    Get webhook queue depth, processing lag and counters
+    """
+    return jsonify(WebhookQueue.get_stats())
+
+
+@app.route('/queue/<event_id>', methods=['GET'])
+@auth_required
+def queue_event(event_id):
+    """
+    Get the processing outcome of a queued webhook
+    """
+    result = WebhookQueue.get_result(event_id)
+    if not result:
+        return jsonify({'error': f'Unknown event ID: {event_id}'}), 404
+
+    result['event_id'] = event_id
+    return jsonify(result)
+
+
+def _parse_time_arg(name: str):
+    """
+    Parse a time query argument given as ISO 8601 or epoch seconds
+
+    Raises:
+        ValueError: If the value cannot be parsed
+    """
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid '{name}' value: {value}")
+
+
+@app.route('/history', methods=['GET'])
+@auth_required
+def history():
+    """
+    Query the webhook history, newest first, with cursor pagination.
+    Supports eventType, downloadId, instanceName, service, since and until filters.
+    """
+    try:
+        limit = int(request.args.get('limit', 50))
+        cursor = request.args.get('cursor') or None
+        since = _parse_time_arg('since')
+        until = _parse_time_arg('until')
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {str(e)}'}), 400
+
+    limit = max(1, min(limit, MAX_HISTORY_PAGE_SIZE))
+    try:
+        entries, next_cursor = WebhookStorage.query_history(
+            limit=limit,
+            cursor=cursor,
+            since=since,
+            until=until,
+            service_type=request.args.get('service'),
+            event_type=request.args.get('eventType'),
+            download_id=request.args.get('downloadId'),
+            instance_name=request.args.get('instanceName')
+        )
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Error reading webhook history: {str(e)}'}), 500
+
+    return jsonify({
+        'count': len(entries),
+        'entries': entries,
+        'next_cursor': next_cursor
+    })
+
+
+@app.route('/history/stats', methods=['GET'])
+@auth_required
+def history_stats():
+    """
+    Get history writer counters and segment storage information
+    """
+    stats = HistoryWriter.get_stats()
+    stats['storage'] = WebhookHistory.get_stats()
+    return jsonify(stats)
+
+
+@app.route('/deletions', methods=['GET'])
+@auth_required
+def deletions():
+    """
+    Get the deletion queue counters and the most recent deletion jobs (?limit=N)
+    """
+    try:
+        limit = min(int(request.args.get('limit', 50)), 200)
+    except ValueError:
+        return jsonify({'error': "Invalid 'limit' value"}), 400
+
+    stats = DeletionQueue.get_stats()
+    stats['jobs'] = DeletionQueue.get_jobs(limit)
+    return jsonify(stats)
+
+
+@app.route('/deletions/<job_id>', methods=['GET'])
+@auth_required
+def deletion_job(job_id):
+    """
+    Get the progress and outcome of a deletion job
+    """
+    job = DeletionQueue.get_job(job_id)
+    if not job:
+        return jsonify({'error': f'Unknown deletion job: {job_id}'}), 404
+    return jsonify(job)
+
+
 @app.route('/status', methods=['GET'])
 @auth_required
 def status():
@@ -127,13 +289,36 @@ def status():
     from app.core.monitor import DownloadMonitor
     status_data = DownloadMonitor.get_active_downloads_status()
     
+    sync_stats = None
+    if Config.QBITTORRENT_ENABLED and Config.QBITTORRENT_USE_API and Config.QBITTORRENT_SYNC_ENABLED:
+        from app.services.qbittorrent import QBittorrentClient
+        qbt = QBittorrentClient()
+        sync_stats = qbt.sync.get_stats() if qbt.sync else None
+    
     return jsonify({
         'active_downloads_count': len(active_downloads),
         'download_monitoring_enabled': Config.DOWNLOAD_MONITOR_ENABLED,
+        'scheduler': MonitorScheduler.get_stats(),
+        'qbittorrent_sync': sync_stats,
+        'file_watcher': FileWatcher.get_stats(),
+        'linker': LinkExecutor.get_stats(),
+        'copier': FileCopier.get_stats(),
         'downloads': status_data
     })
 
 
+@app.route('/status/devices', methods=['GET'])
+@auth_required
+def devices_status():
+    """
+    Get the link strategy chosen for each source/destination device pair.
+    ?refresh=true forgets the cached devices so they are looked up again.
+    """
+    if request.args.get('refresh', '').lower() == 'true':
+        DeviceMap.reset()
+    return jsonify(DeviceMap.get_matrix())
+
+
 @app.route('/status/<torrent_hash>', methods=['GET'])
 @auth_required
 def check_torrent(torrent_hash):
@@ -150,18 +335,22 @@ def check_torrent(torrent_hash):
 @auth_required
 def last_webhook():
     """
-    Get the last webhook that was received
+    Get the last webhook that was received, optionally for one service
+    (?service=radarr|sonarr) or instance (?instance=<instanceName>).
+    Served from memory with an ETag so unchanged polls get a 304.
     """
-    try:
-        webhook_file = os.path.join(os.path.dirname(Config.WEBHOOK_LOG_FILE), 'last_webhook_data.json')
-        if os.path.exists(webhook_file):
-            with open(webhook_file, 'r') as f:
-                data = json.load(f)
-            return jsonify(data)
-        else:
-            return jsonify({'error': 'No webhook data available yet'}), 404
-    except Exception as e:
-        return jsonify({'error': f'Error reading webhook data: {str(e)}'}), 500
+    cached = LastWebhookCache.get(
+        service_type=request.args.get('service'),
+        instance_name=request.args.get('instance')
+    )
+    if cached is None:
+        return jsonify({'error': 'No webhook data available yet'}), 404
+
+    body, etag = cached
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 
 @app.errorhandler(404)
@@ -4,9 +4,20 @@ from app.core.config import Config, logger
 from app.core.models import ArrEvent, DownloadInfo, MediaItem, RemoteMedia, Release
 from app.core.monitor import DownloadMonitor
 from app.core.storage import FileOperations, DownloadLocator, WebhookStorage
+from app.core.history import WebhookHistory, HistoryWriter
+from app.core.webhook_queue import WebhookQueue, QueueFullError
+from app.core.scheduler import MonitorScheduler
+from app.core.watcher import FileWatcher
+from app.core.linker import LinkExecutor
+from app.core.copier import FileCopier, CopyCancelled
+from app.core.devices import DeviceMap
+from app.core.deleter import DeletionQueue
 
 __all__ = [
-    'Config', 'logger', 
+    'Config', 'logger',
     'ArrEvent', 'DownloadInfo', 'MediaItem', 'RemoteMedia', 'Release',
-    'DownloadMonitor', 'FileOperations', 'DownloadLocator', 'WebhookStorage'
-] 
\ No newline at end of file
+    'DownloadMonitor', 'FileOperations', 'DownloadLocator', 'WebhookStorage',
+    'WebhookHistory', 'HistoryWriter', 'WebhookQueue', 'QueueFullError',
+    'MonitorScheduler', 'FileWatcher', 'LinkExecutor',
+    'FileCopier', 'CopyCancelled', 'DeviceMap', 'DeletionQueue'
+]
\ No newline at end of file
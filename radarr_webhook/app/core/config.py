@@ -30,6 +30,7 @@ class Config:
     WEBHOOK_PASSWORD = os.getenv('WEBHOOK_PASSWORD')
     
     # File paths
+    CONFIG_DIR = os.getenv('CONFIG_DIR', 'config')
     WEBHOOK_LOG_FILE = os.getenv('WEBHOOK_LOG_FILE', 'webhook_history.json')
     DOWNLOAD_PATH = os.getenv('DOWNLOAD_PATH', '/mnt/downloads')
     
@@ -41,13 +42,58 @@ class Config:
     QBITTORRENT_PASSWORD = os.getenv('QBITTORRENT_PASSWORD', 'adminadmin')
     QBITTORRENT_USE_API = os.getenv('QBITTORRENT_USE_API', 'true').lower() == 'true'
     QBITTORRENT_PATH = os.getenv('QBITTORRENT_PATH', DOWNLOAD_PATH)
+    QBITTORRENT_SYNC_ENABLED = os.getenv('QBITTORRENT_SYNC_ENABLED', 'true').lower() == 'true'  # Mirror torrents via sync/maindata
+    QBITTORRENT_SYNC_MAX_AGE = float(os.getenv('QBITTORRENT_SYNC_MAX_AGE', 2.0))  # Seconds before the mirror is refreshed
     
     # Download monitor settings
     DOWNLOAD_MONITOR_ENABLED = os.getenv('DOWNLOAD_MONITOR_ENABLED', 'true').lower() == 'true'
-    MONITOR_INTERVAL = int(os.getenv('MONITOR_INTERVAL', 60))  # Seconds between checks
-    MAX_MONITOR_CHECKS = int(os.getenv('MAX_MONITOR_CHECKS', 100))
+    MONITOR_POLLING_ENABLED = os.getenv('MONITOR_POLLING_ENABLED', 'true').lower() == 'true'  # Keep checking downloads after they are located
+    MONITOR_INTERVAL = int(os.getenv('MONITOR_INTERVAL', 60))  # Seconds between checks of a downloading torrent
+    MONITOR_MIN_INTERVAL = float(os.getenv('MONITOR_MIN_INTERVAL', 10))  # Shortest interval, used near completion
+    MONITOR_MAX_INTERVAL = float(os.getenv('MONITOR_MAX_INTERVAL', 900))  # Longest interval, reached by stalled torrents
+    MONITOR_BACKOFF_FACTOR = float(os.getenv('MONITOR_BACKOFF_FACTOR', 2.0))  # Interval growth per idle check
+    MONITOR_MAX_DURATION = float(os.getenv('MONITOR_MAX_DURATION', 168))  # Hours before giving up, 0 means never
+    MONITOR_STALL_TIMEOUT = float(os.getenv('MONITOR_STALL_TIMEOUT', 48))  # Hours without progress before giving up, 0 means never
+    MONITOR_WORKERS = int(os.getenv('MONITOR_WORKERS', 4))  # Worker threads running download checks
+    MONITOR_BATCH_WINDOW = float(os.getenv('MONITOR_BATCH_WINDOW', 5))  # Seconds early a check may run to share a poll
+    FILE_WATCHER_ENABLED = os.getenv('FILE_WATCHER_ENABLED', 'true').lower() == 'true'  # Link files on inotify events (Linux)
+    LINK_WORKERS = int(os.getenv('LINK_WORKERS', 8))  # Threads creating hardlinks
+    LINK_DEVICE_CONCURRENCY = int(os.getenv('LINK_DEVICE_CONCURRENCY', 4))  # Concurrent link operations per source device
+    COPY_CHUNK_SIZE = int(os.getenv('COPY_CHUNK_SIZE', 64*1024*1024))  # Bytes per copy call when hardlinks are not possible
     MIN_FILE_SIZE = int(os.getenv('MIN_FILE_SIZE', 10*1024*1024))  # 10MB default
+    EVENT_RAW_DATA = os.getenv('EVENT_RAW_DATA', 'projected').lower()  # Payload kept on events: 'full', 'projected' or 'none'
+
+    # Persistence settings
+    DURABILITY = os.getenv('DURABILITY', 'data').lower()  # 'none', 'data' (fsync files) or 'full' (fsync files and directories)
+
+    # Torrent storage settings
+    TORRENT_STORAGE_BACKEND = os.getenv('TORRENT_STORAGE_BACKEND', 'sqlite').lower()  # 'sqlite', 'journal' or 'pickle'
+    TORRENT_STORAGE_FLUSH_DELAY = float(os.getenv('TORRENT_STORAGE_FLUSH_DELAY', 0.5))  # Seconds changes are coalesced before a write, 0 writes through
+    TORRENT_STORAGE_MAX_DIRTY = int(os.getenv('TORRENT_STORAGE_MAX_DIRTY', 500))  # Unwritten changes that force an immediate write
+    TORRENT_JOURNAL_COMPACT_RECORDS = int(os.getenv('TORRENT_JOURNAL_COMPACT_RECORDS', 1000))  # Min journal records before a snapshot, at least one per stored torrent
+
+    # Deletion queue settings
+    DELETE_BATCH_SIZE = int(os.getenv('DELETE_BATCH_SIZE', 50))  # Torrents per qBittorrent delete request
+    DELETE_FILES_PER_SECOND = float(os.getenv('DELETE_FILES_PER_SECOND', 20))  # Leftover files removed per second, 0 means unlimited
+
+    # Webhook queue settings
+    WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', 2))  # Worker threads processing webhooks
+    WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', 1000))  # Max pending webhooks
+    
+    # Webhook history writer settings
+    HISTORY_BATCH_SIZE = int(os.getenv('HISTORY_BATCH_SIZE', 100))  # Entries per group commit
+    HISTORY_FLUSH_INTERVAL = float(os.getenv('HISTORY_FLUSH_INTERVAL', 1.0))  # Max seconds before a flush
+    HISTORY_FSYNC = os.getenv('HISTORY_FSYNC', 'batch').lower()  # 'none', 'batch' or 'interval'
+    HISTORY_FSYNC_INTERVAL = float(os.getenv('HISTORY_FSYNC_INTERVAL', 5.0))  # Seconds between fsyncs
+    HISTORY_MAX_PENDING = int(os.getenv('HISTORY_MAX_PENDING', 10000))  # Entries kept while writes fail, 0 means no limit
     
+    # Webhook history segment settings
+    HISTORY_SEGMENT_MAX_BYTES = int(os.getenv('HISTORY_SEGMENT_MAX_BYTES', 64*1024*1024))  # 0 disables size rotation
+    HISTORY_SEGMENT_MAX_AGE = float(os.getenv('HISTORY_SEGMENT_MAX_AGE', 168))  # Hours, 0 disables age rotation
+    HISTORY_COMPRESSION = os.getenv('HISTORY_COMPRESSION', 'auto').lower()  # 'auto', 'zstd', 'gzip' or 'none'
+    HISTORY_RETENTION_DAYS = float(os.getenv('HISTORY_RETENTION_DAYS', 0))  # 0 keeps segments forever
+    HISTORY_MAX_SEGMENTS = int(os.getenv('HISTORY_MAX_SEGMENTS', 0))  # 0 means no limit
+
     # Supported media extensions
     MEDIA_EXTENSIONS = ['.mkv', '.mp4', '.avi', '.mov', '.m4v']
     SUBTITLE_EXTENSIONS = ['.srt', '.sub', '.idx', '.ass']
@@ -0,0 +1,232 @@
+"""
+File copy module used when a hardlink cannot be created.
+Copies in-process with the cheapest strategy the file systems support:
+a FICLONE reflink, then the kernel copy_file_range/sendfile calls, then a
+plain buffered copy. Data is written to a temporary file next to the
+destination and renamed into place, so the library never shows a partial
+file. Copies can be cancelled between chunks.
+"""
+import os
+import stat
+import time
+import errno
+import tempfile
+import threading
+from typing import Dict, Any, Optional
+
+from app.core.config import Config, logger
+
+# fcntl is only available on Unix, reflinks are skipped without it
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# ioctl request cloning a whole file, see ioctl_ficlone(2)
+FICLONE = 0x40049409
+
+# Errors meaning a strategy is not supported for this pair of files, so the next one is tried
+UNSUPPORTED_ERRORS = {
+    errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.ENOTTY,
+    errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF, errno.EPERM
+}
+
+# Strategies in the order they are tried
+STRATEGIES = ('reflink', 'copy_file_range', 'sendfile', 'buffered')
+
+
+class CopyCancelled(Exception):
+    """Raised when a copy is cancelled before it completes"""
+    pass
+
+
+class _Unsupported(Exception):
+    """A strategy cannot copy this file, try the next one"""
+    pass
+
+
+class FileCopier:
+    """
+    Copies files atomically with the fastest available strategy and keeps
+    per-strategy throughput counters
+    """
+    _lock = threading.Lock()
+    _cancel_all = threading.Event()
+    _stats = {strategy: {'files': 0, 'bytes': 0, 'seconds': 0.0} for strategy in STRATEGIES}
+    _last_copy: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def copy(cls, source_file: str, dest_file: str, cancel_event: Optional[threading.Event] = None,
+             strategy: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Copy a file through a temporary file renamed into place
+
+        Args:
+            source_file: Full path to the source file
+            dest_file: Full path of the copy, replaced if it exists
+            cancel_event: Event that aborts the copy when set
+            strategy: First strategy to try, defaults to the fastest one
+
+        Returns:
+            Dictionary with the strategy used, bytes copied, seconds and bytes per second
+
+        Raises:
+            CopyCancelled: If the copy was cancelled
+            OSError: If the file could not be copied
+        """
+        started = time.time()
+        strategies = STRATEGIES[STRATEGIES.index(strategy):] if strategy in STRATEGIES else STRATEGIES
+        dest_dir, dest_name = os.path.split(dest_file)
+        copy_methods = {
+            'reflink': cls._reflink,
+            'copy_file_range': cls._copy_file_range,
+            'sendfile': cls._sendfile,
+            'buffered': cls._buffered_copy,
+        }
+
+        with open(source_file, 'rb') as src:
+            source_stat = os.fstat(src.fileno())
+            fd, temp_path = tempfile.mkstemp(prefix=f".{dest_name}.", suffix='.partial', dir=dest_dir or '.')
+            try:
+                with os.fdopen(fd, 'wb') as dst:
+                    for name in strategies:
+                        try:
+                            copied = copy_methods[name](src, dst, source_stat.st_size, cancel_event)
+                            break
+                        except _Unsupported:
+                            # Start over from an empty file with the next strategy
+                            src.seek(0)
+                            dst.seek(0)
+                            dst.truncate()
+
+                # Same permissions as the source, like cp without -p
+                os.chmod(temp_path, stat.S_IMODE(source_stat.st_mode))
+                os.replace(temp_path, dest_file)
+            except BaseException:
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+                raise
+
+        elapsed = time.time() - started
+        result = {
+            'strategy': name,
+            'bytes': copied,
+            'seconds': round(elapsed, 3),
+            'bytes_per_second': round(copied / elapsed) if elapsed > 0 else None,
+        }
+        cls._record_copy(result, elapsed)
+        logger.info(f"Copied {os.path.basename(source_file)} ({copied / (1024 * 1024):.1f} MB) "
+                    f"using {name} in {elapsed:.2f}s")
+        return result
+
+    @classmethod
+    def cancel_all(cls) -> None:
+        """Cancel running copies and refuse new ones, used on shutdown"""
+        cls._cancel_all.set()
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """Return per-strategy counters and the last copy"""
+        with cls._lock:
+            stats = {}
+            for name, counters in cls._stats.items():
+                stats[name] = dict(counters)
+                stats[name]['seconds'] = round(counters['seconds'], 3)
+                stats[name]['bytes_per_second'] = (round(counters['bytes'] / counters['seconds'])
+                                                   if counters['seconds'] else None)
+            stats['last_copy'] = dict(cls._last_copy) if cls._last_copy else None
+        return stats
+
+    @classmethod
+    def _check_cancelled(cls, cancel_event: Optional[threading.Event]) -> None:
+        """Raise CopyCancelled if the copy or all copies were cancelled"""
+        if cls._cancel_all.is_set() or (cancel_event is not None and cancel_event.is_set()):
+            raise CopyCancelled("Copy cancelled")
+
+    @classmethod
+    def _reflink(cls, src, dst, size: int, cancel_event: Optional[threading.Event]) -> int:
+        """Share the source extents with a FICLONE ioctl, copy-on-write file systems only"""
+        cls._check_cancelled(cancel_event)
+        if fcntl is None:
+            raise _Unsupported()
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError as e:
+            if e.errno in UNSUPPORTED_ERRORS:
+                raise _Unsupported()
+            raise
+        return size
+
+    @classmethod
+    def _copy_file_range(cls, src, dst, size: int, cancel_event: Optional[threading.Event]) -> int:
+        """Copy in large chunks inside the kernel with copy_file_range"""
+        if not hasattr(os, 'copy_file_range'):
+            raise _Unsupported()
+        return cls._copy_chunks(
+            lambda offset, count: os.copy_file_range(src.fileno(), dst.fileno(), count, offset, offset),
+            cancel_event
+        )
+
+    @classmethod
+    def _sendfile(cls, src, dst, size: int, cancel_event: Optional[threading.Event]) -> int:
+        """Copy in large chunks inside the kernel with sendfile"""
+        if not hasattr(os, 'sendfile'):
+            raise _Unsupported()
+
+        def send(offset: int, count: int) -> int:
+            # sendfile writes at the current position of the destination
+            os.lseek(dst.fileno(), offset, os.SEEK_SET)
+            return os.sendfile(dst.fileno(), src.fileno(), offset, count)
+
+        return cls._copy_chunks(send, cancel_event)
+
+    @classmethod
+    def _buffered_copy(cls, src, dst, size: int, cancel_event: Optional[threading.Event]) -> int:
+        """Copy through a reusable user space buffer"""
+        buffer = memoryview(bytearray(min(Config.COPY_CHUNK_SIZE, 8 * 1024 * 1024)))
+        copied = 0
+        while True:
+            cls._check_cancelled(cancel_event)
+            count = src.readinto(buffer)
+            if not count:
+                return copied
+            dst.write(buffer[:count])
+            copied += count
+
+    @classmethod
+    def _copy_chunks(cls, copy_chunk, cancel_event: Optional[threading.Event]) -> int:
+        """
+        Run a kernel copy call chunk by chunk until the end of the source
+
+        Args:
+            copy_chunk: Callable taking an offset and a byte count, returning the bytes copied
+
+        Returns:
+            Number of bytes copied
+        """
+        copied = 0
+        while True:
+            cls._check_cancelled(cancel_event)
+            try:
+                count = copy_chunk(copied, Config.COPY_CHUNK_SIZE)
+            except OSError as e:
+                # Only fall back before anything was written, later errors are real
+                if copied == 0 and e.errno in UNSUPPORTED_ERRORS:
+                    raise _Unsupported()
+                raise
+            if count == 0:
+                return copied
+            copied += count
+
+    @classmethod
+    def _record_copy(cls, result: Dict[str, Any], elapsed: float) -> None:
+        """Add a finished copy to the strategy counters"""
+        with cls._lock:
+            counters = cls._stats[result['strategy']]
+            counters['files'] += 1
+            counters['bytes'] += result['bytes']
+            counters['seconds'] += elapsed
+            cls._last_copy = result
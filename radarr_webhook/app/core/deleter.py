@@ -0,0 +1,356 @@
+"""
+Deletion queue module for MovieDelete/SeriesDelete events.
+Torrents of deleted media are removed by a background worker instead of
+the webhook worker: qBittorrent is asked to delete them in batches with a
+single torrents_delete call, and leftover files are removed at a limited
+rate so a large series does not saturate the disk.
+"""
+import os
+import time
+import uuid
+import queue
+import atexit
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional, List
+
+from app.core.config import Config, logger
+
+
+# Number of finished deletion jobs kept for lookups
+JOB_HISTORY_SIZE = 200
+
+
+class DeletionJob:
+    """The torrents of one delete event waiting to be removed"""
+
+    def __init__(self, torrents: List[Dict[str, Any]], media_id: Optional[int] = None,
+                 media_title: Optional[str] = None):
+        self.job_id = uuid.uuid4().hex
+        self.torrents = torrents
+        self.media_id = media_id
+        self.media_title = media_title
+        self.enqueued_at = time.time()
+
+
+class DeletionQueue:
+    """
+    Background worker removing torrents and their files, one job at a time
+    """
+    _queue: Optional[queue.Queue] = None
+    _worker: Optional[threading.Thread] = None
+    _lock = threading.Lock()
+    _jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    _stats = {
+        'jobs_finished': 0,
+        'torrents_deleted': 0,
+        'files_deleted': 0,
+        'bytes_deleted': 0,
+        'errors': 0,
+    }
+
+    @classmethod
+    def start(cls) -> None:
+        """Start the deletion worker"""
+        with cls._lock:
+            if cls._queue is not None:
+                return
+            cls._queue = queue.Queue()
+            cls._worker = threading.Thread(target=cls._worker_loop, name="deletion-worker", daemon=True)
+            cls._worker.start()
+
+        atexit.register(cls.shutdown)
+        logger.info("Deletion queue started")
+
+    @classmethod
+    def enqueue(cls, torrents: List[Dict[str, Any]], media_id: Optional[int] = None,
+                media_title: Optional[str] = None) -> str:
+        """
+        Queue the torrents of deleted media for removal
+
+        Args:
+            torrents: Stored torrent information, each with a 'hash' and optional 'torrent_path'
+            media_id: ID of the deleted movie or series
+            media_title: Title of the deleted media, for logging
+
+        Returns:
+            The job ID, usable with get_job
+        """
+        cls.start()
+        job = DeletionJob(torrents, media_id, media_title)
+        with cls._lock:
+            cls._record_job(job.job_id, {
+                'status': 'queued',
+                'media_id': media_id,
+                'media_title': media_title,
+                'torrents_total': len(torrents),
+                'torrents_done': 0,
+                'files_deleted': 0,
+                'bytes_deleted': 0,
+                'errors': [],
+                'enqueued_at': datetime.fromtimestamp(job.enqueued_at).isoformat()
+            })
+        cls._queue.put(job)
+        logger.info(f"Queued deletion of {len(torrents)} torrents for {media_title or media_id} (job {job.job_id})")
+        return job.job_id
+
+    @classmethod
+    def get_job(cls, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the progress and outcome of a deletion job
+
+        Args:
+            job_id: The job ID returned by enqueue
+
+        Returns:
+            Dictionary with the job status or None if unknown
+        """
+        with cls._lock:
+            job = cls._jobs.get(job_id)
+            return cls._copy_job(job_id, job) if job else None
+
+    @classmethod
+    def get_jobs(cls, limit: int = 50) -> List[Dict[str, Any]]:
+        """Return the most recent jobs, newest first"""
+        with cls._lock:
+            job_ids = list(cls._jobs)[-limit:] if limit > 0 else []
+            return [cls._copy_job(job_id, cls._jobs[job_id]) for job_id in reversed(job_ids)]
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """Return the number of pending jobs and the deletion counters"""
+        with cls._lock:
+            stats = dict(cls._stats)
+        stats.update({
+            'running': cls._queue is not None,
+            'pending': cls._queue.qsize() if cls._queue is not None else 0,
+            'batch_size': Config.DELETE_BATCH_SIZE,
+            'files_per_second': Config.DELETE_FILES_PER_SECOND,
+        })
+        return stats
+
+    @classmethod
+    def shutdown(cls, timeout: float = 10.0) -> None:
+        """
+        Stop the worker after the current job. Jobs still queued are dropped,
+        their torrents stay in storage so a repeated delete event removes them.
+
+        Args:
+            timeout: Maximum number of seconds to wait for the worker
+        """
+        with cls._lock:
+            if cls._queue is None:
+                return
+            work_queue = cls._queue
+            worker = cls._worker
+
+        work_queue.put(None)
+        worker.join(timeout)
+
+        with cls._lock:
+            cls._queue = None
+            cls._worker = None
+
+    @classmethod
+    def _worker_loop(cls) -> None:
+        """Run deletion jobs until a stop sentinel is received"""
+        work_queue = cls._queue
+        while True:
+            job = work_queue.get()
+            if job is None:
+                break
+            try:
+                cls._process(job)
+            except Exception as e:
+                logger.exception(f"Error processing deletion job {job.job_id}: {e}")
+                with cls._lock:
+                    cls._stats['errors'] += 1
+                    cls._update_job(job.job_id, status='failed', finished_at=datetime.now().isoformat(),
+                                    errors=cls._jobs.get(job.job_id, {}).get('errors', []) + [str(e)])
+
+    @classmethod
+    def _process(cls, job: DeletionJob) -> None:
+        """Delete the torrents of a job from qBittorrent, then remove leftover files"""
+        from app.core.storage import TorrentStorage
+
+        with cls._lock:
+            cls._update_job(job.job_id, status='running', started_at=datetime.now().isoformat())
+
+        errors = []
+        hashes = [torrent['hash'] for torrent in job.torrents]
+        deleted_by_qbittorrent = set()
+
+        # Delete from qBittorrent with one request per batch
+        if hashes and Config.QBITTORRENT_ENABLED and Config.QBITTORRENT_USE_API:
+            from app.services.qbittorrent import QBittorrentClient
+            qbt = QBittorrentClient()
+            batch_size = max(1, Config.DELETE_BATCH_SIZE)
+            for start in range(0, len(hashes), batch_size):
+                batch = hashes[start:start + batch_size]
+                if qbt.delete_torrents(batch, with_files=True):
+                    deleted_by_qbittorrent.update(batch)
+                else:
+                    errors.append(f"qBittorrent could not delete {len(batch)} torrents")
+
+        limiter = _RateLimiter(Config.DELETE_FILES_PER_SECOND)
+        for torrent in job.torrents:
+            # Remove what qBittorrent did not delete, e.g. when the API is disabled
+            torrent_path = torrent.get('torrent_path')
+            if torrent['hash'] in deleted_by_qbittorrent:
+                # qBittorrent removes the files itself, walking them would race with it
+                pass
+            elif torrent_path and os.path.lexists(torrent_path):
+                refused = cls._check_deletable(torrent_path)
+                if refused:
+                    logger.error(f"Not deleting files of {torrent['hash']}: {refused}")
+                    errors.append(f"Skipped {torrent_path}: {refused}")
+                    files, size, error = 0, 0, None
+                else:
+                    files, size, error = cls._delete_path(torrent_path, limiter)
+                if error:
+                    errors.append(error)
+                with cls._lock:
+                    cls._stats['files_deleted'] += files
+                    cls._stats['bytes_deleted'] += size
+                    cls._increment_job(job.job_id, files_deleted=files, bytes_deleted=size)
+
+            TorrentStorage.delete_torrent_info(torrent['hash'])
+            with cls._lock:
+                cls._stats['torrents_deleted'] += 1
+                cls._increment_job(job.job_id, torrents_done=1)
+
+        with cls._lock:
+            cls._stats['jobs_finished'] += 1
+            cls._stats['errors'] += len(errors)
+            cls._update_job(
+                job.job_id,
+                status='failed' if errors else 'done',
+                errors=errors,
+                finished_at=datetime.now().isoformat()
+            )
+
+        logger.info(f"Deleted {len(job.torrents)} torrents for {job.media_title or job.media_id} "
+                    f"({len(errors)} errors)")
+
+    @staticmethod
+    def _check_deletable(path: str) -> Optional[str]:
+        """
+        Check that a stored torrent path is a download inside the download folders.
+        A download that was not located is stored with the downloads root as its path,
+        which must never be deleted.
+
+        Args:
+            path: The torrent path to delete
+
+        Returns:
+            The reason the path must not be deleted, or None if it may be
+        """
+        real_path = os.path.realpath(path)
+        roots = {os.path.realpath(root) for root in (Config.DOWNLOAD_PATH, Config.QBITTORRENT_PATH) if root}
+        inside = False
+        for root in roots:
+            common = os.path.commonpath([real_path, root])
+            if common == real_path:
+                return f"it is or contains the download folder {root}"
+            if common == root:
+                inside = True
+        if not inside:
+            return "it is outside the download folders"
+        return None
+
+    @staticmethod
+    def _delete_path(path: str, limiter: "_RateLimiter"):
+        """
+        Delete a file or folder one file at a time, respecting the rate limit.
+        qBittorrent deletes files in the background, so entries that disappear
+        while walking are skipped.
+
+        Returns:
+            Tuple of (files deleted, bytes deleted, error message or None)
+        """
+        files = 0
+        size = 0
+        try:
+            if not os.path.isdir(path) or os.path.islink(path):
+                limiter.wait()
+                size = _remove(os.remove, path)
+                logger.info(f"Deleted file: {path}")
+                return 1, size, None
+
+            for root, dirs, names in os.walk(path, topdown=False):
+                for name in names:
+                    limiter.wait()
+                    size += _remove(os.remove, os.path.join(root, name))
+                    files += 1
+                for name in dirs:
+                    dir_path = os.path.join(root, name)
+                    _remove(os.remove if os.path.islink(dir_path) else os.rmdir, dir_path)
+            _remove(os.rmdir, path)
+            logger.info(f"Deleted directory: {path} ({files} files)")
+            return files, size, None
+        except OSError as e:
+            logger.error(f"Error deleting path {path}: {e}")
+            return files, size, f"Error deleting {path}: {e}"
+
+    @classmethod
+    def _copy_job(cls, job_id: str, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy a job record for callers (caller holds the lock)"""
+        job = dict(job, job_id=job_id)
+        job['errors'] = list(job['errors'])
+        return job
+
+    @classmethod
+    def _record_job(cls, job_id: str, job: Dict[str, Any]) -> None:
+        """Store a job record, evicting the oldest ones (caller holds the lock)"""
+        cls._jobs[job_id] = job
+        while len(cls._jobs) > JOB_HISTORY_SIZE:
+            cls._jobs.popitem(last=False)
+
+    @classmethod
+    def _update_job(cls, job_id: str, **fields) -> None:
+        """Update a stored job record (caller holds the lock)"""
+        job = cls._jobs.get(job_id)
+        if job is not None:
+            job.update(fields)
+
+    @classmethod
+    def _increment_job(cls, job_id: str, **counts) -> None:
+        """Add to the counters of a stored job record (caller holds the lock)"""
+        job = cls._jobs.get(job_id)
+        if job is not None:
+            for field, count in counts.items():
+                job[field] += count
+
+
+class _RateLimiter:
+    """Spaces operations evenly to at most a given number per second"""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self.next_at = time.monotonic()
+
+    def wait(self) -> None:
+        """Sleep until the next operation is allowed"""
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_at > now:
+            time.sleep(self.next_at - now)
+            now = self.next_at
+        self.next_at = now + self.interval
+
+
+def _remove(remove, path: str) -> int:
+    """
+    Remove a path with the given function, ignoring paths that are already gone
+
+    Returns:
+        The size of the removed entry in bytes
+    """
+    try:
+        size = os.lstat(path).st_size
+        remove(path)
+        return size
+    except FileNotFoundError:
+        return 0
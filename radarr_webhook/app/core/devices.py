@@ -0,0 +1,176 @@
+"""
+Device map module for linking files into the library.
+Looks up the device of each download root and media folder once, and
+chooses the link strategy per (source device, destination device) pair, so
+cross-filesystem setups are known up front instead of being discovered by
+a failing os.link for every file.
+"""
+import os
+import threading
+from typing import Dict, Any, Optional, Set, Tuple
+
+from app.core.config import logger
+
+
+# Link strategies, from cheapest to most expensive
+HARDLINK = 'hardlink'
+REFLINK = 'reflink'
+COPY = 'copy'
+
+
+class DeviceMap:
+    """
+    Cache of root folder devices and the link strategy of each device pair.
+    A pair starts as a hardlink when both roots are on the same device and
+    as a copy otherwise. It moves to a copy when a hardlink fails, and records
+    the copy strategy that worked so later copies start with it.
+    """
+    _lock = threading.Lock()
+    _devices: Dict[str, int] = {}  # root path -> st_dev
+    _pairs: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    _pair_roots: Dict[Tuple[int, int], Tuple[Set[str], Set[str]]] = {}  # pair -> (source roots, destination roots)
+
+    @classmethod
+    def get_device(cls, path: str) -> Optional[int]:
+        """
+        Get the device of a path, looked up once per path
+
+        Args:
+            path: File or folder path
+
+        Returns:
+            The st_dev of the path, or None if it cannot be read
+        """
+        with cls._lock:
+            device = cls._devices.get(path)
+        if device is not None:
+            return device
+
+        try:
+            device = os.stat(path).st_dev
+        except OSError as e:
+            logger.warning(f"Cannot read the device of {path}: {e}")
+            return None
+
+        with cls._lock:
+            cls._devices[path] = device
+        return device
+
+    @classmethod
+    def get_pair(cls, source_root: str, dest_root: str) -> Optional[Tuple[int, int]]:
+        """
+        Get the device pair of a download root and a media folder, registering it if new
+
+        Args:
+            source_root: Folder the download is in
+            dest_root: Media folder the files are linked into
+
+        Returns:
+            Tuple of (source device, destination device), or None if unknown
+        """
+        source_device = cls.get_device(source_root)
+        dest_device = cls.get_device(dest_root)
+        if source_device is None or dest_device is None:
+            return None
+
+        pair = (source_device, dest_device)
+        with cls._lock:
+            if pair not in cls._pairs:
+                strategy = HARDLINK if source_device == dest_device else COPY
+                cls._pairs[pair] = {
+                    'strategy': strategy,
+                    'copy_strategy': None,
+                    'hardlink_error': None,
+                    'hardlinks': 0,
+                    'copies': 0,
+                    'bytes_copied': 0,
+                }
+                cls._pair_roots[pair] = (set(), set())
+                logger.info(f"Files from {source_root} to {dest_root} will use {strategy} "
+                            f"(devices {source_device} -> {dest_device})")
+            source_roots, dest_roots = cls._pair_roots[pair]
+            source_roots.add(source_root)
+            dest_roots.add(dest_root)
+        return pair
+
+    @classmethod
+    def get_strategy(cls, pair: Optional[Tuple[int, int]]) -> Tuple[str, Optional[str]]:
+        """
+        Get the link strategy of a device pair
+
+        Returns:
+            Tuple of (link strategy, first copy strategy to try or None for all)
+        """
+        with cls._lock:
+            info = cls._pairs.get(pair)
+            if info is None:
+                return HARDLINK, None
+            return info['strategy'], info['copy_strategy']
+
+    @classmethod
+    def disable_hardlinks(cls, pair: Optional[Tuple[int, int]], error: OSError) -> None:
+        """Copy the files of a pair from now on, after a hardlink between its devices failed"""
+        with cls._lock:
+            info = cls._pairs.get(pair)
+            if info is None or info['strategy'] != HARDLINK:
+                return
+            info['strategy'] = COPY
+            info['hardlink_error'] = str(error)
+        logger.warning(f"Hardlinks from device {pair[0]} to {pair[1]} are not possible ({error}), "
+                       f"copying files instead")
+
+    @classmethod
+    def record_hardlink(cls, pair: Optional[Tuple[int, int]]) -> None:
+        """Count a hardlink created for a pair"""
+        with cls._lock:
+            info = cls._pairs.get(pair)
+            if info is not None:
+                info['hardlinks'] += 1
+
+    @classmethod
+    def record_copy(cls, pair: Optional[Tuple[int, int]], result: Dict[str, Any]) -> None:
+        """
+        Count a copy made for a pair and remember the copy strategy that worked
+
+        Args:
+            pair: The device pair
+            result: Result returned by FileCopier.copy
+        """
+        with cls._lock:
+            info = cls._pairs.get(pair)
+            if info is None:
+                return
+            info['copies'] += 1
+            info['bytes_copied'] += result['bytes']
+            info['copy_strategy'] = result['strategy']
+            if info['strategy'] != HARDLINK:
+                info['strategy'] = REFLINK if result['strategy'] == 'reflink' else COPY
+
+    @classmethod
+    def get_matrix(cls) -> Dict[str, Any]:
+        """Return the known root devices and the strategy and counters of each pair"""
+        with cls._lock:
+            pairs = []
+            for (source_device, dest_device), info in cls._pairs.items():
+                source_roots, dest_roots = cls._pair_roots[(source_device, dest_device)]
+                entry = dict(info)
+                entry.update({
+                    'source_device': source_device,
+                    'dest_device': dest_device,
+                    'source_roots': sorted(source_roots),
+                    'dest_roots': sorted(dest_roots),
+                })
+                pairs.append(entry)
+            return {
+                'devices': dict(cls._devices),
+                'pairs': pairs,
+            }
+
+    @classmethod
+    def reset(cls) -> None:
+        """Forget all devices and strategies, e.g. after storage was remounted"""
+        with cls._lock:
+            cls._devices = {}
+            cls._pairs = {}
+            cls._pair_roots = {}
+        logger.info("Cleared device map")
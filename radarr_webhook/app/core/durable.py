@@ -0,0 +1,123 @@
+"""
+Durable write helpers for persisted state.
+Files are replaced through a temporary file in the same directory and
+os.replace, so readers and a crash see either the old or the new content,
+never a missing or partial file. DURABILITY decides how much is forced to
+stable storage:
+
+- none: atomic replace only, the OS writes the data back when it likes
+- data: the new content is fsynced before it replaces the old file
+- full: the directory is fsynced too, so the rename itself survives a crash
+"""
+import os
+import tempfile
+from typing import Callable, BinaryIO, Optional
+
+from app.core.config import Config, logger
+
+
+# Durability levels, from fastest to safest
+DURABILITY_LEVELS = ('none', 'data', 'full')
+
+# The umask can only be read by setting it, which is not thread safe, so read it once at import
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def get_durability(durability: Optional[str] = None) -> str:
+    """
+    Resolve a durability level, defaulting to the configured one
+
+    Args:
+        durability: 'none', 'data', 'full' or None for DURABILITY
+
+    Returns:
+        A valid durability level
+    """
+    level = (durability or Config.DURABILITY).lower()
+    if level not in DURABILITY_LEVELS:
+        logger.warning(f"Unknown durability level '{level}', using 'full'")
+        return 'full'
+    return level
+
+
+def atomic_write(path: str, write: Callable[[BinaryIO], None], durability: Optional[str] = None) -> None:
+    """
+    Replace a file with new content through a temporary file in the same directory
+
+    Args:
+        path: File to replace
+        write: Callable writing the new content to the binary file it is given
+        durability: Durability level, defaults to DURABILITY
+
+    Raises:
+        OSError: If the file could not be written, the old file is left untouched
+    """
+    level = get_durability(durability)
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=f".{name}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            if level != 'none':
+                os.fsync(f.fileno())
+        # mkstemp creates the file private, keep the permissions of a normal file
+        os.chmod(temp_path, 0o666 & ~_UMASK)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+    if level == 'full':
+        fsync_directory(directory)
+
+
+def replace(source: str, dest: str, durability: Optional[str] = None) -> None:
+    """
+    Rename a file over another, syncing the directory at the 'full' level
+
+    Args:
+        source: File to rename
+        dest: New path, replaced if it exists
+        durability: Durability level, defaults to DURABILITY
+    """
+    os.replace(source, dest)
+    if get_durability(durability) == 'full':
+        fsync_directory(os.path.dirname(os.path.abspath(dest)))
+
+
+def sync_file(handle, durability: Optional[str] = None) -> None:
+    """
+    Flush an open file and fsync it unless the level is 'none', used after appends
+
+    Args:
+        handle: Open binary file
+        durability: Durability level, defaults to DURABILITY
+    """
+    handle.flush()
+    if get_durability(durability) != 'none':
+        os.fsync(handle.fileno())
+
+
+def fsync_directory(directory: str) -> None:
+    """
+    Force the entries of a directory to stable storage, making renames and
+    new files durable. Ignored where directories cannot be opened (Windows).
+
+    Args:
+        directory: Directory to sync
+    """
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError as e:
+        logger.debug(f"Cannot fsync directory {directory}: {e}")
+    finally:
+        os.close(fd)
@@ -0,0 +1,771 @@
+"""
+History module for the append-only webhook log.
+Each webhook is stored as one JSON document per line, so appending
+an event never requires reading or rewriting earlier entries.
+"""
+import os
+import json
+import time
+import atexit
+import threading
+from typing import Dict, Any, Iterator, Optional, List, Tuple
+
+from app.core.config import Config, logger
+from app.core.durable import atomic_write, replace
+from app.core.history_segments import HistorySegment, discover_segments, get_compression
+
+# fcntl is only available on Unix, the history is not locked without it
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Longest wait before retrying a failed history write
+MAX_RETRY_DELAY = 60.0
+
+
+class WebhookHistory:
+    """
+    Append-only newline-delimited JSON history of received webhooks.
+    The history is stored in segments: the live file receives appends and is
+    rotated by size or age into numbered segments that are compressed in the
+    background and pruned by the retention policy.
+    Offsets and rotation are tracked in memory, so a single process owns the
+    history files; a second process is refused through a lock file.
+    """
+    _lock = threading.Lock()
+    _handle = None  # Open append handle for the live segment
+    _lock_handle = None  # Open lock file while this process owns the history
+    _live: Optional[HistorySegment] = None
+    _segments: List[HistorySegment] = []  # Closed segments, oldest first
+    _migrated = False
+
+    @staticmethod
+    def get_history_file() -> str:
+        """Get the path of the live newline-delimited history file"""
+        file_name = os.path.basename(Config.WEBHOOK_LOG_FILE)
+        if file_name.endswith('.json'):
+            file_name += 'l'
+        return os.path.join(Config.CONFIG_DIR, file_name)
+
+    @staticmethod
+    def get_legacy_file() -> str:
+        """Get the path of the legacy JSON array history file"""
+        file_name = os.path.basename(Config.WEBHOOK_LOG_FILE)
+        if file_name.endswith('.jsonl'):
+            file_name = file_name[:-1]
+        return os.path.join(Config.CONFIG_DIR, file_name)
+
+    @classmethod
+    def append(cls, entry: Dict[str, Any]) -> None:
+        """
+        Append a single entry to the history file
+
+        Args:
+            entry: JSON-serializable history entry
+        """
+        cls.append_many([entry])
+
+    @classmethod
+    def append_many(cls, entries: List[Dict[str, Any]], fsync: bool = False) -> None:
+        """
+        Append a batch of entries to the live segment with a single write
+        and add them to its offset index
+
+        Args:
+            entries: JSON-serializable history entries
+            fsync: If True, force the written data to stable storage
+        """
+        cls.migrate_legacy_history()
+
+        lines = [json.dumps(entry, separators=(',', ':')).encode('utf-8') + b'\n' for entry in entries]
+        with cls._lock:
+            cls._load_segments()
+            cls._rotate_if_needed()
+
+            index = cls._live.index
+            handle = cls._get_handle()
+            offset = handle.tell()
+            handle.write(b''.join(lines))
+            handle.flush()
+            if fsync:
+                os.fsync(handle.fileno())
+
+            for entry, line in zip(entries, lines):
+                index.add(offset, len(line), entry)
+                offset += len(line)
+            index.flush()
+
+    @classmethod
+    def query(cls, limit: int = 50, cursor: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None, **filters) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Query history entries across all segments, newest first, using the offset indexes
+
+        Args:
+            limit: Maximum number of entries to return
+            cursor: Cursor returned by a previous query to fetch the next page
+            since: Only return entries at or after this epoch timestamp
+            until: Only return entries at or before this epoch timestamp
+            **filters: service_type, event_type, download_id and/or instance_name values
+
+        Returns:
+            Tuple of (entries, next_cursor)
+            next_cursor is None when there are no more entries
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        cursor_segment, cursor_position = cls._parse_cursor(cursor)
+        cls.migrate_legacy_history()
+
+        with cls._lock:
+            cls._load_segments()
+
+            # Collect one extra match to know whether another page exists
+            matches = []
+            for segment in reversed(cls._segments + [cls._live]):
+                index = segment.index
+                if cursor_segment is not None and segment.number > cursor_segment:
+                    continue
+                if not len(index):
+                    continue
+                if since is not None and index.last_timestamp < since:
+                    # Older segments only contain older entries
+                    break
+                if until is not None and index.first_timestamp > until:
+                    continue
+
+                before = cursor_position if segment.number == cursor_segment else None
+                positions = index.find(limit + 1 - len(matches), before=before,
+                                       since=since, until=until, **filters)
+                matches.extend((segment, position) for position in positions)
+                if len(matches) > limit:
+                    break
+
+            page = matches[:limit]
+            entries = []
+            for segment in dict.fromkeys(segment for segment, _ in page):
+                positions = [position for seg, position in page if seg is segment]
+                for position, entry in zip(positions, segment.index.read(positions)):
+                    if entry is not None:
+                        entry['id'] = f"{segment.number}:{position}"
+                        entries.append(entry)
+
+        next_cursor = None
+        if len(matches) > limit:
+            segment, position = page[-1]
+            next_cursor = f"{segment.number}:{position}"
+        return entries, next_cursor
+
+    @classmethod
+    def iter_history(cls, history_file: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream history entries from oldest to newest without loading whole files.
+        Reads transparently across closed (compressed) segments and the live file.
+
+        Args:
+            history_file: Optional path of a single plain history file to read instead
+
+        Yields:
+            History entries as dictionaries
+        """
+        if history_file is not None:
+            if not os.path.exists(history_file):
+                return
+            with open(history_file, 'rb') as f:
+                yield from cls._iter_lines(f, history_file)
+            return
+
+        cls.migrate_legacy_history()
+        with cls._lock:
+            cls._load_segments()
+            segments = cls._segments + [cls._live]
+
+        for segment in segments:
+            try:
+                f = segment.open()
+            except FileNotFoundError:
+                # Segment was compressed meanwhile, or pruned
+                try:
+                    f = segment.open()
+                except FileNotFoundError:
+                    continue
+            with f:
+                yield from cls._iter_lines(f, segment.log_file)
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """Return information about the history segments"""
+        with cls._lock:
+            cls._load_segments()
+            segments = cls._segments + [cls._live]
+            return {
+                'segments': len(segments),
+                'compressed_segments': sum(1 for segment in segments if segment.compressed),
+                'entries': sum(len(segment.index) for segment in segments),
+                'total_bytes': sum(segment.size() for segment in segments),
+                'live_segment_bytes': cls._live.size(),
+                'compression': get_compression() or 'none'
+            }
+
+    @classmethod
+    def migrate_legacy_history(cls) -> int:
+        """
+        Convert the legacy JSON array history file into the newline-delimited format.
+        Runs at most once per process; the legacy file is renamed afterwards.
+
+        Returns:
+            Number of migrated entries
+        """
+        if cls._migrated:
+            return 0
+
+        with cls._lock:
+            if cls._migrated:
+                return 0
+            cls._acquire_ownership()
+            cls._migrated = True
+
+            legacy_file = cls.get_legacy_file()
+            history_file = cls.get_history_file()
+            if legacy_file == history_file or not os.path.exists(legacy_file):
+                return 0
+
+            try:
+                with open(legacy_file, 'r', encoding='utf-8') as f:
+                    legacy_entries = json.load(f) if os.path.getsize(legacy_file) > 0 else []
+                if not isinstance(legacy_entries, list):
+                    raise ValueError("history file does not contain a JSON array")
+            except (json.JSONDecodeError, ValueError) as e:
+                logger.error(f"Cannot migrate corrupted history file {legacy_file}: {e}")
+                return 0
+
+            # Legacy entries are older than anything already in the new file
+            def write_history(out):
+                for entry in legacy_entries:
+                    out.write(json.dumps(entry, separators=(',', ':')).encode('utf-8') + b'\n')
+                if os.path.exists(history_file):
+                    with open(history_file, 'rb') as current:
+                        for line in current:
+                            out.write(line)
+
+            atomic_write(history_file, write_history)
+            replace(legacy_file, legacy_file + '.migrated')
+
+            logger.info(f"Migrated {len(legacy_entries)} webhook history entries to {history_file}")
+            return len(legacy_entries)
+
+    @classmethod
+    def close(cls) -> None:
+        """Close the append handle and the indexes and release the history lock"""
+        with cls._lock:
+            if cls._handle is not None:
+                cls._handle.close()
+                cls._handle = None
+            for segment in cls._segments + ([cls._live] if cls._live else []):
+                segment.index.close()
+            cls._live = None
+            cls._segments = []
+            if cls._lock_handle is not None:
+                cls._lock_handle.close()
+                cls._lock_handle = None
+
+    @staticmethod
+    def _parse_cursor(cursor: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+        """Split a 'segment:position' cursor into its numbers"""
+        if not cursor:
+            return None, None
+        try:
+            segment, position = cursor.split(':')
+            return int(segment), int(position)
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor}")
+
+    @staticmethod
+    def _iter_lines(f, source: str) -> Iterator[Dict[str, Any]]:
+        """Parse the lines of an open binary history file"""
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping corrupted history line {line_number} in {source}")
+
+    @classmethod
+    def sync(cls) -> None:
+        """Force the appended entries of the live segment to stable storage"""
+        with cls._lock:
+            if cls._handle is not None:
+                os.fsync(cls._handle.fileno())
+
+    @classmethod
+    def _get_handle(cls):
+        """Open the live segment for appending (caller holds the lock)"""
+        if cls._handle is None:
+            os.makedirs(Config.CONFIG_DIR, exist_ok=True)
+            cls._handle = open(cls.get_history_file(), 'ab')
+            cls._handle.seek(0, os.SEEK_END)
+        return cls._handle
+
+    @staticmethod
+    def _truncate_partial_line(history_file: str) -> None:
+        """
+        Cut off a last line left incomplete by a crash, so the next append
+        does not continue it and both readers see the same entries
+
+        Args:
+            history_file: Live history file
+        """
+        try:
+            f = open(history_file, 'r+b')
+        except FileNotFoundError:
+            return
+
+        with f:
+            size = f.seek(0, os.SEEK_END)
+            end = size
+            # Search backwards for the newline ending the last complete line
+            while end > 0:
+                start = max(0, end - 64 * 1024)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b'\n')
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+
+            if end < size:
+                logger.warning(f"Dropping {size - end} bytes of a partially written line at the end of {history_file}")
+                f.truncate(end)
+
+    @classmethod
+    def _acquire_ownership(cls) -> None:
+        """
+        Lock the history for this process (caller holds the lock). Appends take
+        their offsets from the open handle and the indexes only know the entries
+        this process wrote, so other processes must not append or rotate.
+
+        Raises:
+            RuntimeError: If another process owns the history
+        """
+        if cls._lock_handle is not None:
+            return
+        os.makedirs(Config.CONFIG_DIR, exist_ok=True)
+        if fcntl is None:
+            return
+
+        handle = open(cls.get_history_file() + '.lock', 'ab')
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            raise RuntimeError(f"Webhook history in {Config.CONFIG_DIR} is used by another process, "
+                               f"run the server as a single process")
+        cls._lock_handle = handle
+
+    @classmethod
+    def _get_stem(cls) -> str:
+        """History file name without its extension"""
+        return os.path.splitext(os.path.basename(cls.get_history_file()))[0]
+
+    @classmethod
+    def _load_segments(cls) -> None:
+        """Discover the segments and load their indexes (caller holds the lock)"""
+        if cls._live is not None:
+            return
+
+        cls._acquire_ownership()
+        cls._segments = discover_segments(Config.CONFIG_DIR, cls._get_stem())
+        for segment in cls._segments:
+            segment.index.load(sealed=True)
+
+        history_file = cls.get_history_file()
+        cls._truncate_partial_line(history_file)
+        number = cls._segments[-1].number + 1 if cls._segments else 1
+        cls._live = HistorySegment(number, history_file, history_file + '.idx')
+        cls._live.index.load()
+
+        cls._prune_segments()
+
+        # Compress closed segments left uncompressed by an earlier run
+        for segment in cls._segments:
+            if not segment.compressed:
+                cls._schedule_compression(segment)
+
+    @classmethod
+    def _rotate_if_needed(cls) -> None:
+        """Close the live segment when it is too large or too old (caller holds the lock)"""
+        live = cls._live
+        if not len(live.index):
+            return
+
+        too_large = (Config.HISTORY_SEGMENT_MAX_BYTES > 0 and
+                     live.index.end_offset >= Config.HISTORY_SEGMENT_MAX_BYTES)
+        too_old = (Config.HISTORY_SEGMENT_MAX_AGE > 0 and
+                   time.time() - live.index.first_timestamp >= Config.HISTORY_SEGMENT_MAX_AGE * 3600)
+        if not (too_large or too_old):
+            return
+
+        # Close the live file and give it its segment number
+        if cls._handle is not None:
+            cls._handle.close()
+            cls._handle = None
+        live.index.close()
+
+        directory = os.path.dirname(live.log_file)
+        stem = cls._get_stem()
+        log_file = os.path.join(directory, f"{stem}.{live.number:06d}.jsonl")
+        index_file = os.path.join(directory, f"{stem}.{live.number:06d}.idx")
+        replace(live.index.index_file, index_file)
+        replace(live.log_file, log_file)
+        live.index.index_file = index_file
+        live.use_file(log_file)
+        cls._segments.append(live)
+
+        history_file = cls.get_history_file()
+        cls._live = HistorySegment(live.number + 1, history_file, history_file + '.idx')
+        cls._live.index.load()
+
+        reason = 'size' if too_large else 'age'
+        logger.info(f"Rotated webhook history segment {live.number} by {reason} "
+                    f"({len(live.index)} entries, {live.index.end_offset} bytes)")
+
+        cls._prune_segments()
+        cls._schedule_compression(live)
+
+    @classmethod
+    def _prune_segments(cls) -> None:
+        """Delete closed segments outside the retention policy (caller holds the lock)"""
+        expired = []
+        if Config.HISTORY_RETENTION_DAYS > 0:
+            cutoff = time.time() - Config.HISTORY_RETENTION_DAYS * 86400
+            expired = [segment for segment in cls._segments
+                       if segment.index.last_timestamp is None or segment.index.last_timestamp < cutoff]
+        if Config.HISTORY_MAX_SEGMENTS > 0:
+            excess = len(cls._segments) - Config.HISTORY_MAX_SEGMENTS
+            for segment in cls._segments[:max(0, excess)]:
+                if segment not in expired:
+                    expired.append(segment)
+
+        for segment in expired:
+            segment.remove()
+            cls._segments.remove(segment)
+            logger.info(f"Pruned webhook history segment {segment.number}")
+
+    @classmethod
+    def _schedule_compression(cls, segment: HistorySegment) -> None:
+        """Compress a closed segment in a background thread"""
+        compression = get_compression()
+        if compression is None:
+            return
+        threading.Thread(
+            target=cls._compress_segment,
+            args=(segment, compression),
+            name=f"history-compress-{segment.number}",
+            daemon=True
+        ).start()
+
+    @classmethod
+    def _compress_segment(cls, segment: HistorySegment, compression: str) -> None:
+        """Replace a closed segment with its compressed copy"""
+        plain_file = segment.log_file
+        try:
+            compressed_file = segment.compress(compression)
+        except Exception as e:
+            logger.error(f"Error compressing webhook history segment {segment.number}: {e}")
+            return
+
+        with cls._lock:
+            if segment not in cls._segments:
+                # Pruned while it was being compressed
+                os.remove(compressed_file)
+                return
+            segment.use_file(compressed_file)
+            os.remove(plain_file)
+
+        logger.info(f"Compressed webhook history segment {segment.number} with {compression}")
+
+
+class HistoryWriter:
+    """
+    Background writer that group-commits webhook history entries.
+    Entries are batched and flushed when the batch is full or the flush
+    interval elapses. Only the latest webhook snapshot is kept in memory
+    and it is persisted together with the next flush. Entries of a failed
+    write stay pending and are retried with a growing delay.
+    """
+    _condition = threading.Condition()
+    _thread: Optional[threading.Thread] = None
+    _stopped = False
+    _pending: List[Dict[str, Any]] = []
+    _dirty_since = 0.0  # When the oldest unflushed change was made
+    _snapshot: Optional[Dict[str, Any]] = None
+    _snapshot_dirty = False
+    _unsynced = False  # Entries were written for a reader without the fsync of the policy
+    _flush_lock = threading.Lock()  # Serializes flushes from the writer and callers
+    _last_fsync = 0.0
+    _write_failures = 0  # Consecutive failed writes, for the retry backoff
+    _retry_at = 0.0  # No flush before this time after a failed write
+    _stats = {
+        'batches': 0,
+        'entries': 0,
+        'last_batch_size': 0,
+        'max_batch_size': 0,
+        'last_flush_ms': 0.0,
+        'max_flush_ms': 0.0,
+        'total_flush_ms': 0.0,
+        'snapshot_writes': 0,
+        'errors': 0,
+        'dropped': 0,
+    }
+
+    @classmethod
+    def start(cls) -> None:
+        """Start the writer thread if it is not running"""
+        with cls._condition:
+            if cls._thread is not None or cls._stopped:
+                return
+            cls._thread = threading.Thread(target=cls._run, name="history-writer", daemon=True)
+            cls._thread.start()
+        atexit.register(cls.stop)
+
+    @classmethod
+    def submit(cls, entry: Dict[str, Any]) -> None:
+        """
+        Queue a history entry for the next group commit
+
+        Args:
+            entry: JSON-serializable history entry
+        """
+        cls.start()
+        with cls._condition:
+            cls._mark_dirty()
+            cls._pending.append(entry)
+            cls._trim_pending()
+            if len(cls._pending) == 1 or len(cls._pending) >= Config.HISTORY_BATCH_SIZE:
+                cls._condition.notify()
+            stopped = cls._stopped
+
+        if stopped:
+            # Writer has shut down, write through so nothing is lost
+            cls.flush()
+
+    @classmethod
+    def set_snapshot(cls, data: Dict[str, Any]) -> None:
+        """
+        Replace the in-memory latest webhook snapshot
+
+        Args:
+            data: The webhook payload data
+        """
+        cls.start()
+        with cls._condition:
+            cls._mark_dirty()
+            cls._snapshot = data
+            cls._snapshot_dirty = True
+            cls._condition.notify()
+            stopped = cls._stopped
+
+        if stopped:
+            cls.flush()
+
+    @classmethod
+    def get_snapshot(cls) -> Optional[Dict[str, Any]]:
+        """Get the latest webhook snapshot held in memory"""
+        with cls._condition:
+            return cls._snapshot
+
+    @classmethod
+    def flush(cls) -> None:
+        """Write all pending entries and the snapshot now"""
+        # Taking the batch under the flush lock keeps batches in submission order
+        with cls._flush_lock:
+            with cls._condition:
+                batch = cls._pending
+                cls._pending = []
+                snapshot = cls._snapshot if cls._snapshot_dirty else None
+                cls._snapshot_dirty = False
+                unsynced = cls._unsynced
+                cls._unsynced = False
+
+            if batch:
+                cls._flush_batch(batch)
+            elif unsynced and Config.HISTORY_FSYNC != 'none':
+                try:
+                    WebhookHistory.sync()
+                except OSError as e:
+                    logger.error(f"Error syncing webhook history: {e}")
+            if snapshot is not None:
+                cls._write_snapshot(snapshot)
+
+    @classmethod
+    def flush_entries(cls) -> None:
+        """
+        Write pending entries so readers of the history files see them. The
+        write skips the fsync, the writer thread syncs them with its next flush.
+        """
+        with cls._flush_lock:
+            with cls._condition:
+                batch = cls._pending
+                cls._pending = []
+
+            if batch and cls._flush_batch(batch, fsync=False):
+                with cls._condition:
+                    cls._mark_dirty()
+                    cls._unsynced = True
+                    cls._condition.notify()
+
+    @classmethod
+    def stop(cls, timeout: float = 10.0) -> None:
+        """
+        Stop the writer thread and flush everything still pending
+
+        Args:
+            timeout: Maximum number of seconds to wait for the writer thread
+        """
+        with cls._condition:
+            cls._stopped = True
+            thread = cls._thread
+            cls._condition.notify()
+
+        if thread is not None:
+            thread.join(timeout)
+        cls.flush()
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """Return batch size and flush latency counters"""
+        with cls._condition:
+            stats = dict(cls._stats)
+            stats['pending'] = len(cls._pending)
+
+        batches = stats['batches']
+        stats['avg_batch_size'] = round(stats['entries'] / batches, 2) if batches else 0
+        stats['avg_flush_ms'] = round(stats.pop('total_flush_ms') / batches, 3) if batches else 0
+        stats.update({
+            'running': cls._thread is not None and not cls._stopped,
+            'batch_size_limit': Config.HISTORY_BATCH_SIZE,
+            'flush_interval_seconds': Config.HISTORY_FLUSH_INTERVAL,
+            'fsync_policy': Config.HISTORY_FSYNC,
+            'max_pending': Config.HISTORY_MAX_PENDING
+        })
+        return stats
+
+    @classmethod
+    def _run(cls) -> None:
+        """Writer loop flushing on batch size or elapsed time"""
+        while True:
+            with cls._condition:
+                while not cls._stopped:
+                    now = time.monotonic()
+                    if cls._pending and now < cls._retry_at:
+                        # Wait before retrying a failed write
+                        cls._condition.wait(cls._retry_at - now)
+                        continue
+                    if len(cls._pending) >= Config.HISTORY_BATCH_SIZE:
+                        break
+                    if cls._pending or cls._snapshot_dirty or cls._unsynced:
+                        remaining = cls._dirty_since + Config.HISTORY_FLUSH_INTERVAL - now
+                        if remaining <= 0:
+                            break
+                        cls._condition.wait(remaining)
+                    else:
+                        cls._condition.wait()
+
+                if cls._stopped:
+                    # Final flush is done by stop()
+                    return
+
+            try:
+                cls.flush()
+            except Exception as e:
+                logger.error(f"Error flushing webhook history: {e}")
+
+    @classmethod
+    def _mark_dirty(cls) -> None:
+        """Start the flush timer if nothing was pending (caller holds the condition)"""
+        if not cls._pending and not cls._snapshot_dirty and not cls._unsynced:
+            cls._dirty_since = time.monotonic()
+
+    @classmethod
+    def _trim_pending(cls) -> None:
+        """Drop the oldest pending entries beyond HISTORY_MAX_PENDING (caller holds the condition)"""
+        excess = len(cls._pending) - Config.HISTORY_MAX_PENDING
+        if Config.HISTORY_MAX_PENDING > 0 and excess > 0:
+            del cls._pending[:excess]
+            cls._stats['dropped'] += excess
+            logger.error(f"Dropped {excess} webhook history entries, more than "
+                         f"{Config.HISTORY_MAX_PENDING} are pending while writes fail")
+
+    @classmethod
+    def _should_fsync(cls) -> bool:
+        """Decide whether the current flush must fsync according to the policy"""
+        policy = Config.HISTORY_FSYNC
+        if policy == 'batch':
+            return True
+        if policy == 'interval':
+            now = time.monotonic()
+            if now - cls._last_fsync >= Config.HISTORY_FSYNC_INTERVAL:
+                cls._last_fsync = now
+                return True
+        return False
+
+    @classmethod
+    def _flush_batch(cls, batch: List[Dict[str, Any]], fsync: Optional[bool] = None) -> bool:
+        """
+        Write one batch of entries and update the counters (caller holds the flush lock).
+        A batch that cannot be written is put back in front of the pending entries.
+
+        Args:
+            batch: Entries to append
+            fsync: Force or skip the fsync, None follows HISTORY_FSYNC
+
+        Returns:
+            True if the batch was written
+        """
+        started = time.perf_counter()
+        try:
+            WebhookHistory.append_many(batch, fsync=cls._should_fsync() if fsync is None else fsync)
+        except Exception as e:
+            with cls._condition:
+                # Keep the entries ahead of newer ones and retry, waiting longer after every failure
+                cls._pending[:0] = batch
+                cls._trim_pending()
+                cls._write_failures += 1
+                retry_delay = min((Config.HISTORY_FLUSH_INTERVAL or 1.0) * 2 ** min(cls._write_failures, 10),
+                                  MAX_RETRY_DELAY)
+                cls._retry_at = time.monotonic() + retry_delay
+                cls._stats['errors'] += 1
+            logger.error(f"Error writing {len(batch)} webhook history entries, retrying in {retry_delay:.1f}s: {e}")
+            return False
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        with cls._condition:
+            cls._write_failures = 0
+            cls._retry_at = 0.0
+            stats = cls._stats
+            stats['batches'] += 1
+            stats['entries'] += len(batch)
+            stats['last_batch_size'] = len(batch)
+            stats['max_batch_size'] = max(stats['max_batch_size'], len(batch))
+            stats['last_flush_ms'] = round(elapsed_ms, 3)
+            stats['max_flush_ms'] = round(max(stats['max_flush_ms'], elapsed_ms), 3)
+            stats['total_flush_ms'] += elapsed_ms
+        return True
+
+    @classmethod
+    def _write_snapshot(cls, data: Dict[str, Any]) -> None:
+        """Persist the latest webhook snapshot (caller holds the flush lock)"""
+        file_path = os.path.join(Config.CONFIG_DIR, 'last_webhook_data.json')
+        try:
+            os.makedirs(Config.CONFIG_DIR, exist_ok=True)
+            atomic_write(file_path, lambda f: f.write(json.dumps(data, indent=4).encode('utf-8')))
+            with cls._condition:
+                cls._stats['snapshot_writes'] += 1
+        except Exception as e:
+            with cls._condition:
+                cls._stats['errors'] += 1
+            logger.error(f"Error saving latest webhook data: {e}")
@@ -0,0 +1,328 @@
+"""
+Offset index for the webhook history log.
+A sidecar file records the byte offset and the filterable fields of every
+history line, so queries seek straight to matching entries instead of
+parsing the whole log.
+"""
+import os
+import json
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, Callable, BinaryIO
+
+from app.core.config import logger
+
+
+# Entry fields that can be used as query filters
+INDEXED_FIELDS = ('service_type', 'event_type', 'download_id', 'instance_name')
+
+
+class HistoryIndex:
+    """
+    In-memory offset index for one history log, persisted as a sidecar file.
+    Positions are 0-based line numbers of the indexed entries in the log.
+    Offsets always refer to the uncompressed log content.
+    """
+
+    def __init__(self, log_file: str, index_file: Optional[str] = None,
+                 opener: Optional[Callable[[str], BinaryIO]] = None):
+        """
+        Args:
+            log_file: Path of the history log
+            index_file: Path of the sidecar file (defaults to log_file + '.idx')
+            opener: Function opening the log for binary reading, for compressed logs
+        """
+        self.log_file = log_file
+        self.index_file = index_file or log_file + '.idx'
+        self.opener = opener
+        self._handle = None
+        self._reset()
+
+    def _reset(self) -> None:
+        """Clear all in-memory index data"""
+        self.offsets = array('q')
+        self.lengths = array('l')
+        self.timestamps = array('d')
+        self._field_values = {field: array('l') for field in INDEXED_FIELDS}
+        self._value_ids: Dict[str, Dict[str, int]] = {field: {} for field in INDEXED_FIELDS}
+        self._postings: Dict[str, Dict[int, array]] = {field: {} for field in INDEXED_FIELDS}
+        self.end_offset = 0  # Number of log bytes covered by the index
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @property
+    def first_timestamp(self) -> Optional[float]:
+        """Timestamp of the oldest indexed entry"""
+        return self.timestamps[0] if self.timestamps else None
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        """Timestamp of the newest indexed entry"""
+        return self.timestamps[-1] if self.timestamps else None
+
+    @staticmethod
+    def describe_entry(entry: Dict[str, Any]) -> Tuple[float, Dict[str, Optional[str]]]:
+        """
+        Extract the timestamp and indexed fields of a history entry
+
+        Args:
+            entry: History entry as written to the log
+
+        Returns:
+            Tuple of (epoch timestamp, field values)
+        """
+        data = entry.get('data') or {}
+        if not isinstance(data, dict):
+            data = {}
+
+        try:
+            timestamp = datetime.fromisoformat(entry.get('timestamp', '')).timestamp()
+        except (TypeError, ValueError):
+            timestamp = 0.0
+
+        # Entries written before service types were recorded are detected from content
+        service_type = entry.get('service_type')
+        if not service_type:
+            if 'movie' in data:
+                service_type = 'radarr'
+            elif 'series' in data or 'episodes' in data:
+                service_type = 'sonarr'
+
+        fields = {
+            'service_type': service_type,
+            'event_type': data.get('eventType'),
+            'download_id': data.get('downloadId'),
+            'instance_name': data.get('instanceName'),
+        }
+        return timestamp, fields
+
+    @staticmethod
+    def normalize(value: Any) -> Optional[str]:
+        """Normalize a field value for case-insensitive matching"""
+        if value is None or value == '':
+            return None
+        return str(value).lower()
+
+    def load(self, sealed: bool = False) -> None:
+        """
+        Load the sidecar index and index any log lines it does not cover yet.
+        The sidecar is rebuilt from scratch if it does not match the log.
+
+        Args:
+            sealed: True for closed segments that no longer receive appends;
+                    a complete sidecar is then trusted without checking the log
+        """
+        self._reset()
+        if not os.path.exists(self.log_file):
+            # Nothing to index, drop any sidecar left from a removed log
+            if os.path.exists(self.index_file):
+                os.remove(self.index_file)
+            return
+        log_size = os.path.getsize(self.log_file)
+
+        good_bytes = 0
+        if os.path.exists(self.index_file):
+            with open(self.index_file, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        offset, length, timestamp, *values = json.loads(line)
+                    except (ValueError, TypeError):
+                        break
+                    self._add_record(offset, length, timestamp, dict(zip(INDEXED_FIELDS, values)))
+                    good_bytes += len(line)
+
+        if sealed:
+            if good_bytes and good_bytes == os.path.getsize(self.index_file):
+                return
+            logger.warning(f"History index {self.index_file} is incomplete, rebuilding")
+            self._reset()
+            with open(self.index_file, 'wb'):
+                pass
+            self._catch_up()
+            self.close()
+            return
+
+        if self.end_offset > log_size or not self._ends_on_line_boundary():
+            logger.warning(f"History index {self.index_file} does not match the log, rebuilding")
+            self._reset()
+            good_bytes = 0
+
+        # Drop any partially written or corrupted tail of the sidecar
+        with open(self.index_file, 'ab') as f:
+            f.truncate(good_bytes)
+
+        if self.end_offset < log_size:
+            self._catch_up()
+
+    def add(self, offset: int, length: int, entry: Dict[str, Any]) -> None:
+        """
+        Index a history entry that was just appended to the log
+
+        Args:
+            offset: Byte offset of the entry line in the log
+            length: Length of the entry line in bytes, including the newline
+            entry: The history entry
+        """
+        timestamp, fields = self.describe_entry(entry)
+        record = self._add_record(offset, length, timestamp, fields)
+        handle = self._get_handle()
+        handle.write(json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n')
+
+    def flush(self) -> None:
+        """Flush buffered sidecar records"""
+        if self._handle is not None:
+            self._handle.flush()
+
+    def close(self) -> None:
+        """Close the sidecar append handle"""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def find(self, limit: int, before: Optional[int] = None, since: Optional[float] = None,
+             until: Optional[float] = None, **filters) -> List[int]:
+        """
+        Find matching entry positions, newest first
+
+        Args:
+            limit: Maximum number of positions to return
+            before: Only return positions lower than this one (pagination cursor)
+            since: Only return entries at or after this epoch timestamp
+            until: Only return entries at or before this epoch timestamp
+            **filters: Field values to match, keyed by INDEXED_FIELDS names
+
+        Returns:
+            List of matching positions in descending order
+        """
+        high = len(self.offsets) if before is None else min(before, len(self.offsets))
+        if until is not None:
+            high = min(high, bisect_right(self.timestamps, until))
+        low = bisect_left(self.timestamps, since) if since is not None else 0
+
+        wanted = {}
+        for field, value in filters.items():
+            value = self.normalize(value)
+            if value is None:
+                continue
+            value_id = self._value_ids[field].get(value)
+            if value_id is None:
+                return []
+            wanted[field] = value_id
+
+        if not wanted:
+            return list(range(high - 1, max(low, high - limit) - 1, -1))
+
+        # Walk the shortest posting list and check the other fields per entry
+        driver = min(wanted, key=lambda field: len(self._postings[field][wanted[field]]))
+        postings = self._postings[driver][wanted[driver]]
+
+        results = []
+        i = bisect_left(postings, high) - 1
+        while i >= 0 and len(results) < limit:
+            position = postings[i]
+            if position < low:
+                break
+            if all(self._field_values[field][position] == value_id for field, value_id in wanted.items()):
+                results.append(position)
+            i -= 1
+        return results
+
+    def read(self, positions: List[int]) -> List[Dict[str, Any]]:
+        """
+        Read the entries at the given positions by seeking into the log
+
+        Args:
+            positions: Entry positions as returned by find
+
+        Returns:
+            History entries in the same order, None for entries that cannot be parsed
+        """
+        entries = {}
+        with self.open_log() as f:
+            # Read in file order so compressed logs are only decompressed forwards
+            for position in sorted(positions):
+                f.seek(self.offsets[position])
+                try:
+                    entries[position] = json.loads(f.read(self.lengths[position]))
+                except ValueError:
+                    logger.warning(f"Skipping corrupted history entry at offset {self.offsets[position]}")
+                    entries[position] = None
+        return [entries[position] for position in positions]
+
+    def _add_record(self, offset: int, length: int, timestamp: float,
+                    fields: Dict[str, Optional[str]]) -> list:
+        """Add one entry to the in-memory structures and return its sidecar record"""
+        position = len(self.offsets)
+
+        # Keep timestamps sorted so time ranges can be bisected
+        if self.timestamps and timestamp < self.timestamps[-1]:
+            timestamp = self.timestamps[-1]
+
+        self.offsets.append(offset)
+        self.lengths.append(length)
+        self.timestamps.append(timestamp)
+        self.end_offset = offset + length
+
+        record = [offset, length, timestamp]
+        for field in INDEXED_FIELDS:
+            value = self.normalize(fields.get(field))
+            record.append(value)
+            if value is None:
+                self._field_values[field].append(-1)
+                continue
+
+            value_ids = self._value_ids[field]
+            value_id = value_ids.get(value)
+            if value_id is None:
+                value_id = value_ids[value] = len(value_ids)
+                self._postings[field][value_id] = array('l')
+            self._field_values[field].append(value_id)
+            self._postings[field][value_id].append(position)
+
+        return record
+
+    def _ends_on_line_boundary(self) -> bool:
+        """Check that the indexed region of the log ends with a complete line"""
+        if self.end_offset == 0:
+            return True
+        with open(self.log_file, 'rb') as f:
+            f.seek(self.end_offset - 1)
+            return f.read(1) == b'\n'
+
+    def _catch_up(self) -> None:
+        """Index complete log lines written after the last indexed entry"""
+        added = 0
+        with self.open_log() as f:
+            f.seek(self.end_offset)
+            offset = self.end_offset
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # Partially written line, index it once it is complete
+                    break
+                if line.strip():
+                    try:
+                        self.add(offset, len(line), json.loads(line))
+                        added += 1
+                    except ValueError:
+                        logger.warning(f"Skipping corrupted history line at offset {offset}")
+                offset += len(line)
+        self.flush()
+
+        if added:
+            logger.info(f"Indexed {added} webhook history entries in {self.index_file}")
+
+    def open_log(self) -> BinaryIO:
+        """Open the log for binary reading"""
+        if self.opener is not None:
+            return self.opener(self.log_file)
+        return open(self.log_file, 'rb')
+
+    def _get_handle(self):
+        """Open the sidecar file for appending"""
+        if self._handle is None:
+            self._handle = open(self.index_file, 'ab')
+        return self._handle
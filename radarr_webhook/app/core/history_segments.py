@@ -0,0 +1,157 @@
+"""
+Segment management for the webhook history log.
+The history is split into numbered segments: one live segment receiving
+appends and closed segments that are compressed and pruned by retention.
+"""
+import io
+import os
+import re
+import gzip
+import shutil
+from typing import Optional, Callable, BinaryIO, List
+
+from app.core.config import Config, logger
+from app.core.durable import atomic_write
+from app.core.history_index import HistoryIndex
+
+# zstandard is optional, gzip is used when it is not installed
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# File extensions of compressed segments
+COMPRESSED_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+
+
+def get_compression() -> Optional[str]:
+    """
+    Resolve the compression used for closed segments
+
+    Returns:
+        'zstd', 'gzip' or None when compression is disabled
+    """
+    compression = Config.HISTORY_COMPRESSION
+    if compression == 'none':
+        return None
+    if compression == 'auto':
+        return 'zstd' if zstandard is not None else 'gzip'
+    if compression == 'zstd' and zstandard is None:
+        logger.warning("zstandard is not installed, compressing history segments with gzip")
+        return 'gzip'
+    return compression
+
+
+def _open_gzip(path: str) -> BinaryIO:
+    return gzip.open(path, 'rb')
+
+
+def _open_zstd(path: str) -> BinaryIO:
+    return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True))
+
+
+def get_opener(path: str) -> Optional[Callable[[str], BinaryIO]]:
+    """Get the function opening a segment file, or None for plain files"""
+    if path.endswith(COMPRESSED_EXTENSIONS['gzip']):
+        return _open_gzip
+    if path.endswith(COMPRESSED_EXTENSIONS['zstd']):
+        return _open_zstd
+    return None
+
+
+class HistorySegment:
+    """
+    One numbered file of the webhook history together with its offset index
+    """
+
+    def __init__(self, number: int, log_file: str, index_file: str):
+        self.number = number
+        self.index = HistoryIndex(log_file, index_file, opener=get_opener(log_file))
+
+    @property
+    def log_file(self) -> str:
+        return self.index.log_file
+
+    @property
+    def compressed(self) -> bool:
+        return self.index.opener is not None
+
+    def open(self) -> BinaryIO:
+        """Open the segment for binary reading"""
+        return self.index.open_log()
+
+    def size(self) -> int:
+        """Size of the segment file on disk"""
+        try:
+            return os.path.getsize(self.log_file)
+        except OSError:
+            return 0
+
+    def compress(self, compression: str) -> str:
+        """
+        Write a compressed copy of the segment
+
+        Args:
+            compression: 'gzip' or 'zstd'
+
+        Returns:
+            Path of the compressed file
+        """
+        target = self.log_file + COMPRESSED_EXTENSIONS[compression]
+
+        def write_compressed(raw):
+            with open(self.log_file, 'rb') as src:
+                if compression == 'zstd':
+                    zstandard.ZstdCompressor(level=3).copy_stream(src, raw)
+                else:
+                    with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6) as dst:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+        atomic_write(target, write_compressed)
+        return target
+
+    def use_file(self, log_file: str) -> None:
+        """Point the segment at a different file holding the same content"""
+        self.index.log_file = log_file
+        self.index.opener = get_opener(log_file)
+
+    def remove(self) -> None:
+        """Delete the segment and its index"""
+        self.index.close()
+        for path in (self.log_file, self.index.index_file):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def discover_segments(directory: str, stem: str) -> List[HistorySegment]:
+    """
+    Find closed segments on disk, oldest first
+
+    Args:
+        directory: Directory holding the history
+        stem: History file name without the .jsonl extension
+
+    Returns:
+        List of closed segments
+    """
+    pattern = re.compile(rf'^{re.escape(stem)}\.(\d+)\.jsonl(\.gz|\.zst)?$')
+    files = {}
+    for name in os.listdir(directory) if os.path.isdir(directory) else []:
+        match = pattern.match(name)
+        if match:
+            files.setdefault(int(match.group(1)), []).append(name)
+
+    segments = []
+    for number in sorted(files):
+        names = sorted(files[number], key=len)
+        if len(names) > 1:
+            # Compression finished but the plain file was not removed yet
+            for name in names[:-1]:
+                os.remove(os.path.join(directory, name))
+        log_file = os.path.join(directory, names[-1])
+        index_file = os.path.join(directory, f"{stem}.{number:06d}.idx")
+        segments.append(HistorySegment(number, log_file, index_file))
+    return segments
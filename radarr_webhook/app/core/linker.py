@@ -0,0 +1,213 @@
+"""
+Link executor module for download monitoring.
+Links the files of one pass into the library on a shared, bounded thread
+pool. Destination directories are created once per pass instead of once per
+file, and the number of concurrent operations per source device is limited
+so a single slow disk or network share is not flooded. Whether files are
+hardlinked or copied is decided per device pair by the DeviceMap.
+"""
+import os
+import time
+import errno
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, NamedTuple, Tuple
+
+from app.core.config import Config, logger
+from app.core.copier import FileCopier
+from app.core.devices import DeviceMap, HARDLINK
+
+# Hardlink errors meaning the device pair cannot hardlink at all, other errors only affect one file
+HARDLINK_UNSUPPORTED_ERRORS = {errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOSYS}
+
+
+class LinkJob(NamedTuple):
+    """One file to link into the library"""
+    source_file: str
+    dest_base_dir: str
+    relative_path: str
+    size: int = 0
+
+
+class LinkExecutor:
+    """
+    Runs the link operations of a pass in parallel and keeps throughput counters
+    """
+    _lock = threading.Lock()
+    _pool: Optional[ThreadPoolExecutor] = None
+    _device_limits: Dict[int, threading.BoundedSemaphore] = {}
+    _stats = {
+        'passes': 0,
+        'files': 0,
+        'failed': 0,
+        'bytes': 0,
+        'seconds': 0.0,
+        'last_pass': None,
+    }
+
+    @classmethod
+    def link_files(cls, jobs: List[LinkJob], source_root: Optional[str] = None) -> List[bool]:
+        """
+        Link a batch of files, keeping the directory structure of each relative path
+
+        Args:
+            jobs: The files to link
+            source_root: Folder the download is in, used to look up its device once.
+                         Defaults to the folder of each source file.
+
+        Returns:
+            One success flag per job, in the same order
+        """
+        if not jobs:
+            return []
+
+        started = time.time()
+        dest_files = [os.path.join(job.dest_base_dir, job.relative_path) for job in jobs]
+
+        # Create every destination directory once for the whole pass
+        created_dirs = set()
+        for dest_file in dest_files:
+            dest_dir = os.path.dirname(dest_file)
+            if dest_dir not in created_dirs:
+                try:
+                    os.makedirs(dest_dir, exist_ok=True)
+                except OSError as e:
+                    logger.error(f"Error creating directory {dest_dir}: {e}")
+                created_dirs.add(dest_dir)
+
+        # The link strategy is chosen per device pair, looked up once per pair of roots
+        pairs: Dict[Tuple[str, str], Optional[Tuple[int, int]]] = {}
+        job_pairs = []
+        for job in jobs:
+            roots = (source_root or os.path.dirname(job.source_file), job.dest_base_dir)
+            if roots not in pairs:
+                pairs[roots] = DeviceMap.get_pair(*roots)
+            job_pairs.append(pairs[roots])
+
+        def run(index: int) -> bool:
+            pair = job_pairs[index]
+            with cls._get_device_limit(pair[0] if pair else -1):
+                return cls._link_file(jobs[index].source_file, dest_files[index], pair)
+
+        if len(jobs) == 1:
+            results = [run(0)]
+        else:
+            results = list(cls._get_pool().map(run, range(len(jobs))))
+
+        elapsed = time.time() - started
+        cls._record_pass(jobs, results, elapsed)
+        return results
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """Return pass and file counters with the overall throughput"""
+        with cls._lock:
+            stats = dict(cls._stats)
+            stats.update({
+                'workers': Config.LINK_WORKERS,
+                'device_concurrency': Config.LINK_DEVICE_CONCURRENCY,
+                'devices': len(cls._device_limits),
+                'files_per_second': round(stats['files'] / stats['seconds'], 1) if stats['seconds'] else None,
+            })
+            stats['seconds'] = round(stats['seconds'], 3)
+        return stats
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """Cancel running copies, wait for link operations and stop the thread pool"""
+        FileCopier.cancel_all()
+        with cls._lock:
+            pool = cls._pool
+            cls._pool = None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    @classmethod
+    def _get_pool(cls) -> ThreadPoolExecutor:
+        """Create the shared thread pool on first use"""
+        with cls._lock:
+            if cls._pool is None:
+                cls._pool = ThreadPoolExecutor(
+                    max_workers=max(1, Config.LINK_WORKERS),
+                    thread_name_prefix="link-worker"
+                )
+            return cls._pool
+
+    @classmethod
+    def _get_device_limit(cls, device: int) -> threading.BoundedSemaphore:
+        """Get the semaphore limiting concurrent operations on a source device"""
+        with cls._lock:
+            limit = cls._device_limits.get(device)
+            if limit is None:
+                limit = threading.BoundedSemaphore(max(1, Config.LINK_DEVICE_CONCURRENCY))
+                cls._device_limits[device] = limit
+            return limit
+
+    @staticmethod
+    def _link_file(source_file: str, dest_file: str, pair: Optional[Tuple[int, int]]) -> bool:
+        """
+        Create a hardlink, or a copy when the device pair does not support hardlinks
+
+        Args:
+            source_file: Full path to the source file
+            dest_file: Full path of the link
+            pair: Device pair from the DeviceMap, None if unknown
+
+        Returns:
+            True if the destination exists afterwards, False otherwise
+        """
+        try:
+            strategy, copy_strategy = DeviceMap.get_strategy(pair)
+            if strategy == HARDLINK:
+                try:
+                    os.link(source_file, dest_file)
+                    DeviceMap.record_hardlink(pair)
+                    return True
+                except FileExistsError:
+                    # Linked by an earlier pass
+                    return True
+                except FileNotFoundError:
+                    logger.warning(f"Source file disappeared before linking: {source_file}")
+                    return False
+                except OSError as e:
+                    logger.warning(f"Error creating hardlink for {os.path.basename(source_file)}: {e}")
+                    if e.errno in HARDLINK_UNSUPPORTED_ERRORS:
+                        # Cross-filesystem or unsupported, copy this and later files of the pair
+                        DeviceMap.disable_hardlinks(pair, e)
+                    # Otherwise only this file is affected (e.g. EMLINK, EACCES), copy just it
+            elif os.path.exists(dest_file):
+                # Copied by an earlier pass
+                return True
+
+            result = FileCopier.copy(source_file, dest_file, strategy=copy_strategy)
+            DeviceMap.record_copy(pair, result)
+            return True
+
+        except Exception as e:
+            logger.error(f"Error creating hardlink for {os.path.basename(source_file)}: {e}")
+            return False
+
+    @classmethod
+    def _record_pass(cls, jobs: List[LinkJob], results: List[bool], elapsed: float) -> None:
+        """Update the counters and log the throughput of a pass"""
+        linked = sum(1 for result in results if result)
+        linked_bytes = sum(job.size for job, result in zip(jobs, results) if result)
+        last_pass = {
+            'files': len(jobs),
+            'linked': linked,
+            'failed': len(jobs) - linked,
+            'bytes': linked_bytes,
+            'seconds': round(elapsed, 3),
+            'files_per_second': round(len(jobs) / elapsed, 1) if elapsed > 0 else None,
+        }
+
+        with cls._lock:
+            cls._stats['passes'] += 1
+            cls._stats['files'] += linked
+            cls._stats['failed'] += len(jobs) - linked
+            cls._stats['bytes'] += linked_bytes
+            cls._stats['seconds'] += elapsed
+            cls._stats['last_pass'] = last_pass
+
+        logger.info(f"Linked {linked}/{len(jobs)} files ({linked_bytes / (1024 * 1024):.1f} MB) "
+                    f"in {elapsed:.2f}s")
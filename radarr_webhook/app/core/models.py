@@ -2,12 +2,48 @@
 Base models for the application.
 These classes provide common structures used across both Radarr and Sonarr.
 """
+import time
 from datetime import datetime
 from typing import Dict, Any, Set, Optional, List
 
+from app.core.config import Config
+
+
+# Marker for lazily computed attributes that have not been computed yet
+UNSET = object()
+
+
+def project_raw_data(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Reduce a webhook payload to what an event keeps as raw_data,
+    according to Config.EVENT_RAW_DATA
+
+    Args:
+        data: Webhook payload
+
+    Returns:
+        The full payload, its top-level scalar fields, or None
+    """
+    mode = Config.EVENT_RAW_DATA
+    if mode == 'none':
+        return None
+    if mode == 'projected':
+        # Nested objects (movie, series, episodes, release, images) are parsed into models
+        return {key: value for key, value in data.items() if not isinstance(value, (dict, list))}
+    return data
+
+
+def extract_poster(images: Optional[List[Dict[str, Any]]]) -> Optional[str]:
+    """Return the URL of the first poster in a list of *arr images"""
+    for image in images or []:
+        if image.get('coverType') == 'poster':
+            return image.get('url')
+    return None
+
 
 class MediaItem:
     """Base class for media items (movies, series, episodes)"""
+    __slots__ = ('id', 'title', 'folder_path', 'tags')
     
     def __init__(self, data: Dict[str, Any] = None):
         data = data or {}
@@ -22,6 +58,7 @@ class MediaItem:
 
 class RemoteMedia:
     """Base class for remote media information (not yet downloaded)"""
+    __slots__ = ('title',)
     
     def __init__(self, data: Dict[str, Any] = None):
         data = data or {}
@@ -33,6 +70,11 @@ class RemoteMedia:
 
 class Release:
     """Model for media release information"""
+    __slots__ = (
+        'quality', 'quality_version', 'release_group', 'release_title', 'indexer', 'size',
+        'custom_format_score', 'custom_formats', 'indexer_flags', '_languages_data',
+        '_languages'
+    )
     
     def __init__(self, data: Dict[str, Any] = None):
         data = data or {}
@@ -45,18 +87,23 @@ class Release:
         self.custom_format_score = data.get('customFormatScore')
         self.custom_formats = data.get('customFormats', [])
         self.indexer_flags = data.get('indexerFlags', [])
-        self._languages = []
-        self._extract_languages(data)
+        self._languages_data = data.get('languages')
+        self._languages = UNSET
     
-    def _extract_languages(self, data: Dict[str, Any]) -> None:
+    def _extract_languages(self) -> List[str]:
         """Extract language information from release data"""
-        if 'languages' in data:
-            for lang in data['languages']:
-                if 'name' in lang:
-                    self._languages.append(lang['name'])
+        languages = []
+        for lang in self._languages_data or []:
+            if 'name' in lang:
+                languages.append(lang['name'])
+        return languages
     
     @property
     def languages(self) -> List[str]:
+        """Language names of the release, extracted on first access"""
+        if self._languages is UNSET:
+            self._languages = self._extract_languages()
+            self._languages_data = None
         return self._languages
     
     def __str__(self) -> str:
@@ -65,6 +112,11 @@ class Release:
 
 class ArrEvent:
     """Base class for all *Arr application events"""
+    __slots__ = (
+        'event_type', 'instance_name', 'application_url', 'is_upgrade', 'download_client',
+        'download_id', 'download_client_type', 'import_mode', '_release_data', '_release',
+        'media_type', 'raw_data'
+    )
     
     def __init__(self, data: Dict[str, Any] = None):
         data = data or {}
@@ -79,14 +131,23 @@ class ArrEvent:
         self.download_client_type = data.get('downloadClientType')
         self.import_mode = data.get('importMode')
         
-        # Release information
-        self.release = Release(data.get('release')) if data.get('release') else None
+        # Release information, parsed on first access
+        self._release_data = data.get('release')
+        self._release = UNSET
         
         # Set media type (to be overridden by subclasses)
         self.media_type = "unknown"
         
-        # Raw data for access to uncovered fields
-        self.raw_data = data
+        # Raw data for access to uncovered fields, see Config.EVENT_RAW_DATA
+        self.raw_data = project_raw_data(data)
+    
+    @property
+    def release(self) -> Optional[Release]:
+        """Release information of the event, parsed on first access"""
+        if self._release is UNSET:
+            self._release = Release(self._release_data) if self._release_data else None
+            self._release_data = None
+        return self._release
     
     def get_media_title(self) -> str:
         """
@@ -120,6 +181,13 @@ class ArrEvent:
 
 class DownloadInfo:
     """Class for tracking download progress and hardlinking operations"""
+    __slots__ = (
+        'media_title', 'media_folder', 'download_id', 'download_client', 'active',
+        'first_seen', 'last_check', 'processed_files', 'media_type', 'torrent_path',
+        'media_id', 'should_delete_files', 'should_delete_torrent', 'check_count',
+        'torrent_status', 'started_at', 'check_interval', 'last_progress', 'last_progress_at',
+        'completion_reported', 'completed_path'
+    )
     
     def __init__(self, media_title: str, media_folder: str, download_id: str, download_client: str):
         self.media_title = media_title
@@ -129,8 +197,18 @@ class DownloadInfo:
         self.active = True
         self.first_seen = datetime.now().isoformat()
         self.last_check = datetime.now().isoformat()
-        self.processed_files: Set[str] = set()
+        self.processed_files: Set[str] = set()  # Relative paths of the files already linked
         self.media_type = "unknown"  # Will be set to "movie" or "series"
+        self.check_count = 0
+        self.torrent_status = None  # (is_completed, torrent_info) from the last poll
+        self.completion_reported = False  # Set by the qBittorrent completion hook
+        self.completed_path: Optional[str] = None  # Content path reported with the completion
+        
+        # Adaptive scheduling state
+        self.started_at = time.time()
+        self.check_interval = 0.0
+        self.last_progress: Optional[float] = None
+        self.last_progress_at = self.started_at
         
         # New fields for torrent management
         self.torrent_path = None
@@ -138,6 +216,11 @@ class DownloadInfo:
         self.should_delete_files = False
         self.should_delete_torrent = False
     
+    @property
+    def download_path(self) -> Optional[str]:
+        """Folder or file the torrent is downloaded to, None until it is located"""
+        return self.torrent_path
+    
     def update_check_time(self):
         """Update the last check timestamp"""
         self.last_check = datetime.now().isoformat()
@@ -150,6 +233,12 @@ class DownloadInfo:
         """Check if a file has already been processed"""
         return file_path in self.processed_files
     
+    def record_progress(self, progress: float) -> None:
+        """Remember when the torrent progress last changed"""
+        if progress != self.last_progress:
+            self.last_progress = progress
+            self.last_progress_at = time.time()
+    
     def deactivate(self):
         """Mark this download as inactive"""
         self.active = False 
\ No newline at end of file
@@ -4,18 +4,33 @@ Base implementation for both Radarr and Sonarr.
 """
 import os
 import time
-import threading
 import traceback
-from typing import Dict, Any, Set, Type, List
+from typing import Dict, Any, Set, Type, List, Optional, Tuple
 
 from app.core.config import Config, logger
 from app.core.models import DownloadInfo, ArrEvent
 from app.core.storage import FileOperations, DownloadLocator, TorrentStorage
+from app.core.scheduler import MonitorScheduler
+from app.core.watcher import FileWatcher
+from app.core.linker import LinkExecutor, LinkJob
+from app.core.deleter import DeletionQueue
 
 
 # Global storage for active downloads
 active_downloads: Dict[str, DownloadInfo] = {}
 
+# Seconds to wait before retrying when the torrent folder cannot be located
+FOLDER_RETRY_DELAY = 30
+
+# qBittorrent states of torrents that are not downloading
+IDLE_STATES = {
+    'stalledDL', 'queuedDL', 'pausedDL', 'stoppedDL', 'metaDL', 'forcedMetaDL',
+    'checkingDL', 'checkingResumeData', 'allocating', 'moving', 'error', 'missingFiles'
+}
+
+# ETA reported by qBittorrent for torrents that are not expected to finish
+INFINITE_ETA = 8640000
+
 # Initialize torrent storage
 TorrentStorage.initialize()
 
@@ -86,38 +101,34 @@ class DownloadMonitor:
                 media_type=event.media_type
             )
             
-            # If we're using qBittorrent API, immediately try to process files
-            if Config.QBITTORRENT_ENABLED and Config.QBITTORRENT_USE_API:
-                logger.info(f"Attempting immediate file processing for {media_title}")
-                try:
-                    from app.services.qbittorrent import QBittorrentClient
-                    qbt = QBittorrentClient()
-                    
-                    # Check if torrent already exists and has some files
-                    is_completed, _ = qbt.get_torrent_status(download_id)
-                    files = qbt.get_torrent_files(download_id)
-                    
-                    if files:
-                        # Process files that are already available
-                        DownloadMonitor.process_download_folder(download_id)
-                        
-                        # If torrent is already completed, no need to monitor
-                        if is_completed:
-                            logger.info(f"Torrent already completed, no monitoring needed for {media_title}")
-                            return True
-                except Exception as e:
-                    logger.error(f"Error during immediate file processing: {e}")
-        
-        # Add to active downloads dictionary
+        # Add to active downloads dictionary, file processing looks the download up there
         active_downloads[download_id] = download_info
         
-        # Start monitoring in a separate thread
-        thread = threading.Thread(
-            target=DownloadMonitor.monitor_download,
-            args=(download_id,),
-            daemon=True
-        )
-        thread.start()
+        # If we're using qBittorrent API, immediately try to process files
+        if torrent_path and Config.QBITTORRENT_ENABLED and Config.QBITTORRENT_USE_API:
+            logger.info(f"Attempting immediate file processing for {media_title}")
+            try:
+                # Check if torrent already exists and has some files
+                is_completed, torrent_info = DownloadLocator.get_torrent_status(download_id) or (False, {})
+                files = DownloadLocator.get_download_files(download_id, torrent_info)
+                
+                if files:
+                    # Process files that are already available
+                    DownloadMonitor.process_download_folder(download_id, torrent_info)
+                    
+                    # If torrent is already completed, no need to monitor
+                    if is_completed:
+                        logger.info(f"Torrent already completed, no monitoring needed for {media_title}")
+                        download_info.deactivate()
+                        DownloadMonitor._finish_monitoring(download_id)
+                        return True
+            except Exception as e:
+                logger.error(f"Error during immediate file processing: {e}")
+        
+        # Schedule the first check right away
+        MonitorScheduler.start(DownloadMonitor.check_download, DownloadMonitor.poll_downloads)
+        FileWatcher.start(DownloadMonitor.process_files, DownloadMonitor._rescan_downloads)
+        MonitorScheduler.schedule(download_id)
         
         logger.info(f"Started monitoring download for {media_title} (ID: {download_id})")
         return True
@@ -132,13 +143,76 @@ class DownloadMonitor:
             return False
             
         if download_id in active_downloads:
-            # Mark download as inactive to stop monitoring
+            # Mark download as inactive and let the scheduler stop monitoring now
             active_downloads[download_id].deactivate()
+            MonitorScheduler.schedule(download_id)
             logger.info(f"Download completed for {event.get_media_title()}, stopping monitor")
             return True
         
         return False
     
+    @staticmethod
+    def handle_torrent_completed(torrent_hash: str, content_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Handle a completion notification from qBittorrent by queueing the final
+        linking pass. The pass runs on a monitor worker as the next check of the
+        download, after any check already running, and retires the download.
+        
+        Args:
+            torrent_hash: The hash of the completed torrent (%I)
+            content_path: The content path reported by qBittorrent (%F), if any
+            
+        Returns:
+            Dictionary describing what was queued
+        """
+        # Download IDs keep the case sent by Radarr/Sonarr
+        download_id = next((key for key in list(active_downloads) if key.lower() == torrent_hash.lower()), None)
+        if not download_id:
+            logger.info(f"Completed torrent {torrent_hash} is not monitored, ignoring")
+            return {'hash': torrent_hash, 'monitored': False}
+        
+        download_info = active_downloads[download_id]
+        logger.info(f"qBittorrent reported {download_info.media_title} ({download_id}) as completed")
+        
+        download_info.completed_path = content_path
+        download_info.completion_reported = True
+        MonitorScheduler.schedule(download_id)
+        
+        return {
+            'hash': torrent_hash,
+            'monitored': True,
+            'queued': True,
+            'download_id': download_id,
+            'media_title': download_info.media_title
+        }
+    
+    @staticmethod
+    def _run_final_pass(download_id: str, download_info: DownloadInfo,
+                        torrent_info: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Link the files of a completed download one last time and stop monitoring it
+        
+        Args:
+            download_id: The download ID
+            download_info: The monitored download
+            torrent_info: Torrent status from qBittorrent, None if unknown
+        """
+        content_path = download_info.completed_path
+        if content_path and os.path.exists(content_path):
+            torrent_folder = content_path
+        else:
+            torrent_folder = DownloadLocator.find_torrent_folder(download_id, torrent_info)
+        
+        if torrent_folder:
+            download_info.torrent_path = torrent_folder
+            DownloadMonitor.process_download_folder(download_id, torrent_info)
+        else:
+            logger.warning(f"Could not locate torrent folder for completed download {download_id}")
+        
+        logger.info(f"Final pass for {download_info.media_title} linked {len(download_info.processed_files)} files")
+        download_info.deactivate()
+        DownloadMonitor._finish_monitoring(download_id)
+    
     @staticmethod
     def handle_delete_event(event: ArrEvent) -> bool:
         """
@@ -156,109 +230,209 @@ class DownloadMonitor:
             return False
             
         # Find all torrents associated with this media
-        found_torrents = []
-        for torrent_hash, info in TorrentStorage.get_all_torrents().items():
-            if info.get('media_id') == media_id:
-                found_torrents.append(torrent_hash)
+        # Movie and series IDs are separate sequences, only match torrents of the same type
+        found_torrents = [dict(info, hash=torrent_hash) for torrent_hash, info
+                          in TorrentStorage.get_torrents_for_media(media_id, media_type=event.media_type).items()]
                 
         if not found_torrents:
             logger.warning(f"No torrents found for media ID {media_id}")
             return False
-            
-        success = True
-        for torrent_hash in found_torrents:
-            torrent_info = TorrentStorage.get_torrent_info(torrent_hash)
-            if not torrent_info:
-                continue
-                
-            # Delete from qBittorrent if enabled
-            if Config.QBITTORRENT_ENABLED and Config.QBITTORRENT_USE_API:
-                from app.services.qbittorrent import QBittorrentClient
-                qbt = QBittorrentClient()
-                if not qbt.delete_torrent(torrent_hash, with_files=True):
-                    success = False
-            
-            # Delete the torrent path if it exists and not already deleted by qBittorrent
-            torrent_path = torrent_info.get('torrent_path')
-            if torrent_path and os.path.exists(torrent_path):
-                if not FileOperations.delete_file_or_folder(torrent_path):
-                    success = False
-            
-            # Remove from storage
-            TorrentStorage.delete_torrent_info(torrent_hash)
-            
-        return success
+        
+        # Removing torrents and files can take minutes, leave it to the deletion worker
+        DeletionQueue.enqueue(found_torrents, media_id=media_id, media_title=event.get_media_title())
+        return True
     
     @staticmethod
-    def monitor_download(download_id: str) -> None:
+    def check_download(download_id: str) -> Optional[float]:
         """
-        Monitor a download and create hardlinks for new files as they appear
+        Run one monitoring check of a download and create hardlinks for new files.
+        Called by the MonitorScheduler whenever the download is due.
+        
+        Args:
+            download_id: The download ID
+            
+        Returns:
+            Seconds until the next check, or None when monitoring is finished
         """
-        if download_id not in active_downloads:
+        download_info = active_downloads.get(download_id)
+        if not download_info:
             logger.error(f"Download ID {download_id} not found in active downloads")
-            return
-            
-        download_info = active_downloads[download_id]
-        logger.info(f"Starting monitor for {download_info.media_title} with ID {download_id}")
+            return None
         
-        check_count = 0
+        # Stop once the download is marked inactive
+        if not download_info.active:
+            DownloadMonitor._finish_monitoring(download_id)
+            return None
         
-        # Monitor until the download is marked inactive or max checks reached
-        while (download_info.active and 
-               check_count < Config.MAX_MONITOR_CHECKS):
-            
-            check_count += 1
+        if download_info.check_count == 0:
+            logger.info(f"Starting monitor for {download_info.media_title} with ID {download_id}")
+        download_info.check_count += 1
+        
+        # Use the status fetched by poll_downloads, or query it if polling failed
+        torrent_status = download_info.torrent_status
+        download_info.torrent_status = None
+        if download_info.completion_reported and Config.QBITTORRENT_ENABLED and Config.QBITTORRENT_USE_API:
+            # Reported by the completion hook, the mirror and the poll may predate it
+            from app.services.qbittorrent import QBittorrentClient
+            qbt = QBittorrentClient()
+            if qbt.sync:
+                qbt.sync.refresh(force=True)
+            torrent_status = None
+        if torrent_status is None and Config.QBITTORRENT_ENABLED and Config.QBITTORRENT_USE_API:
+            torrent_status = DownloadLocator.get_torrent_status(download_id)
+        is_completed, torrent_info = torrent_status if torrent_status else (False, None)
+        
+        if torrent_info:
+            download_info.record_progress(torrent_info.get('progress', 0))
+        
+        # Check if torrent is completed via the completion hook or the qBittorrent API
+        if download_info.completion_reported or is_completed:
+            if not download_info.completion_reported:
+                logger.info(f"Torrent {download_id} is completed according to qBittorrent API")
+            # Process one last time to catch final files, then stop monitoring
+            DownloadMonitor._run_final_pass(download_id, download_info, torrent_info)
+            return None
+        
+        # Give up on downloads that take too long or stopped making progress
+        give_up_reason = DownloadMonitor._get_give_up_reason(download_info, torrent_info)
+        if give_up_reason:
+            logger.warning(f"Giving up on {download_info.media_title}: {give_up_reason}")
+            download_info.deactivate()
+            DownloadMonitor._finish_monitoring(download_id)
+            return None
+        
+        # Get torrent folder
+        torrent_folder = DownloadLocator.find_torrent_folder(download_id, torrent_info)
+        
+        if not torrent_folder:
+            logger.warning(f"Could not locate torrent folder for {download_id}")
+            return FOLDER_RETRY_DELAY
             
-            # Check if torrent is completed via qBittorrent API
-            if Config.QBITTORRENT_ENABLED and Config.QBITTORRENT_USE_API:
-                if DownloadLocator.is_torrent_completed(download_id):
-                    logger.info(f"Torrent {download_id} is completed according to qBittorrent API")
-                    # Process one last time to catch final files
-                    torrent_folder = DownloadLocator.find_torrent_folder(download_id)
-                    if torrent_folder:
-                        DownloadMonitor.process_download_folder(download_id)
-                    # Mark as inactive and stop monitoring
-                    download_info.deactivate()
-                    break
+        download_info.torrent_path = torrent_folder
+        if os.path.normpath(torrent_folder) == os.path.normpath(Config.DOWNLOAD_PATH):
+            # Not located yet, never watch the whole downloads tree
+            FileWatcher.unwatch(download_id)
+        elif os.path.exists(torrent_folder):
+            # Link files as soon as they are written, the checks become a safety net.
+            # Watching again after a move replaces the watches of the old folder.
+            FileWatcher.watch(download_id, torrent_folder)
+        logger.info(f"Check #{download_info.check_count}: Scanning {torrent_folder} for new files")
+        
+        try:
+            DownloadMonitor.process_download_folder(download_id, torrent_info)
+        except Exception as e:
+            logger.error(f"Error processing download folder: {e}")
             
-            # Get torrent folder
-            torrent_folder = DownloadLocator.find_torrent_folder(download_id)
+        # Update last check time
+        download_info.update_check_time()
+        
+        if not Config.MONITOR_POLLING_ENABLED:
+            # The download stays active until the completion hook or a Download event retires it
+            return None
+        
+        return DownloadMonitor._get_next_interval(download_info, torrent_info)
+    
+    @staticmethod
+    def _get_next_interval(download_info: DownloadInfo, torrent_info: Optional[Dict[str, Any]]) -> float:
+        """
+        Choose the delay before the next check from the torrent progress.
+        Idle torrents back off towards MONITOR_MAX_INTERVAL, torrents close
+        to completion are checked down to every MONITOR_MIN_INTERVAL seconds.
+        
+        Args:
+            download_info: The monitored download
+            torrent_info: Torrent status from qBittorrent, None if unknown
             
-            if not torrent_folder:
-                logger.warning(f"Could not locate torrent folder for {download_id}")
-                time.sleep(30)  # Wait before next check
-                continue
-                
-            logger.info(f"Check #{check_count}: Scanning {torrent_folder} for new files")
+        Returns:
+            Seconds until the next check
+        """
+        interval = Config.MONITOR_INTERVAL
+        if torrent_info:
+            state = torrent_info.get('state')
+            speed = torrent_info.get('dlspeed') or 0
+            eta = torrent_info.get('eta')
             
-            try:
-                DownloadMonitor.process_download_folder(download_id)
-            except Exception as e:
-                logger.error(f"Error processing download folder: {e}")
-                
-            # Update last check time
-            download_info.update_check_time()
+            if state in IDLE_STATES or speed <= 0:
+                # Stalled, queued or paused, back off a little more on every check
+                interval = max(download_info.check_interval, Config.MONITOR_INTERVAL) * Config.MONITOR_BACKOFF_FACTOR
+            elif eta is not None and 0 < eta < INFINITE_ETA:
+                # Check again halfway to the expected completion
+                interval = min(Config.MONITOR_INTERVAL, eta / 2)
+        
+        # Watched folders are linked on file events, checking them is only a safety net
+        if FileWatcher.is_watching(download_info.download_id):
+            interval = Config.MONITOR_MAX_INTERVAL
+        
+        interval = min(max(interval, Config.MONITOR_MIN_INTERVAL), Config.MONITOR_MAX_INTERVAL)
+        download_info.check_interval = interval
+        return interval
+    
+    @staticmethod
+    def _get_give_up_reason(download_info: DownloadInfo, torrent_info: Optional[Dict[str, Any]]) -> Optional[str]:
+        """
+        Check whether monitoring a download should stop before it completes
+        
+        Args:
+            download_info: The monitored download
+            torrent_info: Torrent status from qBittorrent, None if unknown
             
-            # Sleep before next check
-            time.sleep(Config.MONITOR_INTERVAL)
+        Returns:
+            The reason to give up, or None to keep monitoring
+        """
+        now = time.time()
+        if Config.MONITOR_MAX_DURATION and now - download_info.started_at > Config.MONITOR_MAX_DURATION * 3600:
+            return f"not completed after {Config.MONITOR_MAX_DURATION:g} hours"
         
-        # Log completion
-        if check_count >= Config.MAX_MONITOR_CHECKS:
-            logger.info(f"Reached maximum check count for {download_info.media_title}, stopping monitor")
-        else:
-            logger.info(f"Finished monitoring for {download_info.media_title}")
+        # Progress is only known from qBittorrent
+        if (torrent_info and Config.MONITOR_STALL_TIMEOUT
+                and now - download_info.last_progress_at > Config.MONITOR_STALL_TIMEOUT * 3600):
+            return f"no progress for {Config.MONITOR_STALL_TIMEOUT:g} hours"
+        return None
+    
+    @staticmethod
+    def poll_downloads(download_ids: List[str]) -> None:
+        """
+        Fetch the qBittorrent status of all downloads due for a check with a
+        single request and store it on each download for check_download.
+        Called by the MonitorScheduler once per tick.
         
-        # Remove from active downloads
-        if download_id in active_downloads:
-            active_downloads.pop(download_id)
+        Args:
+            download_ids: The download IDs due for a check
+        """
+        if not Config.QBITTORRENT_ENABLED or not Config.QBITTORRENT_USE_API:
+            return
+        
+        downloads = {download_id: active_downloads[download_id]
+                     for download_id in download_ids if download_id in active_downloads}
+        if not downloads:
+            return
+        
+        from app.services.qbittorrent import QBittorrentClient
+        statuses = QBittorrentClient().get_torrents_status(list(downloads))
+        if statuses is None:
+            # Leave the status unset so each check queries qBittorrent itself
+            return
+        
+        for download_id, download_info in downloads.items():
+            download_info.torrent_status = statuses.get(download_id.lower(), (False, {}))
     
     @staticmethod
-    def process_download_folder(download_id: str) -> None:
+    def _finish_monitoring(download_id: str) -> None:
+        """Remove a download from the active downloads once monitoring ends"""
+        download_info = active_downloads.pop(download_id, None)
+        FileWatcher.unwatch(download_id)
+        DownloadLocator.forget_download_files(download_id)
+        if download_info:
+            logger.info(f"Finished monitoring for {download_info.media_title}")
+    
+    @staticmethod
+    def process_download_folder(download_id: str, torrent_info: Optional[Dict[str, Any]] = None) -> None:
         """
-        Process a folder after download completion
+        Link the completed files of a download into the library
         
         Args:
             download_id: The download ID
+            torrent_info: Torrent status from qBittorrent, fetched if needed and not given
         """
         try:
             # Get download details from storage
@@ -270,123 +444,174 @@ class DownloadMonitor:
             logger.info(f"Processing download folder for '{download_info.media_title}' ({download_id})")
             
             # Make sure the download path exists
-            if not os.path.exists(download_info.download_path):
-                logger.error(f"Download path does not exist: {download_info.download_path}")
+            download_path = download_info.download_path
+            if download_path and not os.path.exists(download_path):
+                logger.error(f"Download path does not exist: {download_path}")
                 return
                 
             # Get list of files to process
-            all_files = DownloadLocator.get_download_files(download_id)
+            all_files = DownloadLocator.get_download_files(download_id, torrent_info, download_path)
             total_files = len(all_files)
-            processed_count = 0
-            skipped_count = 0
-            not_exists_count = 0
             
-            logger.info(f"Found {total_files} files in torrent '{download_info.media_title}'")
+            # Files linked by earlier passes are not looked at again
+            pending_files = [file_item for file_item in all_files
+                             if not download_info.is_file_processed(file_item["relativePath"])]
             
-            # Process each file
-            for file_item in all_files:
-                source_file = file_item["absolutePath"]
-                relative_path = file_item["relativePath"]
-                
-                # Skip if not a media file
-                if not DownloadMonitor._should_process_file(source_file, download_info.media_type):
-                    skipped_count += 1
-                    continue
-                    
-                # Skip if source file doesn't exist yet
-                if not os.path.exists(source_file):
-                    not_exists_count += 1
-                    continue
-                
-                # Create hardlink to the library folder
-                library_path = DownloadMonitor._get_library_path(download_info)
-                success = DownloadMonitor._create_hardlink_with_structure(source_file, library_path, relative_path)
-                if success:
-                    processed_count += 1
+            logger.info(f"Found {total_files} files in torrent '{download_info.media_title}', "
+                        f"{len(pending_files)} not linked yet")
+            
+            processed_count, skipped_count, incomplete_count = DownloadMonitor._link_files(download_info, pending_files)
             
             # Log summary
-            logger.info(f"Torrent '{download_info.media_title}': Processed {processed_count}/{total_files} files")
+            logger.info(f"Torrent '{download_info.media_title}': Linked {processed_count} new files, "
+                        f"{len(download_info.processed_files)}/{total_files} linked in total")
             if skipped_count > 0:
                 logger.info(f"Torrent '{download_info.media_title}': Skipped {skipped_count} non-media files")
-            if not_exists_count > 0:
-                logger.warning(f"Torrent '{download_info.media_title}': {not_exists_count} files do not exist yet, will retry later")
+            if incomplete_count > 0:
+                logger.info(f"Torrent '{download_info.media_title}': {incomplete_count} files are not complete yet, will retry later")
                 
         except Exception as e:
             logger.error(f"Error processing download folder: {e}")
             traceback.print_exc()
     
     @staticmethod
-    def _create_hardlink_with_structure(source_file: str, dest_base_dir: str, relative_path: str) -> bool:
+    def process_files(download_id: str, paths: List[str]) -> None:
+        """
+        Link specific files of a download, called by the FileWatcher when
+        files were written or moved into the download folder
+        
+        Args:
+            download_id: The download ID
+            paths: Absolute paths of the changed files
+        """
+        download_info = active_downloads.get(download_id)
+        if not download_info or not download_info.active:
+            return
+        
+        try:
+            wanted = {os.path.normpath(path) for path in paths}
+            all_files = DownloadLocator.get_download_files(download_id, download_path=download_info.download_path)
+            pending_files = [file_item for file_item in all_files
+                             if file_item["absolutePath"] in wanted
+                             and not download_info.is_file_processed(file_item["relativePath"])]
+            if not pending_files:
+                return
+            
+            processed_count, _, _ = DownloadMonitor._link_files(download_info, pending_files)
+            if processed_count:
+                logger.info(f"Torrent '{download_info.media_title}': Linked {processed_count} completed files")
+        except Exception as e:
+            logger.error(f"Error processing changed files of {download_id}: {e}")
+    
+    @staticmethod
+    def _rescan_downloads(download_ids: List[str]) -> None:
+        """Check downloads right away when file events may have been missed"""
+        for download_id in download_ids:
+            if download_id in active_downloads:
+                MonitorScheduler.schedule(download_id)
+    
+    @staticmethod
+    def _link_files(download_info: DownloadInfo, file_items: List[Dict[str, Any]]) -> Tuple[int, int, int]:
         """
-        Create a hardlink maintaining the directory structure from the torrent.
+        Link the complete media files among the given files into the library
         
         Args:
-            source_file: Full path to the source file
-            dest_base_dir: Base destination directory
-            relative_path: Relative path within the torrent
+            download_info: The monitored download
+            file_items: File entries as returned by DownloadLocator.get_download_files
             
         Returns:
-            True if successful, False otherwise
+            Tuple of (linked, skipped non-media, incomplete) file counts
         """
-        try:
-            # Create destination directory structure
-            dest_file = os.path.join(dest_base_dir, relative_path)
-            dest_dir = os.path.dirname(dest_file)
+        skipped_count = 0
+        incomplete_count = 0
+        library_path = DownloadMonitor._get_library_path(download_info)
+        
+        jobs = []
+        for file_item in file_items:
+            source_file = file_item["absolutePath"]
             
-            # Ensure the directory exists
-            if not os.path.exists(dest_dir):
-                os.makedirs(dest_dir, exist_ok=True)
-                
-            # Skip if destination file already exists
-            if os.path.exists(dest_file):
-                return True
+            # Skip if not a media file
+            if not DownloadMonitor._should_process_file(source_file, download_info.media_type,
+                                                        file_item.get("size")):
+                skipped_count += 1
+                continue
             
-            # Try to create hardlink
-            try:
-                os.link(source_file, dest_file)
-                return True
-            except OSError as e:
-                # If os.link fails (e.g., cross-filesystem), try using ln command
-                import subprocess
-                logger.debug(f"os.link failed for {os.path.basename(source_file)}, trying ln command: {e}")
-                result = subprocess.run(['ln', source_file, dest_file], 
-                                      capture_output=True, text=True)
-                
-                if result.returncode != 0:
-                    # If hardlink fails, try copy as fallback
-                    logger.warning(f"Error creating hardlink for {os.path.basename(source_file)}")
-                    logger.debug(f"Trying copy instead for {os.path.basename(source_file)}")
-                    subprocess.run(['cp', source_file, dest_file], check=True)
-                
-                return True
-                
-        except Exception as e:
-            logger.error(f"Error creating hardlink for {os.path.basename(source_file)}: {e}")
+            # Only link complete files, preallocated files exist long before they are done.
+            # Without qBittorrent the progress is unknown and the file must exist.
+            progress = file_item.get("progress")
+            if (progress is not None and progress < 1.0) or (progress is None and not os.path.exists(source_file)):
+                incomplete_count += 1
+                continue
+            
+            jobs.append(LinkJob(source_file, library_path, file_item["relativePath"], file_item.get("size") or 0))
+        
+        # Create the hardlinks into the library folder in parallel. Torrents share the
+        # device of the folder qBittorrent saves them in.
+        download_path = download_info.download_path
+        source_root = os.path.dirname(download_path.rstrip(os.sep)) if download_path else None
+        processed_count = 0
+        for job, success in zip(jobs, LinkExecutor.link_files(jobs, source_root)):
+            if success:
+                download_info.add_processed_file(job.relative_path)
+                processed_count += 1
+        
+        return processed_count, skipped_count, incomplete_count
+    
+    @staticmethod
+    def _should_process_file(file_path: str, media_type: str, size: Optional[int] = None) -> bool:
+        """
+        Check whether a file should be linked into the library
+        
+        Args:
+            file_path: Path of the file
+            media_type: Media type of the download ("movie" or "series")
+            size: Size of the file in bytes, if known
+            
+        Returns:
+            True for media and subtitle files, False otherwise
+        """
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension in Config.SUBTITLE_EXTENSIONS:
+            return True
+        if extension not in Config.MEDIA_EXTENSIONS:
             return False
+        
+        # Skip samples and other small media files
+        return size is None or size >= Config.MIN_FILE_SIZE
+    
+    @staticmethod
+    def _get_library_path(download_info: DownloadInfo) -> str:
+        """Get the library folder the files of a download are linked into"""
+        return download_info.media_folder
     
     @staticmethod
     def get_active_downloads_status() -> Dict[str, Any]:
         """
         Return status information about all active downloads
         """
+        downloads = dict(active_downloads)
+        
+        # Fetch the qBittorrent status of all downloads in one request
+        statuses = {}
+        if downloads and Config.QBITTORRENT_ENABLED and Config.QBITTORRENT_USE_API:
+            try:
+                from app.services.qbittorrent import QBittorrentClient
+                statuses = QBittorrentClient().get_torrents_status(list(downloads)) or {}
+            except Exception as e:
+                logger.error(f"Error getting qBittorrent status: {e}")
+        
         status = {}
-        for download_id, info in active_downloads.items():
+        for download_id, info in downloads.items():
             # Check if we have qBittorrent information for this download
             qbt_info = {}
-            if Config.QBITTORRENT_ENABLED and Config.QBITTORRENT_USE_API:
-                try:
-                    from app.services.qbittorrent import QBittorrentClient
-                    qbt = QBittorrentClient()
-                    is_completed, torrent_info = qbt.get_torrent_status(download_id)
-                    if torrent_info:
-                        qbt_info = {
-                            "progress": torrent_info.get("progress", 0) * 100,
-                            "state": torrent_info.get("state", "unknown"),
-                            "completed": is_completed,
-                            "name": torrent_info.get("name", "Unknown")
-                        }
-                except Exception as e:
-                    logger.error(f"Error getting qBittorrent status: {e}")
+            is_completed, torrent_info = statuses.get(download_id.lower(), (False, {}))
+            if torrent_info:
+                qbt_info = {
+                    "progress": torrent_info.get("progress", 0) * 100,
+                    "state": torrent_info.get("state", "unknown"),
+                    "completed": is_completed,
+                    "name": torrent_info.get("name", "Unknown")
+                }
                     
             # Build the status object
             status[download_id] = {
@@ -397,6 +622,7 @@ class DownloadMonitor:
                 "first_seen": info.first_seen,
                 "last_check": info.last_check,
                 "processed_files_count": len(info.processed_files),
+                "check_interval": info.check_interval,
                 "qbittorrent": qbt_info
             }
         return status
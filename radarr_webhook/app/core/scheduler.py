@@ -0,0 +1,280 @@
+"""
+Scheduler module for download monitoring.
+A single dispatcher thread keeps the next check deadline of every monitored
+download in a priority queue and hands due checks to a fixed pool of
+worker threads, so the thread count does not grow with the number of
+active downloads. Checks that fall due together are handed to an optional
+polling stage first, so their status can be fetched in one batch.
+"""
+import time
+import heapq
+import queue
+import atexit
+import itertools
+import threading
+from typing import Dict, Any, Optional, Callable, List, Set, Tuple
+
+from app.core.config import Config, logger
+
+
+class MonitorScheduler:
+    """
+    Deadline scheduler running periodic download checks on a worker pool.
+    The check callable takes a download ID and returns the number of seconds
+    until the next check, or None when the download no longer needs checking.
+    The optional prefetch callable receives all download IDs due in the same
+    tick before their checks run.
+    """
+    _condition = threading.Condition()
+    _heap: List[Tuple[float, int, str]] = []  # (deadline, sequence, download_id)
+    _deadlines: Dict[str, float] = {}  # Current deadline per download, older heap entries are stale
+    _running: Set[str] = set()
+    _cancelled: Set[str] = set()
+    _rerun: Dict[str, float] = {}  # Running download -> earliest deadline requested meanwhile
+    _sequence = itertools.count()
+    _check: Optional[Callable[[str], Optional[float]]] = None
+    _prefetch: Optional[Callable[[List[str]], None]] = None
+    _due: Optional[queue.Queue] = None
+    _dispatcher: Optional[threading.Thread] = None
+    _workers: List[threading.Thread] = []
+    _stopping = False
+    _stats = {
+        'checks': 0,
+        'failed': 0,
+        'ticks': 0,
+        'last_batch_size': 0,
+        'last_lag_seconds': 0.0,
+        'max_lag_seconds': 0.0,
+    }
+
+    @classmethod
+    def start(cls, check: Callable[[str], Optional[float]],
+              prefetch: Optional[Callable[[List[str]], None]] = None) -> None:
+        """
+        Start the dispatcher and the worker pool
+
+        Args:
+            check: Callable taking a download ID and returning the delay in
+                   seconds before its next check, or None to stop checking it
+            prefetch: Callable taking the list of download IDs due in a tick,
+                      run by the dispatcher before their checks are queued
+        """
+        with cls._condition:
+            if cls._dispatcher is not None:
+                return
+
+            cls._check = check
+            cls._prefetch = prefetch
+            cls._stopping = False
+            cls._due = queue.Queue()
+            cls._workers = []
+
+            for index in range(max(1, Config.MONITOR_WORKERS)):
+                worker = threading.Thread(
+                    target=cls._worker_loop,
+                    name=f"monitor-worker-{index}",
+                    daemon=True
+                )
+                worker.start()
+                cls._workers.append(worker)
+
+            cls._dispatcher = threading.Thread(
+                target=cls._dispatch_loop,
+                name="monitor-scheduler",
+                daemon=True
+            )
+            cls._dispatcher.start()
+
+        atexit.register(cls.shutdown)
+        logger.info(f"Monitor scheduler started with {len(cls._workers)} workers")
+
+    @classmethod
+    def schedule(cls, download_id: str, delay: float = 0.0) -> None:
+        """
+        Schedule a check for a download, replacing any pending one
+
+        Args:
+            download_id: The download ID to check
+            delay: Seconds to wait before the check
+        """
+        with cls._condition:
+            cls._cancelled.discard(download_id)
+            deadline = time.time() + delay
+            if download_id in cls._running:
+                # Checks of a download never overlap, run this one when the current check finishes
+                cls._rerun[download_id] = min(deadline, cls._rerun.get(download_id, deadline))
+                return
+            cls._push(download_id, deadline)
+
+    @classmethod
+    def cancel(cls, download_id: str) -> None:
+        """
+        Stop checking a download
+
+        Args:
+            download_id: The download ID
+        """
+        with cls._condition:
+            cls._deadlines.pop(download_id, None)
+            cls._rerun.pop(download_id, None)
+            if download_id in cls._running:
+                cls._cancelled.add(download_id)
+
+    @classmethod
+    def is_scheduled(cls, download_id: str) -> bool:
+        """Check whether a download has a pending or running check"""
+        with cls._condition:
+            return download_id in cls._deadlines or download_id in cls._running
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """Return the number of scheduled downloads, lag and counters"""
+        with cls._condition:
+            stats = dict(cls._stats)
+            next_deadline = min(cls._deadlines.values()) if cls._deadlines else None
+            stats.update({
+                'running': cls._dispatcher is not None,
+                'workers': len(cls._workers),
+                'scheduled': len(cls._deadlines),
+                'in_progress': len(cls._running),
+                'next_check_in_seconds': round(max(0.0, next_deadline - time.time()), 3)
+                if next_deadline is not None else None
+            })
+        return stats
+
+    @classmethod
+    def shutdown(cls, timeout: float = 10.0) -> None:
+        """
+        Stop the dispatcher and the workers. Pending checks are dropped.
+
+        Args:
+            timeout: Maximum number of seconds to wait for each thread
+        """
+        with cls._condition:
+            if cls._dispatcher is None:
+                return
+            cls._stopping = True
+            cls._condition.notify_all()
+            dispatcher = cls._dispatcher
+            workers = cls._workers
+            due = cls._due
+
+        dispatcher.join(timeout)
+        for _ in workers:
+            due.put(None)
+        for worker in workers:
+            worker.join(timeout)
+
+        with cls._condition:
+            cls._dispatcher = None
+            cls._workers = []
+            cls._due = None
+            cls._heap = []
+            cls._deadlines.clear()
+            cls._running.clear()
+            cls._rerun.clear()
+
+    @classmethod
+    def _push(cls, download_id: str, deadline: float) -> None:
+        """Add a deadline to the queue and wake the dispatcher (caller holds the lock)"""
+        cls._deadlines[download_id] = deadline
+        heapq.heappush(cls._heap, (deadline, next(cls._sequence), download_id))
+        if cls._heap[0][2] == download_id:
+            cls._condition.notify()
+
+    @classmethod
+    def _dispatch_loop(cls) -> None:
+        """Wait for the earliest deadline and hand due checks to the workers"""
+        while True:
+            with cls._condition:
+                batch = cls._wait_for_due()
+                if batch is None:
+                    return
+                cls._stats['ticks'] += 1
+                cls._stats['last_batch_size'] = len(batch)
+
+            # Poll outside the lock so scheduling is not blocked by the request
+            if cls._prefetch is not None:
+                try:
+                    cls._prefetch([download_id for download_id, _ in batch])
+                except Exception as e:
+                    logger.exception(f"Error polling {len(batch)} due downloads: {e}")
+
+            for item in batch:
+                cls._due.put(item)
+
+    @classmethod
+    def _wait_for_due(cls) -> Optional[List[Tuple[str, float]]]:
+        """
+        Wait until checks are due and take them off the queue (caller holds the lock)
+
+        Returns:
+            List of (download_id, deadline) tuples, or None when stopping
+        """
+        while not cls._stopping:
+            if not cls._heap:
+                cls._condition.wait()
+                continue
+
+            now = time.time()
+            if cls._heap[0][0] > now:
+                cls._condition.wait(cls._heap[0][0] - now)
+                continue
+
+            # Checks due within the batch window run early, so they share one poll
+            batch = []
+            horizon = now + Config.MONITOR_BATCH_WINDOW
+            while cls._heap and cls._heap[0][0] <= horizon:
+                deadline, _, download_id = heapq.heappop(cls._heap)
+                if cls._deadlines.get(download_id) != deadline:
+                    # Rescheduled or cancelled since this entry was pushed
+                    continue
+                del cls._deadlines[download_id]
+                cls._running.add(download_id)
+                batch.append((download_id, deadline))
+
+            if batch:
+                return batch
+        return None
+
+    @classmethod
+    def _worker_loop(cls) -> None:
+        """Run due checks until a stop sentinel is received"""
+        due = cls._due
+        while True:
+            item = due.get()
+            if item is None:
+                break
+            cls._run_check(*item)
+
+    @classmethod
+    def _run_check(cls, download_id: str, deadline: float) -> None:
+        """Run one check and schedule the next one"""
+        lag = max(0.0, time.time() - deadline)
+        delay = None
+        try:
+            delay = cls._check(download_id)
+            failed = False
+        except Exception as e:
+            logger.exception(f"Error checking download {download_id}: {e}")
+            delay = Config.MONITOR_INTERVAL
+            failed = True
+
+        with cls._condition:
+            cls._running.discard(download_id)
+            cls._stats['checks'] += 1
+            if failed:
+                cls._stats['failed'] += 1
+            cls._stats['last_lag_seconds'] = round(lag, 3)
+            cls._stats['max_lag_seconds'] = round(max(cls._stats['max_lag_seconds'], lag), 3)
+
+            # A check requested while this one ran (e.g. a Download event or a rescan) runs next
+            deadlines = [cls._rerun.pop(download_id, None)]
+            if delay is not None:
+                deadlines.append(time.time() + delay)
+            deadlines = [deadline for deadline in deadlines if deadline is not None]
+
+            if download_id in cls._cancelled:
+                cls._cancelled.discard(download_id)
+            elif deadlines and not cls._stopping:
+                cls._push(download_id, min(deadlines))
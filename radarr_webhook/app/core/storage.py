@@ -4,24 +4,62 @@ file operations, and other storage-related functionality.
 """
 import os
 import json
-import pickle
+import atexit
+import signal
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Any, List, Optional, Set
+from typing import Dict, Any, List, Optional, Set, Iterator, Tuple
 import sys
 
 from app.core.config import Config, logger
+from app.core.copier import FileCopier
+from app.core.torrent_store import PickleTorrentBackend, JournalTorrentBackend, SQLiteTorrentBackend
+from app.core.history import WebhookHistory, HistoryWriter
+
+
+# Number of download file layouts kept by DownloadLocator
+FILE_LAYOUT_CACHE_SIZE = 1000
+
+# Longest wait before retrying a failed torrent storage write
+MAX_FLUSH_RETRY_DELAY = 60.0
+
+
+def _handle_sigterm(signum, frame):
+    """
+    Exit normally on SIGTERM so atexit handlers flush pending state
+    """
+    logger.info("Received SIGTERM, shutting down")
+    sys.exit(0)
 
 
 class TorrentStorage:
     """
-    Class to manage persistent storage of torrent information
+    Class to manage persistent storage of torrent information.
+    All torrents are kept in memory. Changes are collected for up to
+    TORRENT_STORAGE_FLUSH_DELAY seconds and written to the backend chosen by
+    TORRENT_STORAGE_BACKEND in one batch. Secondary indexes by media ID,
+    media type and torrent path are kept next to them for lookups without a scan.
     """
     _storage_file = None  # Will be set in initialize
+    _backend = None
+    _lock = threading.RLock()
     _torrents = {}  # hash -> {metadata}
+    _by_media_id: Dict[Any, Set[str]] = {}  # media_id -> hashes
+    _by_media_type: Dict[str, Set[str]] = {}  # media_type -> hashes
+    _by_torrent_path: Dict[str, str] = {}  # normalized torrent_path -> hash
+    _dirty: Dict[str, Optional[Dict[str, Any]]] = {}  # hash -> unwritten change, None for deletes
+    _flush_timer: Optional[threading.Timer] = None
+    _flush_failures = 0  # Consecutive failed writes, for the retry backoff
+    _shutdown_registered = False
     
     @classmethod
     def initialize(cls):
         """Initialize the torrent storage system"""
+        # Release the backend of an earlier initialization
+        cls.close()
+        
         # Use the config directory for storage
         config_dir = os.getenv('CONFIG_DIR', 'config')
         
@@ -39,22 +77,49 @@ class TorrentStorage:
             print(f"Falling back to current directory for config", file=sys.stderr)
         
         # Set the storage file path
-        cls._storage_file = os.path.join(config_dir, "torrents.pickle")
+        pickle_file = os.path.join(config_dir, "torrents.pickle")
+        if Config.TORRENT_STORAGE_BACKEND == 'pickle':
+            cls._storage_file = pickle_file
+            cls._backend = PickleTorrentBackend(cls._storage_file)
+        elif Config.TORRENT_STORAGE_BACKEND == 'journal':
+            # The pickle file is the snapshot the journal is replayed on
+            cls._storage_file = os.path.join(config_dir, "torrents.journal")
+            cls._backend = JournalTorrentBackend(pickle_file, cls._storage_file)
+        else:
+            cls._storage_file = os.path.join(config_dir, "torrents.db")
+            cls._backend = SQLiteTorrentBackend(cls._storage_file)
+            # One-shot migration of the store written by earlier versions
+            if os.path.exists(pickle_file) and cls._backend.is_empty():
+                try:
+                    cls._backend.import_pickle(pickle_file)
+                except Exception as e:
+                    logger.error(f"Error importing {pickle_file}: {e}")
         print(f"Torrent storage file location: {os.path.abspath(cls._storage_file)}", file=sys.stderr)
         
         # Try to load existing data
-        if os.path.exists(cls._storage_file):
-            try:
-                with open(cls._storage_file, 'rb') as f:
-                    cls._torrents = pickle.load(f)
-                logger.info(f"Loaded {len(cls._torrents)} torrents from storage")
-                print(f"Loaded {len(cls._torrents)} torrents from storage", file=sys.stderr)
-            except Exception as e:
-                logger.error(f"Error loading torrent storage: {e}")
-                print(f"Error loading torrent storage: {e}", file=sys.stderr)
+        try:
+            with cls._lock:
+                cls._torrents = cls._backend.load()
+                cls._dirty = {}
+                cls._rebuild_indexes()
+            logger.info(f"Loaded {len(cls._torrents)} torrents from {cls._backend.name} storage")
+            print(f"Loaded {len(cls._torrents)} torrents from storage", file=sys.stderr)
+        except Exception as e:
+            logger.error(f"Error loading torrent storage: {e}")
+            print(f"Error loading torrent storage: {e}", file=sys.stderr)
+            with cls._lock:
                 cls._torrents = {}
-        else:
-            print(f"No existing torrent storage file found at {cls._storage_file}", file=sys.stderr)
+                cls._dirty = {}
+                cls._rebuild_indexes()
+        
+        if not cls._shutdown_registered:
+            cls._shutdown_registered = True
+            atexit.register(cls.close)
+            # Make docker stop run the shutdown hooks. Servers such as gunicorn
+            # install their own SIGTERM handler and exit normally themselves.
+            if (threading.current_thread() is threading.main_thread()
+                    and signal.getsignal(signal.SIGTERM) == signal.SIG_DFL):
+                signal.signal(signal.SIGTERM, _handle_sigterm)
     
     @classmethod
     def save_torrent_info(cls, download_id: str, media_id: int, media_title: str, 
@@ -70,7 +135,7 @@ class TorrentStorage:
             torrent_path: Path where torrent files are downloaded
             media_type: Type of media ("movie" or "series")
         """
-        cls._torrents[download_id] = {
+        info = {
             'media_id': media_id,
             'media_title': media_title,
             'media_path': media_path,
@@ -78,7 +143,13 @@ class TorrentStorage:
             'media_type': media_type,
             'added_date': datetime.now().isoformat()
         }
-        cls._save_to_disk()
+        with cls._lock:
+            previous = cls._torrents.get(download_id)
+            if previous is not None:
+                cls._unindex(download_id, previous)
+            cls._torrents[download_id] = info
+            cls._index(download_id, info)
+            cls._save_changes({download_id: info})
         logger.info(f"Stored torrent info for {media_title} (ID: {download_id})")
     
     @classmethod
@@ -105,124 +176,325 @@ class TorrentStorage:
         Returns:
             True if torrent was found and removed, False otherwise
         """
-        if download_id in cls._torrents:
-            media_title = cls._torrents[download_id].get('media_title', 'Unknown')
-            del cls._torrents[download_id]
-            cls._save_to_disk()
-            logger.info(f"Removed torrent info for {media_title} (ID: {download_id})")
-            return True
-        return False
+        with cls._lock:
+            info = cls._torrents.pop(download_id, None)
+            if info is None:
+                return False
+            cls._unindex(download_id, info)
+            cls._save_changes({download_id: None})
+        logger.info(f"Removed torrent info for {info.get('media_title', 'Unknown')} (ID: {download_id})")
+        return True
     
     @classmethod
     def get_all_torrents(cls) -> Dict[str, Dict[str, Any]]:
         """Get all stored torrents"""
-        return cls._torrents
+        with cls._lock:
+            return dict(cls._torrents)
     
     @classmethod
-    def _save_to_disk(cls):
-        """Save the torrent dictionary to disk"""
-        try:
-            # Make sure the directory exists
-            os.makedirs(os.path.dirname(cls._storage_file), exist_ok=True)
-            
-            # Verify we can write to the directory
-            config_dir = os.path.dirname(cls._storage_file)
-            print(f"Checking directory permissions for: {config_dir}", file=sys.stderr)
-            
-            if not os.access(config_dir, os.W_OK):
-                print(f"WARNING: Config directory is not writable: {config_dir}", file=sys.stderr)
-                # Try to set permissions
-                try:
-                    os.chmod(config_dir, 0o777)
-                    print(f"Set permissions on config directory: {config_dir}", file=sys.stderr)
-                except Exception as e:
-                    print(f"Failed to set permissions: {e}", file=sys.stderr)
-            
-            # Create a test file first to verify we can write
-            test_file = cls._storage_file + '.test'
-            with open(test_file, 'wb') as f:
-                f.write(b'test')
-            os.remove(test_file)
-            print(f"Successfully verified write access to {config_dir}", file=sys.stderr)
+    def get_torrents_for_media(cls, media_id: Any, media_type: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the stored torrents of a movie or series
+        
+        Args:
+            media_id: Radarr/Sonarr media ID
+            media_type: Only return torrents of this media type ("movie" or "series")
             
-            # Use atomic writing pattern to prevent corruption
-            temp_file = cls._storage_file + '.tmp'
-            with open(temp_file, 'wb') as f:
-                pickle.dump(cls._torrents, f)
+        Returns:
+            Dictionary of torrent information by hash
+        """
+        with cls._lock:
+            hashes = cls._by_media_id.get(media_id, ())
+            if media_type is not None:
+                hashes = cls._by_media_type.get(media_type, set()).intersection(hashes)
+            return {download_id: cls._torrents[download_id] for download_id in hashes}
+    
+    @classmethod
+    def get_torrents_by_type(cls, media_type: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the stored torrents of one media type
+        
+        Args:
+            media_type: Type of media ("movie" or "series")
             
-            # Replace the old file with the new one
-            if os.path.exists(cls._storage_file):
-                os.remove(cls._storage_file)
-            os.rename(temp_file, cls._storage_file)
+        Returns:
+            Dictionary of torrent information by hash
+        """
+        with cls._lock:
+            return {download_id: cls._torrents[download_id]
+                    for download_id in cls._by_media_type.get(media_type, ())}
+    
+    @classmethod
+    def get_torrent_by_path(cls, torrent_path: str) -> Optional[str]:
+        """
+        Find the torrent downloaded to a path
+        
+        Args:
+            torrent_path: Path where torrent files are downloaded
             
-            # Report success
-            print(f"Successfully saved {len(cls._torrents)} torrents to {cls._storage_file}", file=sys.stderr)
+        Returns:
+            Torrent hash or None if no stored torrent uses the path
+        """
+        with cls._lock:
+            return cls._by_torrent_path.get(os.path.normpath(torrent_path))
+    
+    @classmethod
+    def flush(cls) -> None:
+        """Write all pending changes to the backend now"""
+        with cls._lock:
+            cls._flush_changes()
+    
+    @classmethod
+    def close(cls) -> None:
+        """Write pending changes and close the storage backend"""
+        with cls._lock:
+            cls._flush_changes()
+            if cls._backend is not None:
+                cls._backend.close()
+                cls._backend = None
+    
+    @classmethod
+    def _index(cls, download_id: str, info: Dict[str, Any]) -> None:
+        """Add a torrent to the secondary indexes (caller holds the lock)"""
+        cls._by_media_id.setdefault(info.get('media_id'), set()).add(download_id)
+        cls._by_media_type.setdefault(info.get('media_type'), set()).add(download_id)
+        if info.get('torrent_path'):
+            cls._by_torrent_path[os.path.normpath(info['torrent_path'])] = download_id
+    
+    @classmethod
+    def _unindex(cls, download_id: str, info: Dict[str, Any]) -> None:
+        """Remove a torrent from the secondary indexes (caller holds the lock)"""
+        for index, key in ((cls._by_media_id, info.get('media_id')),
+                           (cls._by_media_type, info.get('media_type'))):
+            hashes = index.get(key)
+            if hashes is not None:
+                hashes.discard(download_id)
+                if not hashes:
+                    del index[key]
+        if info.get('torrent_path'):
+            torrent_path = os.path.normpath(info['torrent_path'])
+            if cls._by_torrent_path.get(torrent_path) == download_id:
+                del cls._by_torrent_path[torrent_path]
+    
+    @classmethod
+    def _rebuild_indexes(cls) -> None:
+        """Build the secondary indexes from the loaded torrents (caller holds the lock)"""
+        cls._by_media_id = {}
+        cls._by_media_type = {}
+        cls._by_torrent_path = {}
+        for download_id, info in cls._torrents.items():
+            cls._index(download_id, info)
+    
+    @classmethod
+    def _save_changes(cls, changes: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """
+        Queue changed torrents for the next write (caller holds the lock).
+        The write happens once the flush delay has passed since the first
+        unwritten change, or right away when too many changes are pending.
+        
+        Args:
+            changes: Changed torrents by hash, None for deleted ones
+        """
+        cls._dirty.update(changes)
+        delay = Config.TORRENT_STORAGE_FLUSH_DELAY
+        if delay <= 0 or len(cls._dirty) >= Config.TORRENT_STORAGE_MAX_DIRTY:
+            cls._flush_changes()
+        elif cls._flush_timer is None:
+            cls._start_flush_timer(delay)
+    
+    @classmethod
+    def _start_flush_timer(cls, delay: float) -> None:
+        """Write the pending changes after a delay (caller holds the lock)"""
+        cls._flush_timer = threading.Timer(delay, cls.flush)
+        cls._flush_timer.name = "torrent-storage-flush"
+        cls._flush_timer.daemon = True
+        cls._flush_timer.start()
+    
+    @classmethod
+    def _flush_changes(cls) -> None:
+        """Write the pending changes to the backend in one batch (caller holds the lock)"""
+        if cls._flush_timer is not None:
+            cls._flush_timer.cancel()
+            cls._flush_timer = None
+        if not cls._dirty or cls._backend is None:
+            return
+        
+        changes = cls._dirty
+        cls._dirty = {}
+        try:
+            cls._backend.save(cls._torrents, changes)
+            cls._flush_failures = 0
         except Exception as e:
-            logger.error(f"Error saving torrent storage: {e}")
+            # Keep the changes and retry them, waiting longer after every failure
+            cls._dirty = changes
+            cls._flush_failures += 1
+            retry_delay = min((Config.TORRENT_STORAGE_FLUSH_DELAY or 1.0) * 2 ** min(cls._flush_failures, 10),
+                              MAX_FLUSH_RETRY_DELAY)
+            cls._start_flush_timer(retry_delay)
+            logger.error(f"Error saving torrent storage, retrying in {retry_delay:.1f}s: {e}")
             print(f"Error saving torrent storage to {cls._storage_file}: {e}", file=sys.stderr)
 
 
-class WebhookStorage:
-    """Class for managing webhook data persistence"""
+class LastWebhookCache:
+    """
+    In-memory cache of the last webhook, kept as pre-serialized JSON bytes
+    with an ETag, overall and per service type and instance name
+    """
+    _lock = threading.Lock()
+    _entries: Dict[str, Tuple[bytes, str]] = {}  # key -> (body, etag)
+    _loaded = False
     
     @staticmethod
-    def save_latest_webhook(data: Dict[str, Any]) -> None:
-        """Save the most recent webhook data to a file"""
-        try:
-            # Use the config directory
-            config_dir = os.getenv('CONFIG_DIR', 'config')
-            os.makedirs(config_dir, exist_ok=True)
+    def make_key(service_type: Optional[str] = None, instance_name: Optional[str] = None) -> str:
+        """
+        Build the cache key for a lookup
+        
+        Args:
+            service_type: 'radarr' or 'sonarr', or None for any service
+            instance_name: *arr instance name, takes precedence over service_type
             
-            file_path = os.path.join(config_dir, 'last_webhook_data.json')
-            with open(file_path, 'w') as f:
-                json.dump(data, f, indent=4)
-            print(f"Saved latest webhook data to {file_path}", file=sys.stderr)
+        Returns:
+            Cache key
+        """
+        if instance_name:
+            return f"instance:{instance_name.lower()}"
+        if service_type:
+            return f"service:{service_type.lower()}"
+        return "all"
+    
+    @classmethod
+    def update(cls, data: Dict[str, Any], service_type: Optional[str] = None, replace: bool = True) -> None:
+        """
+        Serialize a webhook once and store it under all keys it belongs to
+        
+        Args:
+            data: The webhook payload data
+            service_type: Service that sent the webhook ('radarr' or 'sonarr')
+            replace: If False, only store the webhook when the cache is empty
+        """
+        body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        
+        keys = [cls.make_key()]
+        if service_type:
+            keys.append(cls.make_key(service_type=service_type))
+        if data.get('instanceName'):
+            keys.append(cls.make_key(instance_name=data['instanceName']))
+        
+        with cls._lock:
+            if not replace and cls._entries:
+                return
+            for key in keys:
+                cls._entries[key] = (body, etag)
+    
+    @classmethod
+    def get(cls, service_type: Optional[str] = None,
+            instance_name: Optional[str] = None) -> Optional[Tuple[bytes, str]]:
+        """
+        Get the last webhook for a service type or instance
+        
+        Returns:
+            Tuple of (JSON body, etag) or None if no webhook was received yet
+        """
+        if not cls._loaded:
+            cls._load_snapshot()
+        with cls._lock:
+            return cls._entries.get(cls.make_key(service_type, instance_name))
+    
+    @classmethod
+    def _load_snapshot(cls) -> None:
+        """Seed the cache from the snapshot persisted by a previous run"""
+        with cls._lock:
+            if cls._loaded:
+                return
+            cls._loaded = True
+            if cls._entries:
+                return
+        
+        file_path = os.path.join(Config.CONFIG_DIR, 'last_webhook_data.json')
+        if not os.path.exists(file_path):
+            return
+        try:
+            with open(file_path, 'r') as f:
+                data = json.load(f)
         except Exception as e:
-            logger.error(f"Error saving latest webhook data: {e}")
-            print(f"Error saving latest webhook data: {e}", file=sys.stderr)
+            logger.error(f"Error reading webhook snapshot {file_path}: {e}")
+            return
+        
+        service_type = None
+        if 'movie' in data:
+            service_type = 'radarr'
+        elif 'series' in data or 'episodes' in data:
+            service_type = 'sonarr'
+        
+        # Never overwrite a webhook received while the snapshot was being read
+        cls.update(data, service_type, replace=False)
+
+
+class WebhookStorage:
+    """Class for managing webhook data persistence"""
     
     @staticmethod
-    def append_to_history(data: Dict[str, Any]) -> None:
-        """
-        Append webhook data to history file with timestamp
+    def save_latest_webhook(data: Dict[str, Any], service_type: Optional[str] = None) -> None:
         """
-        # Use the config directory
-        config_dir = os.getenv('CONFIG_DIR', 'config')
-        os.makedirs(config_dir, exist_ok=True)
+        Keep the most recent webhook data in memory.
+        The background history writer persists it with its next flush.
         
-        # Override the history file location to use config dir
-        history_file = os.path.join(config_dir, os.path.basename(Config.WEBHOOK_LOG_FILE))
+        Args:
+            data: The webhook payload data
+            service_type: Service that sent the webhook ('radarr' or 'sonarr')
+        """
+        LastWebhookCache.update(data, service_type)
+        HistoryWriter.set_snapshot(data)
+    
+    @staticmethod
+    def append_to_history(data: Dict[str, Any], service_type: Optional[str] = None) -> None:
+        """
+        Queue webhook data with timestamp for the history file.
+        Entries are group-committed by the background history writer.
         
+        Args:
+            data: The webhook payload data
+            service_type: Service that sent the webhook ('radarr' or 'sonarr')
+        """
         # Create a new entry with timestamp
         timestamp = datetime.now().isoformat()
         entry = {
             "timestamp": timestamp,
+            "service_type": service_type,
             "data": data
         }
         
-        # Read existing history if file exists
-        history = []
-        if os.path.exists(history_file) and os.path.getsize(history_file) > 0:
-            try:
-                with open(history_file, 'r') as f:
-                    history = json.load(f)
-            except json.JSONDecodeError:
-                # If file is corrupted, start fresh
-                logger.warning(f"Corrupted history file {history_file}, starting fresh")
-                print(f"Corrupted history file {history_file}, starting fresh", file=sys.stderr)
-                history = []
-        
-        # Append new entry
-        history.append(entry)
-        
-        # Write back to file
-        try:
-            with open(history_file, 'w') as f:
-                json.dump(history, f, indent=4)
-            print(f"Updated webhook history at {history_file}", file=sys.stderr)
-        except Exception as e:
-            logger.error(f"Error appending to webhook history: {e}")
-            print(f"Error appending to webhook history: {e}", file=sys.stderr)
+        HistoryWriter.submit(entry)
+    
+    @staticmethod
+    def flush() -> None:
+        """Write pending history entries and the latest webhook snapshot to disk"""
+        HistoryWriter.flush()
+    
+    @staticmethod
+    def iter_history() -> Iterator[Dict[str, Any]]:
+        """
+        Stream webhook history entries from oldest to newest
+        """
+        return WebhookHistory.iter_history()
+    
+    @staticmethod
+    def query_history(limit: int = 50, cursor: Optional[str] = None, **filters) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Query webhook history entries, newest first
+        
+        Args:
+            limit: Maximum number of entries to return
+            cursor: Cursor returned by a previous query to fetch the next page
+            **filters: Filters supported by WebhookHistory.query
+            
+        Returns:
+            Tuple of (entries, next_cursor)
+        """
+        # Make entries still waiting in the writer visible to the query, without an fsync per read
+        HistoryWriter.flush_entries()
+        return WebhookHistory.query(limit=limit, cursor=cursor, **filters)
 
 
 class FileOperations:
@@ -280,18 +552,9 @@ class FileOperations:
                 logger.info(f"Created hardlink for {file_name}")
                 return True
             except OSError as e:
-                # If os.link fails (e.g., cross-filesystem), try using ln command
-                import subprocess
-                logger.warning(f"os.link failed, trying ln command: {e}")
-                result = subprocess.run(['ln', source_file, dest_file], 
-                                      capture_output=True, text=True)
-                
-                if result.returncode != 0:
-                    # If hardlink fails, try copy as fallback
-                    logger.error(f"Error creating hardlink: {result.stderr}")
-                    logger.info(f"Trying copy instead for {source_file}")
-                    subprocess.run(['cp', source_file, dest_file], check=True)
-                
+                # If os.link fails (e.g., cross-filesystem), copy instead
+                logger.warning(f"os.link failed, copying instead: {e}")
+                FileCopier.copy(source_file, dest_file)
                 return True
                 
         except Exception as e:
@@ -323,18 +586,34 @@ class FileOperations:
 
 class DownloadLocator:
     """Class for locating download folders and files"""
+    _files_lock = threading.Lock()
+    # hash -> (source, file layout, directory mtimes for filesystem walks)
+    _files_cache: "OrderedDict[str, Tuple[str, List[Tuple[str, str, int]], Optional[Dict[str, int]]]]" = OrderedDict()
     
     @staticmethod
-    def find_torrent_folder(download_id: str) -> Optional[str]:
+    def find_torrent_folder(download_id: str, torrent_info: Optional[Dict[str, Any]] = None) -> Optional[str]:
         """
         Locate the folder where the torrent is being downloaded
         Returns the path if found, or None if not found
         
         This method will use qBittorrent API if enabled, otherwise
         it will use the traditional filesystem search.
+        
+        Args:
+            download_id: The download ID (torrent hash)
+            torrent_info: Torrent status already fetched from qBittorrent, an
+                          empty dict if the torrent was not found. The API is
+                          only queried when this is None.
         """
+        # Use the status fetched by the monitor's polling stage when available
+        if torrent_info is not None and Config.QBITTORRENT_ENABLED and Config.QBITTORRENT_USE_API:
+            if torrent_info:
+                from app.services.qbittorrent import QBittorrentClient
+                path = QBittorrentClient.resolve_download_path(download_id, torrent_info)
+                return path or Config.DOWNLOAD_PATH
+        
         # Try to use qBittorrent API first if enabled
-        if Config.QBITTORRENT_ENABLED and Config.QBITTORRENT_USE_API:
+        elif Config.QBITTORRENT_ENABLED and Config.QBITTORRENT_USE_API:
             from app.services.qbittorrent import QBittorrentClient
             
             try:
@@ -409,22 +688,198 @@ class DownloadLocator:
             return None
     
     @staticmethod
-    def is_torrent_completed(download_id: str) -> bool:
+    def get_torrent_status(download_id: str) -> Optional[Tuple[bool, Dict[str, Any]]]:
         """
-        Check if a torrent is completed using qBittorrent API
+        Get the status of a torrent using qBittorrent API
         
-        Returns True if the torrent is completed, False otherwise.
-        If qBittorrent API is disabled or fails, returns False.
+        Returns a tuple of (is_completed, torrent_info), with an empty
+        torrent_info if the torrent was not found.
+        If qBittorrent API is disabled or fails, returns None.
         """
         if not Config.QBITTORRENT_ENABLED or not Config.QBITTORRENT_USE_API:
-            logger.info("qBittorrent API disabled, cannot check torrent completion")
-            return False
+            logger.info("qBittorrent API disabled, cannot check torrent status")
+            return None
             
         try:
             from app.services.qbittorrent import QBittorrentClient
             qbt = QBittorrentClient()
-            is_completed, _ = qbt.get_torrent_status(download_id)
-            return is_completed
+            return qbt.get_torrent_status(download_id)
         except Exception as e:
-            logger.error(f"Error checking torrent completion: {e}")
-            return False 
\ No newline at end of file
+            logger.error(f"Error checking torrent status: {e}")
+            return None
+    
+    @staticmethod
+    def is_torrent_completed(download_id: str) -> bool:
+        """
+        Check if a torrent is completed using qBittorrent API
+        
+        Returns True if the torrent is completed, False otherwise.
+        If qBittorrent API is disabled or fails, returns False.
+        """
+        status = DownloadLocator.get_torrent_status(download_id)
+        return status[0] if status else False 
+    
+    @classmethod
+    def get_download_files(cls, download_id: str, torrent_info: Optional[Dict[str, Any]] = None,
+                           download_path: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        List the files of a download
+        
+        The file layout comes from the qBittorrent file list when the API is
+        enabled and from a single os.scandir walk of the download path
+        otherwise. It is cached per torrent hash: the qBittorrent layout is
+        fixed once the torrent metadata is known, and a cached walk is reused
+        while no directory in it has changed.
+        
+        Args:
+            download_id: The download ID (torrent hash)
+            torrent_info: Torrent status from qBittorrent, fetched if not given
+            download_path: Torrent folder or file, used for filesystem walks
+            
+        Returns:
+            List of dictionaries with absolutePath, relativePath (relative to
+            the torrent content folder), size and progress (1.0 when complete,
+            None when unknown)
+        """
+        if Config.QBITTORRENT_ENABLED and Config.QBITTORRENT_USE_API:
+            files = cls._get_files_from_qbittorrent(download_id, torrent_info)
+            if files is not None:
+                return files
+        
+        if not download_path:
+            return []
+        return cls._get_files_from_filesystem(download_id, download_path)
+    
+    @classmethod
+    def forget_download_files(cls, download_id: str) -> None:
+        """Drop the cached file layout of a download"""
+        with cls._files_lock:
+            cls._files_cache.pop(download_id.lower(), None)
+    
+    @classmethod
+    def _get_files_from_qbittorrent(cls, download_id: str,
+                                    torrent_info: Optional[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """
+        List the files of a torrent from the qBittorrent file list
+        
+        Returns:
+            List of file entries, or None if qBittorrent does not know the torrent
+        """
+        from app.services.qbittorrent import QBittorrentClient
+        
+        if torrent_info is None:
+            status = cls.get_torrent_status(download_id)
+            torrent_info = status[1] if status else {}
+        if not torrent_info or not torrent_info.get('save_path'):
+            return None
+        
+        # Incomplete torrents live in the temporary download path when one is set,
+        # the layout is cached per location so it is rebuilt after qBittorrent moves them
+        completed = torrent_info.get('progress') == 1.0
+        root = torrent_info['save_path']
+        if not completed and torrent_info.get('download_path'):
+            root = torrent_info['download_path']
+        source = f"qbittorrent:{root}"
+        
+        torrent_hash = download_id.lower()
+        with cls._files_lock:
+            cached = cls._files_cache.get(torrent_hash)
+            if cached is not None and cached[0] == source:
+                cls._files_cache.move_to_end(torrent_hash)
+        layout = cached[1] if cached is not None and cached[0] == source else None
+        
+        # A completed torrent needs no per-file progress, so a cached layout is enough
+        if layout is not None and completed:
+            return [cls._make_file_entry(absolute_path, relative_path, size, 1.0)
+                    for absolute_path, relative_path, size in layout]
+        
+        qbt_files = QBittorrentClient().get_torrent_files(download_id)
+        if not qbt_files:
+            # Metadata is not known yet
+            return []
+        
+        if layout is None:
+            content_path = torrent_info.get('content_path') or root
+            layout = []
+            for qbt_file in qbt_files:
+                absolute_path = os.path.normpath(os.path.join(root, qbt_file['name']))
+                if absolute_path.startswith(content_path.rstrip(os.sep) + os.sep):
+                    relative_path = os.path.relpath(absolute_path, content_path)
+                else:
+                    # Single file torrent, the content path is the file itself
+                    relative_path = os.path.basename(absolute_path)
+                layout.append((absolute_path, relative_path, qbt_file.get('size', 0)))
+            cls._cache_layout(torrent_hash, source, layout, None)
+        
+        return [cls._make_file_entry(absolute_path, relative_path, size, qbt_file.get('progress', 0))
+                for (absolute_path, relative_path, size), qbt_file in zip(layout, qbt_files)]
+    
+    @classmethod
+    def _get_files_from_filesystem(cls, download_id: str, download_path: str) -> List[Dict[str, Any]]:
+        """List the files of a download by walking its folder"""
+        if os.path.normpath(download_path) == os.path.normpath(Config.DOWNLOAD_PATH):
+            # The download was not located, never link the whole downloads folder
+            logger.warning(f"No specific folder known for {download_id}, not listing {download_path}")
+            return []
+        
+        torrent_hash = download_id.lower()
+        with cls._files_lock:
+            cached = cls._files_cache.get(torrent_hash)
+        if cached is not None and cached[0] == download_path and cls._directories_unchanged(cached[2]):
+            return [cls._make_file_entry(absolute_path, relative_path, size, None)
+                    for absolute_path, relative_path, size in cached[1]]
+        
+        layout = []
+        directories = {}
+        if os.path.isfile(download_path):
+            layout.append((download_path, os.path.basename(download_path), os.path.getsize(download_path)))
+        elif os.path.isdir(download_path):
+            pending = [download_path]
+            while pending:
+                directory = pending.pop()
+                try:
+                    directories[directory] = os.stat(directory).st_mtime_ns
+                    with os.scandir(directory) as entries:
+                        for entry in entries:
+                            if entry.is_dir(follow_symlinks=False):
+                                pending.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                layout.append((entry.path, os.path.relpath(entry.path, download_path),
+                                               entry.stat(follow_symlinks=False).st_size))
+                except OSError as e:
+                    logger.error(f"Error listing {directory}: {e}")
+            layout.sort()
+        
+        cls._cache_layout(torrent_hash, download_path, layout, directories)
+        return [cls._make_file_entry(absolute_path, relative_path, size, None)
+                for absolute_path, relative_path, size in layout]
+    
+    @staticmethod
+    def _directories_unchanged(directories: Optional[Dict[str, int]]) -> bool:
+        """Check that no directory of a cached walk was modified since"""
+        if not directories:
+            return False
+        try:
+            return all(os.stat(directory).st_mtime_ns == mtime for directory, mtime in directories.items())
+        except OSError:
+            return False
+    
+    @staticmethod
+    def _make_file_entry(absolute_path: str, relative_path: str, size: int,
+                         progress: Optional[float]) -> Dict[str, Any]:
+        return {
+            "absolutePath": absolute_path,
+            "relativePath": relative_path,
+            "size": size,
+            "progress": progress
+        }
+    
+    @classmethod
+    def _cache_layout(cls, torrent_hash: str, source: str, layout: List[Tuple[str, str, int]],
+                      directories: Optional[Dict[str, int]]) -> None:
+        """Store a file layout, evicting the least recently used ones"""
+        with cls._files_lock:
+            cls._files_cache[torrent_hash] = (source, layout, directories)
+            cls._files_cache.move_to_end(torrent_hash)
+            while len(cls._files_cache) > FILE_LAYOUT_CACHE_SIZE:
+                cls._files_cache.popitem(last=False)
@@ -0,0 +1,317 @@
+"""
+Persistence backends for TorrentStorage.
+TorrentStorage keeps all torrents in memory and hands every batch of
+changes to a backend. The SQLite backend writes only the changed rows,
+the journal backend appends the changes to a log compacted into a pickle
+snapshot, and the pickle backend rewrites the whole file like earlier
+versions did.
+"""
+import os
+import sys
+import json
+import pickle
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+from app.core.config import Config, logger
+from app.core.durable import atomic_write, replace, sync_file, fsync_directory, get_durability
+
+
+# SQLite synchronous mode per durability level. In WAL mode NORMAL never corrupts the
+# database but may lose the last commits on power loss, FULL syncs the WAL on every commit.
+SQLITE_SYNCHRONOUS = {'none': 'OFF', 'data': 'NORMAL', 'full': 'FULL'}
+
+# Columns of the torrents table besides the hash, in the order of the stored dictionaries
+TORRENT_COLUMNS = ('media_id', 'media_title', 'media_path', 'torrent_path', 'media_type', 'added_date')
+
+
+class PickleTorrentBackend:
+    """Stores all torrents in one pickle file, rewritten on every change"""
+
+    name = 'pickle'
+
+    def __init__(self, storage_file: str):
+        self.storage_file = storage_file
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Load all stored torrents"""
+        if not os.path.exists(self.storage_file):
+            print(f"No existing torrent storage file found at {self.storage_file}", file=sys.stderr)
+            return {}
+        with open(self.storage_file, 'rb') as f:
+            return pickle.load(f)
+
+    def save(self, torrents: Dict[str, Dict[str, Any]], changes: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """
+        Persist changed torrents
+
+        Args:
+            torrents: All torrents after the changes
+            changes: Changed torrents by hash, None for deleted ones
+        """
+        atomic_write(self.storage_file, lambda f: pickle.dump(torrents, f))
+
+    def close(self) -> None:
+        """Nothing to release"""
+        pass
+
+
+class JournalTorrentBackend:
+    """
+    Appends every change as a JSON line to a journal next to a pickle snapshot.
+    Once the journal has as many records as there are torrents (at least
+    TORRENT_JOURNAL_COMPACT_RECORDS), it is rotated and a background thread
+    writes a new snapshot, so both a mutation and startup stay cheap.
+    The snapshot uses the format of torrents.pickle, so an existing pickle
+    store is picked up as the first snapshot.
+    """
+
+    name = 'journal'
+
+    def __init__(self, snapshot_file: str, journal_file: str):
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        # Journal rotated by a compaction whose snapshot is not written yet
+        self.rotated_file = journal_file + '.old'
+        self._journal = None
+        self._records = 0
+        self._compaction: Optional[threading.Thread] = None
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Load the snapshot and replay the journals written after it"""
+        torrents = {}
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, 'rb') as f:
+                torrents = pickle.load(f)
+        else:
+            print(f"No existing torrent snapshot found at {self.snapshot_file}", file=sys.stderr)
+
+        interrupted = os.path.exists(self.rotated_file)
+        if interrupted:
+            # Replaying a journal already in the snapshot sets the same final state
+            self._replay(self.rotated_file, torrents)
+        self._records = self._replay(self.journal_file, torrents)
+
+        if interrupted:
+            # The last compaction did not finish, write its snapshot now
+            logger.info("Finishing interrupted torrent journal compaction")
+            self._write_snapshot(torrents)
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+            os.remove(self.rotated_file)
+            self._records = 0
+
+        self._open_journal()
+        return torrents
+
+    def save(self, torrents: Dict[str, Dict[str, Any]], changes: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """
+        Append changed torrents to the journal, compacting it when it is too long
+
+        Args:
+            torrents: All torrents after the changes
+            changes: Changed torrents by hash, None for deleted ones
+        """
+        records = []
+        for download_id, info in changes.items():
+            record = ['put', download_id, info] if info is not None else ['del', download_id]
+            records.append(json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n')
+        self._journal.write(b''.join(records))
+        sync_file(self._journal)
+        self._records += len(records)
+
+        if self._records >= max(Config.TORRENT_JOURNAL_COMPACT_RECORDS, len(torrents)):
+            self._compact(torrents)
+
+    def close(self) -> None:
+        """Wait for a running compaction and close the journal"""
+        if self._compaction is not None:
+            self._compaction.join()
+            self._compaction = None
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _compact(self, torrents: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Rotate the journal and write a snapshot of the torrents in the background.
+        Called under the storage lock, so the copy matches the rotated journal.
+        """
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        if os.path.exists(self.rotated_file):
+            # An earlier snapshot failed, it is finished on the next start
+            return
+
+        self._journal.close()
+        os.replace(self.journal_file, self.rotated_file)
+        self._open_journal()
+        self._records = 0
+
+        # Stored dictionaries are replaced, never changed, so a shallow copy is a stable view
+        self._compaction = threading.Thread(
+            target=self._run_compaction, args=(dict(torrents),), name="torrent-journal-compaction", daemon=True
+        )
+        self._compaction.start()
+
+    def _run_compaction(self, torrents: Dict[str, Dict[str, Any]]) -> None:
+        """Write the snapshot, then drop the rotated journal it replaces"""
+        try:
+            self._write_snapshot(torrents)
+            os.remove(self.rotated_file)
+            logger.info(f"Compacted torrent journal into a snapshot of {len(torrents)} torrents")
+        except Exception as e:
+            logger.error(f"Error compacting torrent journal: {e}")
+
+    def _open_journal(self) -> None:
+        """Open the journal for appends, making a newly created one durable at the 'full' level"""
+        created = not os.path.exists(self.journal_file)
+        self._journal = open(self.journal_file, 'ab')
+        if created and get_durability() == 'full':
+            fsync_directory(os.path.dirname(os.path.abspath(self.journal_file)))
+
+    def _write_snapshot(self, torrents: Dict[str, Dict[str, Any]]) -> None:
+        """Write the snapshot through a temporary file renamed into place"""
+        atomic_write(self.snapshot_file, lambda f: pickle.dump(torrents, f, protocol=pickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def _replay(journal_file: str, torrents: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Apply the records of a journal to the torrents. A record cut short by a
+        crash ends the journal, it is truncated there so new records follow
+        the last complete one.
+
+        Returns:
+            Number of records applied
+        """
+        if not os.path.exists(journal_file):
+            return 0
+
+        applied = 0
+        valid_bytes = 0
+        with open(journal_file, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("incomplete record")
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Ignoring damaged torrent journal tail in {journal_file} at byte {valid_bytes}")
+                    break
+                if record[0] == 'put':
+                    torrents[record[1]] = record[2]
+                else:
+                    torrents.pop(record[1], None)
+                applied += 1
+                valid_bytes += len(line)
+
+        if valid_bytes < os.path.getsize(journal_file):
+            os.truncate(journal_file, valid_bytes)
+        return applied
+
+
+class SQLiteTorrentBackend:
+    """
+    Stores torrents as rows of an SQLite database in WAL mode, so each change
+    is a single-row upsert or delete and a crash never loses committed rows
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, database_file: str):
+        self.database_file = database_file
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(database_file, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS[get_durability()]}")
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS torrents (
+                hash TEXT PRIMARY KEY,
+                media_id INTEGER,
+                media_title TEXT,
+                media_path TEXT,
+                torrent_path TEXT,
+                media_type TEXT,
+                added_date TEXT
+            );
+            CREATE INDEX IF NOT EXISTS torrents_media_id ON torrents (media_id);
+            CREATE INDEX IF NOT EXISTS torrents_media_type ON torrents (media_type);
+        """)
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Load all stored torrents"""
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT hash, {', '.join(TORRENT_COLUMNS)} FROM torrents"
+            ).fetchall()
+        return {row[0]: dict(zip(TORRENT_COLUMNS, row[1:])) for row in rows}
+
+    def save(self, torrents: Dict[str, Dict[str, Any]], changes: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """
+        Persist changed torrents in one transaction
+
+        Args:
+            torrents: All torrents after the changes, not used
+            changes: Changed torrents by hash, None for deleted ones
+        """
+        upserts = [(download_id,) + tuple(info.get(column) for column in TORRENT_COLUMNS)
+                   for download_id, info in changes.items() if info is not None]
+        deletes = [(download_id,) for download_id, info in changes.items() if info is None]
+
+        with self._lock:
+            with self._transaction():
+                if upserts:
+                    self._connection.executemany(
+                        f"INSERT INTO torrents (hash, {', '.join(TORRENT_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * (len(TORRENT_COLUMNS) + 1))}) "
+                        f"ON CONFLICT(hash) DO UPDATE SET "
+                        f"{', '.join(f'{column}=excluded.{column}' for column in TORRENT_COLUMNS)}",
+                        upserts
+                    )
+                if deletes:
+                    self._connection.executemany("DELETE FROM torrents WHERE hash = ?", deletes)
+
+    def is_empty(self) -> bool:
+        """Check whether the database has no torrents yet"""
+        with self._lock:
+            return self._connection.execute("SELECT 1 FROM torrents LIMIT 1").fetchone() is None
+
+    def import_pickle(self, pickle_file: str) -> int:
+        """
+        Import the torrents of a pickle store written by earlier versions.
+        The pickle file is renamed to .imported afterwards so it is read once.
+
+        Args:
+            pickle_file: Path of torrents.pickle
+
+        Returns:
+            Number of imported torrents
+        """
+        with open(pickle_file, 'rb') as f:
+            torrents = pickle.load(f)
+
+        self.save(torrents, torrents)
+        replace(pickle_file, pickle_file + '.imported')
+        logger.info(f"Imported {len(torrents)} torrents from {pickle_file}")
+        return len(torrents)
+
+    def close(self) -> None:
+        """Checkpoint the WAL and close the database"""
+        with self._lock:
+            try:
+                self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                self._connection.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Run the statements of the block in one write transaction"""
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+        self._connection.execute("COMMIT")
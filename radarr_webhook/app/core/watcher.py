@@ -0,0 +1,317 @@
+"""
+File watcher module for download monitoring.
+On Linux, inotify reports files that are closed after writing or moved
+into the watched torrent folders, so they can be linked right away instead
+of on the next polling check. Downloads that cannot be watched keep being
+polled by the scheduler.
+"""
+import os
+import errno
+import atexit
+import ctypes
+import ctypes.util
+import select
+import struct
+import threading
+from typing import Dict, Optional, Callable, List, Set
+
+from app.core.config import Config, logger
+
+
+# inotify event flags, see inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# struct inotify_event header: wd, mask, cookie, len
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def _load_libc():
+    """Load the C library functions used for inotify, or None if unavailable"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class FileWatcher:
+    """
+    inotify watcher mapping watched directories to the downloads they belong to.
+    Completed files are reported per download through the on_files callback.
+    """
+    _lock = threading.Lock()
+    _libc = None
+    _fd: Optional[int] = None
+    _thread: Optional[threading.Thread] = None
+    _stopping = False
+    _on_files: Optional[Callable[[str, List[str]], None]] = None
+    _on_overflow: Optional[Callable[[List[str]], None]] = None
+    _watches: Dict[int, Dict[str, str]] = {}  # wd -> {download_id: directory}
+    _download_watches: Dict[str, Set[int]] = {}  # download_id -> wds
+    _download_paths: Dict[str, str] = {}  # download_id -> watched or unwatchable path
+    _unwatchable: Set[str] = set()  # Downloads that could not be watched, polled instead
+    _unavailable = False
+    _stats = {
+        'events': 0,
+        'overflows': 0,
+        'watch_failures': 0,
+    }
+
+    @classmethod
+    def start(cls, on_files: Callable[[str, List[str]], None],
+              on_overflow: Callable[[List[str]], None]) -> bool:
+        """
+        Start watching if inotify is enabled and available
+
+        Args:
+            on_files: Called with a download ID and the paths of files that were
+                      written or moved into its folder
+            on_overflow: Called with all watched download IDs when events were lost
+
+        Returns:
+            True if the watcher is running
+        """
+        with cls._lock:
+            if cls._thread is not None:
+                return True
+            if not Config.FILE_WATCHER_ENABLED or cls._unavailable:
+                return False
+
+            cls._libc = _load_libc() if os.name == 'posix' else None
+            fd = cls._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC) if cls._libc else -1
+            if fd < 0:
+                cls._unavailable = True
+                logger.warning("inotify is not available, download folders will only be polled")
+                return False
+
+            cls._fd = fd
+            cls._on_files = on_files
+            cls._on_overflow = on_overflow
+            cls._stopping = False
+            cls._thread = threading.Thread(target=cls._read_loop, name="file-watcher", daemon=True)
+            cls._thread.start()
+
+        atexit.register(cls.shutdown)
+        logger.info("File watcher started using inotify")
+        return True
+
+    @classmethod
+    def watch(cls, download_id: str, path: str) -> bool:
+        """
+        Watch the folder of a download, including its subfolders.
+        When the download moved to another path, the old watches are
+        replaced by watches of the new path.
+
+        Args:
+            download_id: The download ID
+            path: Torrent folder, or file for single file torrents
+
+        Returns:
+            True if the download is watched, False if it has to be polled
+        """
+        path = os.path.normpath(path)
+        with cls._lock:
+            if cls._fd is None:
+                return False
+            if cls._download_paths.get(download_id) == path:
+                if download_id in cls._unwatchable:
+                    return False
+                if cls._download_watches.get(download_id):
+                    return True
+
+            # New path, moved folder or all watched folders removed, start over
+            cls._remove_download(download_id)
+            cls._unwatchable.discard(download_id)
+            cls._download_paths[download_id] = path
+
+            if os.path.isdir(path):
+                directories = [path]
+                for root, dirs, _ in os.walk(path):
+                    directories.extend(os.path.join(root, name) for name in dirs)
+            else:
+                # Single file torrents are watched through their parent folder
+                directories = [os.path.dirname(path)]
+
+            cls._download_watches[download_id] = set()
+            for directory in directories:
+                if not cls._add_watch(download_id, directory):
+                    cls._remove_download(download_id)
+                    cls._download_paths[download_id] = path
+                    cls._unwatchable.add(download_id)
+                    return False
+
+        logger.info(f"Watching {len(directories)} folders of {path} for download {download_id}")
+        return True
+
+    @classmethod
+    def unwatch(cls, download_id: str) -> None:
+        """Stop watching the folders of a download"""
+        with cls._lock:
+            cls._remove_download(download_id)
+            cls._unwatchable.discard(download_id)
+
+    @classmethod
+    def is_watching(cls, download_id: str) -> bool:
+        """Check whether a download has folders watched"""
+        with cls._lock:
+            return bool(cls._download_watches.get(download_id))
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, object]:
+        """Return watch counts and event counters"""
+        with cls._lock:
+            stats = dict(cls._stats)
+            stats.update({
+                'running': cls._thread is not None,
+                'watched_downloads': len(cls._download_watches),
+                'watches': len(cls._watches),
+            })
+        return stats
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """Stop the reader thread and close the inotify descriptor"""
+        with cls._lock:
+            if cls._thread is None:
+                return
+            cls._stopping = True
+            thread = cls._thread
+
+        thread.join(5.0)
+        with cls._lock:
+            os.close(cls._fd)
+            cls._fd = None
+            cls._thread = None
+            cls._watches = {}
+            cls._download_watches = {}
+            cls._download_paths = {}
+
+    @classmethod
+    def _add_watch(cls, download_id: str, directory: str) -> bool:
+        """Add an inotify watch for one directory (caller holds the lock)"""
+        wd = cls._libc.inotify_add_watch(cls._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            cls._stats['watch_failures'] += 1
+            if error == errno.ENOSPC:
+                logger.warning(f"inotify watch limit reached, polling download {download_id} instead "
+                               f"(raise fs.inotify.max_user_watches to watch more folders)")
+            else:
+                logger.warning(f"Cannot watch {directory}: {os.strerror(error)}, polling download {download_id}")
+            return False
+
+        cls._watches.setdefault(wd, {})[download_id] = directory
+        cls._download_watches[download_id].add(wd)
+        return True
+
+    @classmethod
+    def _remove_download(cls, download_id: str) -> None:
+        """Drop the watches of a download that no other download shares (caller holds the lock)"""
+        cls._download_paths.pop(download_id, None)
+        for wd in cls._download_watches.pop(download_id, set()):
+            owners = cls._watches.get(wd, {})
+            owners.pop(download_id, None)
+            if not owners:
+                cls._watches.pop(wd, None)
+                if cls._fd is not None:
+                    cls._libc.inotify_rm_watch(cls._fd, wd)
+
+    @classmethod
+    def _read_loop(cls) -> None:
+        """Read inotify events and report written files per download"""
+        fd = cls._fd
+        while not cls._stopping:
+            readable, _, _ = select.select([fd], [], [], 1.0)
+            if not readable:
+                continue
+            try:
+                buffer = os.read(fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                logger.error(f"Error reading inotify events: {e}")
+                continue
+
+            try:
+                changed, overflowed = cls._parse_events(buffer)
+                if overflowed:
+                    cls._on_overflow(overflowed)
+                for download_id, paths in changed.items():
+                    # New empty subfolders only add watches, there is nothing to link
+                    if paths:
+                        cls._on_files(download_id, sorted(paths))
+            except Exception as e:
+                logger.exception(f"Error handling file events: {e}")
+
+    @classmethod
+    def _parse_events(cls, buffer: bytes):
+        """
+        Turn raw inotify events into written file paths per download
+
+        Returns:
+            Tuple of ({download_id: set of paths}, list of download IDs to rescan)
+        """
+        changed: Dict[str, Set[str]] = {}
+        new_directories = []
+        overflowed: List[str] = []
+
+        with cls._lock:
+            offset = 0
+            while offset + EVENT_HEADER.size <= len(buffer):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+                name = buffer[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+                offset += EVENT_HEADER.size + length
+                cls._stats['events'] += 1
+
+                if mask & IN_Q_OVERFLOW:
+                    cls._stats['overflows'] += 1
+                    logger.warning("inotify event queue overflowed, rescanning watched downloads")
+                    overflowed = list(cls._download_watches)
+                    continue
+                if mask & IN_IGNORED:
+                    # The directory was removed
+                    for download_id in cls._watches.pop(wd, {}):
+                        wds = cls._download_watches.get(download_id)
+                        if wds is None:
+                            continue
+                        wds.discard(wd)
+                        if not wds:
+                            # Nothing left to watch, poll until the next check watches it again
+                            del cls._download_watches[download_id]
+                            cls._download_paths.pop(download_id, None)
+                    continue
+
+                for download_id, directory in cls._watches.get(wd, {}).items():
+                    path = os.path.join(directory, os.fsdecode(name))
+                    if mask & IN_ISDIR:
+                        if mask & (IN_CREATE | IN_MOVED_TO):
+                            new_directories.append((download_id, path))
+                    elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                        changed.setdefault(download_id, set()).add(path)
+
+            # Watch new subfolders and report files written before the watch existed
+            for download_id, path in new_directories:
+                if download_id not in cls._download_watches:
+                    continue
+                for root, dirs, files in os.walk(path):
+                    if not cls._add_watch(download_id, root):
+                        # Partially watched downloads are polled instead
+                        cls._remove_download(download_id)
+                        cls._unwatchable.add(download_id)
+                        overflowed.append(download_id)
+                        break
+                    changed.setdefault(download_id, set()).update(os.path.join(root, name) for name in files)
+
+        return changed, overflowed
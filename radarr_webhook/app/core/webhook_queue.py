@@ -0,0 +1,238 @@
+"""
+Webhook queue module for accepting webhooks asynchronously.
+Incoming webhooks are validated and enqueued by the API, then processed
+by a fixed pool of worker threads.
+"""
+import time
+import uuid
+import queue
+import atexit
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Tuple, List
+
+from app.core.config import Config, logger
+
+
+# Number of finished events whose outcome is kept for lookups
+RESULT_HISTORY_SIZE = 1000
+
+
+class QueueFullError(Exception):
+    """Raised when the webhook queue cannot accept more events"""
+
+
+class QueuedWebhook:
+    """A webhook waiting to be processed by a worker"""
+
+    def __init__(self, data: Dict[str, Any], service_type: Optional[str] = None):
+        self.event_id = uuid.uuid4().hex
+        self.data = data
+        self.service_type = service_type
+        self.enqueued_at = time.time()
+
+
+class WebhookQueue:
+    """
+    Bounded in-process work queue with a configurable worker pool
+    """
+    _queue: Optional[queue.Queue] = None
+    _workers: List[threading.Thread] = []
+    _processor: Optional[Callable[..., Tuple[Dict[str, Any], int]]] = None
+    _lock = threading.Lock()
+    _results: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    _stats = {
+        'accepted': 0,
+        'rejected': 0,
+        'processed': 0,
+        'failed': 0,
+        'last_lag_seconds': 0.0,
+        'max_lag_seconds': 0.0,
+    }
+
+    @classmethod
+    def start(cls, processor: Callable[..., Tuple[Dict[str, Any], int]]) -> None:
+        """
+        Start the worker pool
+
+        Args:
+            processor: Callable taking (data, service_type) and returning
+                       a tuple of (response_data, status_code)
+        """
+        with cls._lock:
+            if cls._queue is not None:
+                return
+
+            cls._processor = processor
+            cls._queue = queue.Queue(maxsize=Config.WEBHOOK_QUEUE_SIZE)
+            cls._workers = []
+
+            for index in range(max(1, Config.WEBHOOK_WORKERS)):
+                worker = threading.Thread(
+                    target=cls._worker_loop,
+                    name=f"webhook-worker-{index}",
+                    daemon=True
+                )
+                worker.start()
+                cls._workers.append(worker)
+
+        atexit.register(cls.shutdown)
+        logger.info(f"Webhook queue started with {len(cls._workers)} workers "
+                    f"(capacity: {Config.WEBHOOK_QUEUE_SIZE})")
+
+    @classmethod
+    def enqueue(cls, data: Dict[str, Any], service_type: Optional[str] = None) -> str:
+        """
+        Add a webhook to the queue
+
+        Args:
+            data: The webhook payload data
+            service_type: Optional service type override ('radarr' or 'sonarr')
+
+        Returns:
+            The event ID assigned to the webhook
+
+        Raises:
+            QueueFullError: If the queue is not running or is at capacity
+        """
+        if cls._queue is None:
+            raise QueueFullError("Webhook queue is not running")
+
+        item = QueuedWebhook(data, service_type)
+        try:
+            cls._queue.put_nowait(item)
+        except queue.Full:
+            with cls._lock:
+                cls._stats['rejected'] += 1
+            logger.warning(f"Webhook queue full, rejecting {data.get('eventType', 'Unknown')} event")
+            raise QueueFullError("Webhook queue is full")
+
+        with cls._lock:
+            cls._stats['accepted'] += 1
+            cls._record_result(item.event_id, {
+                'status': 'queued',
+                'service_type': service_type,
+                'event_type': data.get('eventType', 'Unknown'),
+                'enqueued_at': datetime.fromtimestamp(item.enqueued_at).isoformat()
+            })
+
+        return item.event_id
+
+    @classmethod
+    def get_result(cls, event_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the processing outcome of a queued webhook
+
+        Args:
+            event_id: The event ID returned by enqueue
+
+        Returns:
+            Dictionary with the event status or None if unknown
+        """
+        with cls._lock:
+            result = cls._results.get(event_id)
+            return dict(result) if result else None
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """Return queue depth, processing lag and counters"""
+        depth = 0
+        oldest_age = 0.0
+        if cls._queue is not None:
+            with cls._queue.mutex:
+                depth = len(cls._queue.queue)
+                if depth:
+                    oldest_age = time.time() - cls._queue.queue[0].enqueued_at
+
+        with cls._lock:
+            stats = dict(cls._stats)
+
+        stats.update({
+            'running': cls._queue is not None,
+            'workers': len(cls._workers),
+            'capacity': Config.WEBHOOK_QUEUE_SIZE,
+            'depth': depth,
+            'oldest_pending_age_seconds': round(oldest_age, 3)
+        })
+        return stats
+
+    @classmethod
+    def shutdown(cls, timeout: float = 30.0) -> None:
+        """
+        Stop the workers after the pending webhooks have been processed
+
+        Args:
+            timeout: Maximum number of seconds to wait for each worker
+        """
+        with cls._lock:
+            if cls._queue is None:
+                return
+            work_queue = cls._queue
+            workers = cls._workers
+
+        logger.info(f"Draining webhook queue ({work_queue.qsize()} pending)")
+        for _ in workers:
+            work_queue.put(None)
+        for worker in workers:
+            worker.join(timeout)
+
+        with cls._lock:
+            cls._queue = None
+            cls._workers = []
+
+    @classmethod
+    def _worker_loop(cls) -> None:
+        """Process webhooks from the queue until a stop sentinel is received"""
+        work_queue = cls._queue
+        while True:
+            item = work_queue.get()
+            if item is None:
+                work_queue.task_done()
+                break
+
+            try:
+                cls._process(item)
+            finally:
+                work_queue.task_done()
+
+    @classmethod
+    def _process(cls, item: QueuedWebhook) -> None:
+        """Run the processor for a single webhook and record the outcome"""
+        lag = time.time() - item.enqueued_at
+        with cls._lock:
+            cls._stats['last_lag_seconds'] = round(lag, 3)
+            cls._stats['max_lag_seconds'] = round(max(cls._stats['max_lag_seconds'], lag), 3)
+            cls._update_result(item.event_id, status='processing')
+
+        try:
+            response_data, status_code = cls._processor(item.data, service_type=item.service_type)
+            status = 'done' if status_code < 400 else 'failed'
+        except Exception as e:
+            logger.exception(f"Error processing queued webhook {item.event_id}: {e}")
+            response_data, status_code = {"error": f"Internal error: {str(e)}"}, 500
+            status = 'failed'
+
+        with cls._lock:
+            cls._stats['processed' if status == 'done' else 'failed'] += 1
+            cls._update_result(
+                item.event_id,
+                status=status,
+                status_code=status_code,
+                response=response_data,
+                finished_at=datetime.now().isoformat()
+            )
+
+    @classmethod
+    def _record_result(cls, event_id: str, result: Dict[str, Any]) -> None:
+        """Store an event outcome, evicting the oldest ones (caller holds the lock)"""
+        cls._results[event_id] = result
+        while len(cls._results) > RESULT_HISTORY_SIZE:
+            cls._results.popitem(last=False)
+
+    @classmethod
+    def _update_result(cls, event_id: str, **fields) -> None:
+        """Update a stored event outcome (caller holds the lock)"""
+        result = cls._results.get(event_id)
+        if result is not None:
+            result.update(fields)
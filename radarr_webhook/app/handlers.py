@@ -2,7 +2,7 @@
 Webhook handlers for Radarr and Sonarr
 """
 import json
-from typing import Dict, Any, Union, Tuple
+from typing import Dict, Any, Union, Tuple, Optional
 
 from app.core.config import Config, logger
 from app.radarr.models import RadarrEvent
@@ -27,14 +27,14 @@ class WebhookHandler:
         Returns:
             Tuple of (response_data, status_code)
         """
-        # Save webhook data for debugging
-        WebhookStorage.save_latest_webhook(data)
-        WebhookStorage.append_to_history(data)
-        
         # Determine service type if not provided
         if not service_type:
             service_type = WebhookHandler._detect_service_type(data)
             
+        # Save webhook data for debugging
+        WebhookStorage.save_latest_webhook(data, service_type=service_type)
+        WebhookStorage.append_to_history(data, service_type=service_type)
+        
         # Log the webhook event
         event_type = data.get('eventType', 'Unknown')
         logger.info(f"Received {service_type} webhook: {event_type}")
@@ -48,6 +48,33 @@ class WebhookHandler:
             logger.warning(f"Service type '{service_type}' not enabled or unsupported")
             return {"error": f"Service type '{service_type}' not enabled or unsupported"}, 400
     
+    @staticmethod
+    def validate_webhook(data: Any, service_type: str = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Validate an incoming webhook before it is queued for processing
+
+        Args:
+            data: The webhook payload data
+            service_type: Optional service type override ('radarr' or 'sonarr')
+
+        Returns:
+            Tuple of (service_type, error)
+            error is None if the webhook can be processed
+        """
+        if not isinstance(data, dict):
+            return None, "Webhook payload must be a JSON object"
+
+        # Determine service type if not provided
+        if not service_type:
+            service_type = WebhookHandler._detect_service_type(data)
+
+        if service_type == 'radarr' and Config.RADARR_ENABLED:
+            return service_type, None
+        elif service_type == 'sonarr' and Config.SONARR_ENABLED:
+            return service_type, None
+
+        return service_type, f"Service type '{service_type}' not enabled or unsupported"
+
     @staticmethod
     def _detect_service_type(data: Dict[str, Any]) -> str:
         """
@@ -91,8 +118,8 @@ class WebhookHandler:
             if not Config.DOWNLOAD_MONITOR_ENABLED:
                 return {"message": "Download monitoring disabled, event logged only"}, 200
                 
-            # Send to download monitor
-            handled = RadarrDownloadMonitor.handle_event(data)
+            # Send the parsed event to the download monitor
+            handled = RadarrDownloadMonitor.handle_event(event)
             
             if handled:
                 return {"message": f"Successfully processed {event.event_type} event"}, 200
@@ -125,8 +152,8 @@ class WebhookHandler:
             if not Config.DOWNLOAD_MONITOR_ENABLED:
                 return {"message": "Download monitoring disabled, event logged only"}, 200
                 
-            # Send to download monitor
-            handled = SonarrDownloadMonitor.handle_event(data)
+            # Send the parsed event to the download monitor
+            handled = SonarrDownloadMonitor.handle_event(event)
             
             if handled:
                 return {"message": f"Successfully processed {event.event_type} event"}, 200
@@ -6,11 +6,15 @@ and facilitate access to information in notifications.
 """
 from typing import Dict, Any, Optional
 
-from app.core.models import ArrEvent, MediaItem, RemoteMedia
+from app.core.models import ArrEvent, MediaItem, RemoteMedia, extract_poster, UNSET
 
 
 class Movie(MediaItem):
     """Model for a movie from Radarr"""
+    __slots__ = (
+        'year', 'release_date', 'tmdb_id', 'imdb_id', 'overview', 'genres', '_images',
+        '_poster', 'quality'
+    )
     
     def __init__(self, data: Dict[str, Any] = None):
         super().__init__(data)
@@ -22,17 +26,21 @@ class Movie(MediaItem):
         self.overview = data.get('overview')
         self.genres = data.get('genres', [])
         
-        # Extract poster URL from images
-        self.poster = None
-        images = data.get('images', [])
-        for image in images:
-            if image.get('coverType') == 'poster':
-                self.poster = image.get('url')
-                break
+        # Poster URL is extracted from images on first access
+        self._images = data.get('images')
+        self._poster = UNSET
         
         # Additional properties
         self.quality = self._extract_quality(data)
     
+    @property
+    def poster(self) -> Optional[str]:
+        """Poster URL of the movie"""
+        if self._poster is UNSET:
+            self._poster = extract_poster(self._images)
+            self._images = None
+        return self._poster
+    
     def _extract_quality(self, data: Dict[str, Any]) -> str:
         """Extract quality information from movie data"""
         if 'quality' in data and 'quality' in data['quality']:
@@ -45,6 +53,7 @@ class Movie(MediaItem):
 
 class RemoteMovie(RemoteMedia):
     """Model for remote movie information"""
+    __slots__ = ('year', 'tmdb_id', 'imdb_id', 'quality')
     
     def __init__(self, data: Dict[str, Any] = None):
         super().__init__(data)
@@ -64,6 +73,7 @@ class RemoteMovie(RemoteMedia):
 
 class RadarrEvent(ArrEvent):
     """Model for Radarr-specific events"""
+    __slots__ = ('movie', 'remote_movie')
     
     def __init__(self, data: Dict[str, Any] = None):
         super().__init__(data)
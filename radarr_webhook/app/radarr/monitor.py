@@ -1,7 +1,7 @@
 """
 Radarr-specific implementation for monitoring downloads.
 """
-from typing import Dict, Any
+from typing import Dict, Any, Union
 
 from app.core.config import logger
 from app.core.monitor import DownloadMonitor
@@ -14,19 +14,18 @@ class RadarrDownloadMonitor(DownloadMonitor):
     """
     
     @staticmethod
-    def handle_event(event_data: Dict[str, Any]) -> bool:
+    def handle_event(event_data: Union[RadarrEvent, Dict[str, Any]]) -> bool:
         """
         Handle a webhook event from Radarr
         
         Args:
-            event_data: Raw event data from Radarr webhook
+            event_data: Parsed RadarrEvent, or raw event data from Radarr webhook
             
         Returns:
             True if the event was handled successfully, False otherwise
         """
-        # Create RadarrEvent from raw data
-        event = RadarrEvent(event_data)
-        logger.info(f"Processing Radarr {event.event_type} event for {event.get_media_title()}")
+        # Reuse the event parsed by the webhook handler when available
+        event = event_data if isinstance(event_data, RadarrEvent) else RadarrEvent(event_data)
         
         # Handle based on event type
         if event.event_type == "Grab":
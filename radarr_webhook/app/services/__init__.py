@@ -1,5 +1,6 @@
 """Services module for external integrations like qBittorrent."""
 
 from app.services.qbittorrent import QBittorrentClient
+from app.services.qbittorrent_sync import QBittorrentSync
 
-__all__ = ['QBittorrentClient'] 
\ No newline at end of file
+__all__ = ['QBittorrentClient', 'QBittorrentSync'] 
\ No newline at end of file
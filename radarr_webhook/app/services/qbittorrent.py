@@ -6,6 +6,7 @@ from typing import Dict, Any, Optional, List, Tuple
 import os
 
 from app.core.config import Config, logger
+from app.services.qbittorrent_sync import QBittorrentSync
 
 
 class QBittorrentClient:
@@ -39,6 +40,9 @@ class QBittorrentClient:
         except Exception as e:
             logger.error(f"Failed to connect to qBittorrent: {e}")
             self.connected = False
+        
+        # Local mirror of torrent state kept up to date with sync/maindata
+        self.sync = QBittorrentSync(self.client) if Config.QBITTORRENT_SYNC_ENABLED else None
     
     def get_torrent_status(self, torrent_hash: str) -> Tuple[bool, Dict[str, Any]]:
         """
@@ -60,33 +64,17 @@ class QBittorrentClient:
             # Normalize the hash (qBittorrent expects lowercase)
             torrent_hash = torrent_hash.lower()
             
-            # Get torrent info
-            torrent = self.client.torrents_info(hashes=torrent_hash)
+            # Read from the sync mirror, or ask for this torrent if it is unavailable
+            torrent = self.sync.get_torrent(torrent_hash) if self.sync else None
+            if torrent is None:
+                torrents = self.client.torrents_info(hashes=torrent_hash)
+                torrent = torrents[0] if torrents else {}
             
             if not torrent:
                 logger.warning(f"Torrent {torrent_hash} not found in qBittorrent")
                 return False, {}
             
-            # Get the first (and only) torrent in the list
-            torrent_info = torrent[0]
-            
-            # Check if torrent is completed
-            is_completed = torrent_info.progress == 1.0 and torrent_info.state in [
-                "uploading", "pausedUP", "queuedUP", "stalledUP", "forcedUP", "checkingUP"
-            ]
-            
-            # Create a dictionary with torrent information
-            info = {
-                "hash": torrent_info.hash,
-                "name": torrent_info.name,
-                "progress": torrent_info.progress,
-                "state": torrent_info.state,
-                "size": torrent_info.size,
-                "content_path": torrent_info.content_path,
-                "download_path": torrent_info.download_path,
-                "save_path": torrent_info.save_path,
-                "completed": is_completed
-            }
+            is_completed, info = self._build_torrent_info(torrent)
             
             logger.info(f"Torrent {torrent_hash} status: {info['state']} ({info['progress']*100:.1f}%)")
             return is_completed, info
@@ -95,6 +83,84 @@ class QBittorrentClient:
             logger.error(f"Error checking torrent status: {e}")
             return False, {}
     
+    def get_torrents_status(self, torrent_hashes: List[str]) -> Optional[Dict[str, Tuple[bool, Dict[str, Any]]]]:
+        """
+        Get the status of several torrents with a single API call
+        
+        Args:
+            torrent_hashes: The hashes of the torrents to check
+            
+        Returns:
+            Dictionary mapping each found lowercase hash to a tuple of
+            (is_finished, torrent_info) as returned by get_torrent_status.
+            Torrents that are not in qBittorrent are left out.
+            None if the status could not be retrieved.
+        """
+        if not self.connected:
+            logger.warning("qBittorrent client not connected")
+            return None
+        
+        if not torrent_hashes:
+            return {}
+        
+        try:
+            hashes = sorted({torrent_hash.lower() for torrent_hash in torrent_hashes})
+            
+            # Read from the sync mirror when it is available
+            mirrored = self.sync.get_torrents(hashes) if self.sync else None
+            if mirrored is not None:
+                return {torrent_hash: self._build_torrent_info(torrent)
+                        for torrent_hash, torrent in mirrored.items()}
+            
+            # qBittorrent accepts a |-separated list of lowercase hashes
+            torrents = self.client.torrents_info(hashes='|'.join(hashes))
+            
+            statuses = {}
+            for torrent in torrents:
+                statuses[torrent['hash'].lower()] = self._build_torrent_info(torrent)
+            
+            logger.info(f"Fetched status of {len(statuses)}/{len(hashes)} torrents in one request")
+            return statuses
+            
+        except Exception as e:
+            logger.error(f"Error checking torrents status: {e}")
+            return None
+    
+    @staticmethod
+    def _build_torrent_info(torrent) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Convert a torrent returned by the API into a status tuple
+        
+        Args:
+            torrent: Torrent dictionary from torrents_info or the sync mirror
+            
+        Returns:
+            Tuple of (is_finished, torrent_info)
+        """
+        progress = torrent.get('progress', 0)
+        state = torrent.get('state', 'unknown')
+        
+        # Check if torrent is completed
+        is_completed = progress == 1.0 and state in [
+            "uploading", "pausedUP", "queuedUP", "stalledUP", "forcedUP", "checkingUP"
+        ]
+        
+        # Create a dictionary with torrent information
+        info = {
+            "hash": torrent.get('hash'),
+            "name": torrent.get('name'),
+            "progress": progress,
+            "state": state,
+            "size": torrent.get('size', 0),
+            "content_path": torrent.get('content_path'),
+            "download_path": torrent.get('download_path'),
+            "save_path": torrent.get('save_path'),
+            "dlspeed": torrent.get('dlspeed', 0),
+            "eta": torrent.get('eta'),
+            "completed": is_completed
+        }
+        return is_completed, info
+    
     def get_torrent_files(self, torrent_hash: str) -> List[Dict[str, Any]]:
         """
         Get the list of files in a torrent
@@ -161,6 +227,35 @@ class QBittorrentClient:
         if not info:
             return None
         
+        path = self.resolve_download_path(torrent_hash, info)
+        if path:
+            return path
+                
+        # Try to determine if this is a single file torrent by getting files
+        try:
+            files = self.get_torrent_files(torrent_hash)
+            if len(files) == 1 and 'save_path' in info and 'name' in info:
+                # This is a single file torrent
+                file_path = os.path.join(info['save_path'], files[0]['name'])
+                logger.info(f"Single file torrent {torrent_hash}: {file_path}")
+                return file_path
+        except Exception as e:
+            logger.error(f"Error checking torrent files: {e}")
+        
+        return None
+    
+    @staticmethod
+    def resolve_download_path(torrent_hash: str, info: Dict[str, Any]) -> Optional[str]:
+        """
+        Get the download path of a torrent from its status, without API calls
+        
+        Args:
+            torrent_hash: The hash of the torrent
+            info: Torrent information as returned by get_torrent_status
+            
+        Returns:
+            Full absolute path where the torrent is being downloaded, or None if unknown
+        """
         # First try to get content_path which points directly to the content (file or folder)
         if 'content_path' in info and info['content_path']:
             content_path = info['content_path']
@@ -180,17 +275,6 @@ class QBittorrentClient:
             path = os.path.join(info['save_path'], info['name'])
             logger.info(f"Using constructed path for {torrent_hash}: {path}")
             return path
-                
-        # Try to determine if this is a single file torrent by getting files
-        try:
-            files = self.get_torrent_files(torrent_hash)
-            if len(files) == 1 and 'save_path' in info and 'name' in info:
-                # This is a single file torrent
-                file_path = os.path.join(info['save_path'], files[0]['name'])
-                logger.info(f"Single file torrent {torrent_hash}: {file_path}")
-                return file_path
-        except Exception as e:
-            logger.error(f"Error checking torrent files: {e}")
         
         return None
     
@@ -230,4 +314,35 @@ class QBittorrentClient:
             
         except Exception as e:
             logger.error(f"Error deleting torrent {torrent_hash}: {e}")
-            return False 
\ No newline at end of file
+            return False
+    
+    def delete_torrents(self, torrent_hashes: List[str], with_files: bool = False) -> bool:
+        """
+        Delete several torrents from qBittorrent with a single API call
+        
+        Args:
+            torrent_hashes: The hashes of the torrents to delete
+            with_files: If True, also delete downloaded files
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if not self.connected:
+            logger.warning("qBittorrent client not connected")
+            return False
+        
+        if not torrent_hashes:
+            return True
+        
+        try:
+            # qBittorrent accepts a |-separated list of lowercase hashes, unknown ones are ignored
+            hashes = sorted({torrent_hash.lower() for torrent_hash in torrent_hashes})
+            self.client.torrents_delete(delete_files=with_files, hashes='|'.join(hashes))
+            
+            action = "and files " if with_files else ""
+            logger.info(f"Deleted {len(hashes)} torrents {action}in one request")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error deleting {len(torrent_hashes)} torrents: {e}")
+            return False
@@ -0,0 +1,181 @@
+"""
+Incremental qBittorrent sync module.
+Keeps a local mirror of the torrent list using the sync/maindata endpoint,
+which only returns the torrents that changed since the last response id.
+"""
+import time
+import threading
+from typing import Dict, Any, Optional, List
+
+from app.core.config import Config, logger
+
+
+# Torrent fields kept in the mirror
+MIRROR_FIELDS = (
+    'name', 'progress', 'state', 'size', 'content_path', 'download_path', 'save_path',
+    'dlspeed', 'eta', 'amount_left', 'completion_on'
+)
+
+
+class QBittorrentSync:
+    """
+    Local mirror of qBittorrent torrent state, refreshed from sync/maindata.
+    Reads refresh the mirror at most once per QBITTORRENT_SYNC_MAX_AGE
+    seconds, so any number of lookups costs at most one request. A lookup
+    missing a torrent syncs once more before reporting it absent, since the
+    torrent may have been added after the last sync. Torrents a sync found
+    absent are remembered for the maximum age, so looking them up again does
+    not sync every time.
+    """
+
+    def __init__(self, client):
+        """
+        Args:
+            client: Logged in qbittorrentapi.Client
+        """
+        self.client = client
+        self._lock = threading.Lock()
+        self._rid = 0
+        self._torrents: Dict[str, Dict[str, Any]] = {}
+        self._synced_at: Optional[float] = None
+        self._missing: Dict[str, float] = {}  # hash -> when a sync found it absent
+        self._stats = {
+            'full_updates': 0,
+            'partial_updates': 0,
+            'errors': 0,
+        }
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Bring the mirror up to date if it is older than the maximum age
+
+        Args:
+            force: Sync even if the mirror is still fresh
+
+        Returns:
+            True if the mirror is usable, False if syncing failed
+        """
+        with self._lock:
+            if (not force and self._synced_at is not None
+                    and time.time() - self._synced_at < Config.QBITTORRENT_SYNC_MAX_AGE):
+                return True
+
+            try:
+                data = self.client.sync_maindata(rid=self._rid)
+            except Exception as e:
+                logger.error(f"Error syncing torrents from qBittorrent: {e}")
+                self._stats['errors'] += 1
+                # Start over with a full update once qBittorrent is reachable again
+                self._rid = 0
+                self._synced_at = None
+                return False
+
+            self._apply(data)
+            self._synced_at = time.time()
+            return True
+
+    def get_torrent(self, torrent_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the mirrored state of a torrent
+
+        Args:
+            torrent_hash: The hash of the torrent
+
+        Returns:
+            Copy of the torrent fields, an empty dict if qBittorrent does not
+            have the torrent, or None if the mirror could not be synced
+        """
+        torrents = self.get_torrents([torrent_hash])
+        if torrents is None:
+            return None
+        return torrents.get(torrent_hash.lower(), {})
+
+    def get_torrents(self, torrent_hashes: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Get the mirrored state of several torrents
+
+        Args:
+            torrent_hashes: The hashes of the torrents
+
+        Returns:
+            Dictionary mapping each found lowercase hash to a copy of its
+            fields, or None if the mirror could not be synced
+        """
+        synced_at = self._synced_at
+        if not self.refresh():
+            return None
+        hashes = {torrent_hash.lower() for torrent_hash in torrent_hashes}
+        torrents = self._lookup(hashes)
+        missing = hashes.difference(torrents)
+
+        # Missing torrents may have been added since the last sync, unless the
+        # mirror was synced just now or they were found absent recently
+        if missing and self._synced_at == synced_at and not self._recently_missing(missing):
+            if not self.refresh(force=True):
+                return None
+            torrents = self._lookup(hashes)
+            missing = hashes.difference(torrents)
+
+        if missing and self._synced_at != synced_at:
+            self._remember_missing(missing)
+        return torrents
+
+    def _lookup(self, torrent_hashes) -> Dict[str, Dict[str, Any]]:
+        """Copy the mirrored fields of the given lowercase hashes that are present"""
+        with self._lock:
+            torrents = {}
+            for torrent_hash in torrent_hashes:
+                torrent = self._torrents.get(torrent_hash)
+                if torrent:
+                    torrents[torrent_hash] = dict(torrent, hash=torrent_hash)
+            return torrents
+
+    def _recently_missing(self, torrent_hashes) -> bool:
+        """Check whether a sync found all the given hashes absent within the maximum age"""
+        now = time.time()
+        with self._lock:
+            return all(now - self._missing.get(torrent_hash, float('-inf')) < Config.QBITTORRENT_SYNC_MAX_AGE
+                       for torrent_hash in torrent_hashes)
+
+    def _remember_missing(self, torrent_hashes) -> None:
+        """Record hashes the last sync found absent and forget expired ones"""
+        now = time.time()
+        with self._lock:
+            self._missing = {torrent_hash: found_at for torrent_hash, found_at in self._missing.items()
+                             if now - found_at < Config.QBITTORRENT_SYNC_MAX_AGE}
+            self._missing.update(dict.fromkeys(torrent_hashes, now))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the mirror size, response id and update counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'torrents': len(self._torrents),
+                'rid': self._rid,
+                'last_sync_age_seconds': round(time.time() - self._synced_at, 3)
+                if self._synced_at is not None else None
+            })
+        return stats
+
+    def _apply(self, data: Dict[str, Any]) -> None:
+        """Merge a maindata response into the mirror (caller holds the lock)"""
+        changed = data.get('torrents') or {}
+
+        if data.get('full_update'):
+            # The server sent the complete state, anything not in it is gone
+            self._torrents = {}
+            self._stats['full_updates'] += 1
+            logger.info(f"Full qBittorrent sync: {len(changed)} torrents")
+        else:
+            self._stats['partial_updates'] += 1
+
+        for torrent_hash, fields in changed.items():
+            torrent = self._torrents.setdefault(torrent_hash.lower(), {})
+            for field in MIRROR_FIELDS:
+                if field in fields:
+                    torrent[field] = fields[field]
+
+        for torrent_hash in data.get('torrents_removed') or []:
+            self._torrents.pop(torrent_hash.lower(), None)
+
+        self._rid = data.get('rid', self._rid)
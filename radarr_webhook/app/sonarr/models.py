@@ -6,11 +6,15 @@ and facilitate access to information in notifications.
 """
 from typing import Dict, Any, Optional, List
 
-from app.core.models import MediaItem, RemoteMedia, ArrEvent, Release
+from app.core.models import MediaItem, RemoteMedia, ArrEvent, Release, extract_poster, UNSET
 
 
 class Series(MediaItem):
     """Model for a series from Sonarr"""
+    __slots__ = (
+        'title_slug', 'tvdb_id', 'imdb_id', 'overview', 'series_type', 'year', 'path',
+        '_images', '_poster'
+    )
     
     def __init__(self, data: Dict[str, Any] = None):
         super().__init__(data)
@@ -23,13 +27,17 @@ class Series(MediaItem):
         self.year = data.get('year')
         self.path = data.get('path')  # synonym for folder_path
         
-        # Extract poster URL from images
-        self.poster = None
-        images = data.get('images', [])
-        for image in images:
-            if image.get('coverType') == 'poster':
-                self.poster = image.get('url')
-                break
+        # Poster URL is extracted from images on first access
+        self._images = data.get('images')
+        self._poster = UNSET
+    
+    @property
+    def poster(self) -> Optional[str]:
+        """Poster URL of the series"""
+        if self._poster is UNSET:
+            self._poster = extract_poster(self._images)
+            self._images = None
+        return self._poster
     
     def __str__(self) -> str:
         return f"{self.title} ({self.year or 'Unknown Year'})"
@@ -37,6 +45,11 @@ class Series(MediaItem):
 
 class Episode(MediaItem):
     """Model for an episode from Sonarr"""
+    __slots__ = (
+        'episode_number', 'season_number', 'air_date', 'air_date_utc', 'quality',
+        'quality_version', 'scene_episode_number', 'scene_season_number',
+        'absolute_episode_number', 'series_id', 'file_path'
+    )
     
     def __init__(self, data: Dict[str, Any] = None):
         super().__init__(data)
@@ -66,6 +79,7 @@ class Episode(MediaItem):
 
 class RemoteEpisode(RemoteMedia):
     """Model for remote episode information"""
+    __slots__ = ('episodes', 'series_title')
     
     def __init__(self, data: Dict[str, Any] = None):
         super().__init__(data)
@@ -91,6 +105,7 @@ class RemoteEpisode(RemoteMedia):
 
 class SonarrEvent(ArrEvent):
     """Model for Sonarr-specific events"""
+    __slots__ = ('series', 'episodes', '_remote_episode_data', '_remote_episode')
     
     def __init__(self, data: Dict[str, Any] = None):
         super().__init__(data)
@@ -102,11 +117,22 @@ class SonarrEvent(ArrEvent):
             for episode_data in data.get('episodes', []):
                 self.episodes.append(Episode(episode_data))
         
-        self.remote_episode = RemoteEpisode(data.get('remoteEpisode')) if data.get('remoteEpisode') else None
+        # Remote episode information, parsed on first access
+        self._remote_episode_data = data.get('remoteEpisode')
+        self._remote_episode = UNSET
         
         # Set media type
         self.media_type = "series"
     
+    @property
+    def remote_episode(self) -> Optional[RemoteEpisode]:
+        """Remote episode information of the event"""
+        if self._remote_episode is UNSET:
+            data = self._remote_episode_data
+            self._remote_episode = RemoteEpisode(data) if data else None
+            self._remote_episode_data = None
+        return self._remote_episode
+    
     def get_media_title(self) -> str:
         """Get the title of the series involved in this event"""
         if self.series:
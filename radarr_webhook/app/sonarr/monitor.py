@@ -1,7 +1,7 @@
 """
 Sonarr-specific implementation for monitoring TV series downloads.
 """
-from typing import Dict, Any
+from typing import Dict, Any, Union
 
 from app.core.config import logger
 from app.core.monitor import DownloadMonitor
@@ -14,19 +14,18 @@ class SonarrDownloadMonitor(DownloadMonitor):
     """
     
     @staticmethod
-    def handle_event(event_data: Dict[str, Any]) -> bool:
+    def handle_event(event_data: Union[SonarrEvent, Dict[str, Any]]) -> bool:
         """
         Handle a webhook event from Sonarr
         
         Args:
-            event_data: Raw event data from Sonarr webhook
+            event_data: Parsed SonarrEvent, or raw event data from Sonarr webhook
             
         Returns:
             True if the event was handled successfully, False otherwise
         """
-        # Create SonarrEvent from raw data
-        event = SonarrEvent(event_data)
-        logger.info(f"Processing Sonarr {event.event_type} event for {event.get_media_title()}")
+        # Reuse the event parsed by the webhook handler when available
+        event = event_data if isinstance(event_data, SonarrEvent) else SonarrEvent(event_data)
         
         # Handle based on event type
         if event.event_type == "Grab":
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for webhook event parsing.
+
+Compares the per-webhook cost of the old flow, where the handler and the
+monitor each built the event model and every sub-object was parsed eagerly,
+with the current flow that parses the payload once and builds the release,
+remote episode and poster only when they are accessed.
+
+Usage (from the radarr_webhook directory):
+    python -m benchmarks.bench_event_parsing [--iterations N] [--episodes N]
+"""
+import os
+import sys
+import argparse
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.radarr.models import RadarrEvent
+from app.sonarr.models import SonarrEvent
+
+
+def make_images():
+    return [
+        {'coverType': 'banner', 'url': '/MediaCover/1/banner.jpg', 'remoteUrl': 'https://example.org/banner.jpg'},
+        {'coverType': 'fanart', 'url': '/MediaCover/1/fanart.jpg', 'remoteUrl': 'https://example.org/fanart.jpg'},
+        {'coverType': 'poster', 'url': '/MediaCover/1/poster.jpg', 'remoteUrl': 'https://example.org/poster.jpg'},
+    ]
+
+
+def make_release():
+    return {
+        'quality': 'WEBDL-1080p',
+        'qualityVersion': 1,
+        'releaseGroup': 'GROUP',
+        'releaseTitle': 'Show.S01.1080p.WEB-DL.DDP5.1.H.264-GROUP',
+        'indexer': 'Indexer',
+        'size': 45 * 1024 ** 3,
+        'customFormatScore': 100,
+        'customFormats': ['x264', 'DD+'],
+        'indexerFlags': [],
+        'languages': [{'id': 1, 'name': 'English'}, {'id': 2, 'name': 'French'}],
+    }
+
+
+def make_sonarr_grab(episode_count: int):
+    episodes = [{
+        'id': 1000 + number,
+        'episodeNumber': number,
+        'seasonNumber': 1,
+        'title': f'Episode {number}',
+        'overview': 'An overview of the episode. ' * 10,
+        'airDate': '2024-01-01',
+        'airDateUtc': '2024-01-01T00:00:00Z',
+        'seriesId': 1,
+    } for number in range(1, episode_count + 1)]
+
+    return {
+        'eventType': 'Grab',
+        'instanceName': 'Sonarr',
+        'applicationUrl': '',
+        'downloadClient': 'qBittorrent',
+        'downloadClientType': 'qBittorrent',
+        'downloadId': 'ABCDEF0123456789ABCDEF0123456789ABCDEF01',
+        'series': {
+            'id': 1,
+            'title': 'Show',
+            'titleSlug': 'show',
+            'path': '/tv/Show',
+            'tvdbId': 12345,
+            'imdbId': 'tt0000001',
+            'overview': 'A long overview of the show. ' * 20,
+            'year': 2024,
+            'images': make_images(),
+            'tags': [],
+        },
+        'episodes': episodes,
+        'remoteEpisode': {'title': 'Show', 'episodes': episodes, 'series': {'title': 'Show'}},
+        'release': make_release(),
+    }
+
+
+def make_radarr_grab():
+    return {
+        'eventType': 'Grab',
+        'instanceName': 'Radarr',
+        'downloadClient': 'qBittorrent',
+        'downloadId': 'ABCDEF0123456789ABCDEF0123456789ABCDEF02',
+        'movie': {
+            'id': 1,
+            'title': 'Movie',
+            'year': 2024,
+            'folderPath': '/movies/Movie (2024)',
+            'tmdbId': 1,
+            'imdbId': 'tt0000002',
+            'overview': 'A long overview of the movie. ' * 20,
+            'genres': ['Drama'],
+            'images': make_images(),
+        },
+        'remoteMovie': {'title': 'Movie', 'year': 2024, 'tmdbId': 1, 'imdbId': 'tt0000002'},
+        'release': make_release(),
+    }
+
+
+def old_flow(event_class, data):
+    """Handler and monitor both build the event and all sub-objects are parsed"""
+    for _ in range(2):
+        event = event_class(data)
+        event.get_media_title()
+        if event.release:
+            event.release.languages
+        if isinstance(event, SonarrEvent):
+            event.remote_episode
+            event.series.poster
+        else:
+            event.movie.poster
+
+
+def new_flow(event_class, data):
+    """The handler builds the event once and passes it to the monitor"""
+    event = event_class(data)
+    event.get_media_title()
+    event.should_monitor_download()
+
+
+def run(name, event_class, data, iterations):
+    old = timeit.timeit(lambda: old_flow(event_class, data), number=iterations)
+    new = timeit.timeit(lambda: new_flow(event_class, data), number=iterations)
+    print(f"{name}:")
+    print(f"  before: {old / iterations * 1e6:8.1f} us/webhook")
+    print(f"  after:  {new / iterations * 1e6:8.1f} us/webhook")
+    print(f"  saving: {(1 - new / old) * 100:8.1f} %")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--episodes', type=int, default=24, help='episodes in the Sonarr season pack')
+    args = parser.parse_args()
+
+    run("Radarr Grab", RadarrEvent, make_radarr_grab(), args.iterations)
+    run(f"Sonarr Grab ({args.episodes} episode season pack)", SonarrEvent,
+        make_sonarr_grab(args.episodes), args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for linking a season pack into the library.
+
+Compares the old serial flow, which checked and created the destination
+folder and checked the destination file for every file before linking it,
+with the LinkExecutor, which creates each folder once per pass and links on
+a thread pool. --latency adds a delay to every file system call to mimic
+network storage, where the saved round trips matter most.
+
+Usage (from the radarr_webhook directory):
+    python -m benchmarks.bench_link_executor [--files N] [--latency MS]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.linker import LinkExecutor, LinkJob
+
+
+def add_latency(latency: float):
+    """Wrap the file system calls used while linking with a fixed delay"""
+    def delayed(function):
+        def wrapper(*args, **kwargs):
+            time.sleep(latency)
+            return function(*args, **kwargs)
+        return wrapper
+
+    os.link = delayed(os.link)
+    os.makedirs = delayed(os.makedirs)
+    os.stat = delayed(os.stat)
+    os.path.exists = delayed(os.path.exists)
+
+
+def make_source(root: str, file_count: int):
+    """Create a season pack with the episodes and their subtitles in a Subs folder"""
+    files = []
+    for number in range(file_count):
+        if number % 2:
+            relative_path = os.path.join('Show.S01', 'Subs', f'Show.S01E{number:03d}.srt')
+        else:
+            relative_path = os.path.join('Show.S01', f'Show.S01E{number:03d}.mkv')
+        source_file = os.path.join(root, relative_path)
+        os.makedirs(os.path.dirname(source_file), exist_ok=True)
+        with open(source_file, 'wb') as f:
+            f.write(b'x' * 1024)
+        files.append((source_file, relative_path))
+    return files
+
+
+def old_flow(files, library):
+    """Serial linking with per-file directory and destination checks"""
+    for source_file, relative_path in files:
+        dest_file = os.path.join(library, relative_path)
+        dest_dir = os.path.dirname(dest_file)
+        if not os.path.exists(dest_dir):
+            os.makedirs(dest_dir, exist_ok=True)
+        if os.path.exists(dest_file):
+            continue
+        os.link(source_file, dest_file)
+
+
+def new_flow(files, library):
+    """One LinkExecutor pass"""
+    LinkExecutor.link_files([LinkJob(source_file, library, relative_path, 1024)
+                             for source_file, relative_path in files])
+
+
+def run(name, flow, files, root):
+    library = os.path.join(root, f'library-{name}')
+    started = time.perf_counter()
+    flow(files, library)
+    elapsed = time.perf_counter() - started
+    print(f"  {name}: {elapsed * 1000:8.1f} ms ({len(files) / elapsed:8.1f} files/s)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=2.0, help='milliseconds added to each file system call')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-link-')
+    try:
+        files = make_source(root, args.files)
+        add_latency(args.latency / 1000)
+
+        print(f"Linking {args.files} files with {args.latency:g} ms per file system call:")
+        old = run('before', old_flow, files, root)
+        new = run('after', new_flow, files, root)
+        print(f"  speedup: {old / new:8.1f} x")
+    finally:
+        LinkExecutor.shutdown()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for the event and download models.
+
+Measures the memory retained by N tracked downloads, each holding a
+DownloadInfo and the grab event that started it. The baseline uses
+dict-backed replicas of the models that keep the full payload as
+raw_data; the current models use __slots__ and keep raw_data according
+to EVENT_RAW_DATA.
+
+Usage (from the radarr_webhook directory):
+    python -m benchmarks.bench_model_memory [--downloads N] [--episodes N]
+"""
+import os
+import sys
+import gc
+import json
+import argparse
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import Config
+from app.core.models import DownloadInfo
+from app.radarr.models import RadarrEvent
+from app.sonarr.models import SonarrEvent
+from benchmarks.bench_event_parsing import make_radarr_grab, make_sonarr_grab
+
+
+class LegacyDownloadInfo:
+    """Dict-backed DownloadInfo as it was before __slots__"""
+
+    def __init__(self, media_title, media_folder, download_id, download_client):
+        self.media_title = media_title
+        self.media_folder = media_folder
+        self.download_id = download_id
+        self.download_client = download_client
+        self.active = True
+        self.first_seen = datetime.now().isoformat()
+        self.last_check = datetime.now().isoformat()
+        self.processed_files = set()
+        self.media_type = "unknown"
+        self.torrent_path = None
+        self.media_id = None
+        self.should_delete_files = False
+        self.should_delete_torrent = False
+
+
+class LegacyObject:
+    """Dict-backed stand-in for a parsed model, holding the same attributes"""
+
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+
+def legacy_event(event, data):
+    """Rebuild a parsed event as dict-backed objects keeping the full payload"""
+    def convert(value):
+        if hasattr(value, '__slots__'):
+            attributes = {}
+            for cls in type(value).__mro__:
+                for name in getattr(cls, '__slots__', ()):
+                    attributes[name] = convert(getattr(value, name))
+            return LegacyObject(**attributes)
+        if isinstance(value, list):
+            return [convert(item) for item in value]
+        return value
+
+    converted = convert(event)
+    converted.raw_data = data
+    return converted
+
+
+def make_payload(index, episodes):
+    """Build a distinct payload per download, as if decoded from a request body"""
+    if index % 2:
+        data = make_sonarr_grab(episodes)
+    else:
+        data = make_radarr_grab()
+    data['downloadId'] = f"{index:040X}"
+    # Decode from JSON so no strings are shared between payloads
+    return json.loads(json.dumps(data))
+
+
+def build(count, episodes, legacy):
+    """Build the retained state of `count` tracked downloads"""
+    tracked = []
+    for index in range(count):
+        data = make_payload(index, episodes)
+        event = SonarrEvent(data) if index % 2 else RadarrEvent(data)
+        title = event.get_media_title()
+        if legacy:
+            event = legacy_event(event, data)
+            download = LegacyDownloadInfo(title, '/media/folder', data['downloadId'], 'qBittorrent')
+        else:
+            download = DownloadInfo(title, '/media/folder', data['downloadId'], 'qBittorrent')
+        download.processed_files.add('/downloads/file.mkv')
+        tracked.append((download, event))
+        del data
+    return tracked
+
+
+def measure(count, episodes, legacy):
+    """Return the bytes retained by the tracked downloads"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracked = build(count, episodes, legacy)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del tracked
+    return retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--downloads', type=int, default=10000)
+    parser.add_argument('--episodes', type=int, default=24, help='episodes in each Sonarr season pack')
+    args = parser.parse_args()
+
+    print(f"{args.downloads} tracked downloads (half Radarr, half {args.episodes} episode Sonarr packs):")
+    baseline = measure(args.downloads, args.episodes, legacy=True)
+    print(f"  before (dict-backed, full raw_data): {baseline / 1024 ** 2:8.1f} MiB")
+
+    for mode in ('full', 'projected', 'none'):
+        Config.EVENT_RAW_DATA = mode
+        retained = measure(args.downloads, args.episodes, legacy=False)
+        print(f"  after  (slots, raw_data={mode:<9}):   {retained / 1024 ** 2:8.1f} MiB"
+              f"  ({(1 - retained / baseline) * 100:5.1f} % less)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for persisting torrent information.
+
+Measures the cost of one save_torrent_info/delete_torrent_info pair and of
+loading the store at startup, with a given number of torrents already
+stored, for each TorrentStorage backend, and the cost of finding the
+torrents of one media ID by scanning all torrents and by index. A burst of
+grabs is timed once written through and once coalesced into one write.
+
+Usage (from the radarr_webhook directory):
+    python -m benchmarks.bench_torrent_storage [--stored N] [--mutations N] [--durability LEVEL]
+"""
+import os
+import sys
+import time
+import logging
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Importing the app opens the torrent storage, keep it away from the real config folder
+os.environ['CONFIG_DIR'] = tempfile.mkdtemp(prefix='bench-storage-')
+
+from app.core.config import Config, logger
+from app.core.storage import TorrentStorage
+
+
+# Grabs in one Sonarr burst, e.g. a season searched episode by episode
+BURST_SIZE = 50
+
+
+def fill(stored: int):
+    """Add the initial torrents in one batch of changes"""
+    torrents = {}
+    for number in range(stored):
+        torrents[f'{number:040X}'] = {
+            'media_id': number % 5000,
+            'media_title': f'Media {number}',
+            'media_path': f'/media/Media {number}',
+            'torrent_path': f'/downloads/Media.{number}.1080p',
+            'media_type': 'movie' if number % 2 else 'series',
+            'added_date': '2024-01-01T00:00:00',
+        }
+    with TorrentStorage._lock:
+        TorrentStorage._torrents.update(torrents)
+        TorrentStorage._rebuild_indexes()
+        TorrentStorage._save_changes(torrents)
+
+
+def mutate(mutations: int) -> float:
+    """Save and delete torrents, then flush, returning the elapsed seconds"""
+    started = time.perf_counter()
+    for number in range(mutations):
+        download_id = f'BENCH{number:035X}'
+        TorrentStorage.save_torrent_info(download_id, number, 'Bench', '/media/Bench',
+                                         '/downloads/Bench', 'movie')
+        TorrentStorage.delete_torrent_info(download_id)
+    TorrentStorage.flush()
+    return time.perf_counter() - started
+
+
+def run(backend: str, stored: int, mutations: int):
+    config_dir = tempfile.mkdtemp(prefix='bench-storage-')
+    os.environ['CONFIG_DIR'] = config_dir
+    Config.TORRENT_STORAGE_BACKEND = backend
+    try:
+        TorrentStorage.initialize()
+        fill(stored)
+        # Start from a settled store, with the journal compaction of the fill finished
+        TorrentStorage.close()
+        TorrentStorage.initialize()
+
+        # Every mutation written on its own
+        Config.TORRENT_STORAGE_FLUSH_DELAY = 0
+        mutation = mutate(mutations) / (mutations * 2)
+
+        # A burst of grabs written as one batch, flushed right after it
+        Config.TORRENT_STORAGE_FLUSH_DELAY = 0.5
+        coalesced = mutate(BURST_SIZE)
+        Config.TORRENT_STORAGE_FLUSH_DELAY = 0
+        written_through = mutate(BURST_SIZE)
+
+        # Finding the torrents of deleted media, by scanning as before and by index
+        started = time.perf_counter()
+        for media_id in range(mutations):
+            [h for h, info in TorrentStorage.get_all_torrents().items() if info.get('media_id') == media_id]
+        scan = (time.perf_counter() - started) / mutations
+        started = time.perf_counter()
+        for media_id in range(mutations):
+            TorrentStorage.get_torrents_for_media(media_id)
+        lookup = (time.perf_counter() - started) / mutations
+
+        TorrentStorage.close()
+        started = time.perf_counter()
+        TorrentStorage.initialize()
+        load = time.perf_counter() - started
+        TorrentStorage.close()
+
+        print(f"  {backend:7s} {mutation * 1000:8.3f} ms/mutation, startup {load * 1000:8.1f} ms, "
+              f"media lookup {scan * 1000:.3f} ms by scan / {lookup * 1000:.3f} ms by index")
+        print(f"          burst of {BURST_SIZE} grabs+deletes {written_through * 1000:8.1f} ms written through / "
+              f"{coalesced * 1000:.1f} ms coalesced")
+    finally:
+        shutil.rmtree(config_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--stored', type=int, default=20000)
+    parser.add_argument('--mutations', type=int, default=100)
+    parser.add_argument('--durability', choices=('none', 'data', 'full'), default=Config.DURABILITY)
+    args = parser.parse_args()
+    Config.DURABILITY = args.durability
+
+    # The storage logs every mutation
+    logger.setLevel(logging.WARNING)
+
+    import_dir = os.environ['CONFIG_DIR']
+    try:
+        print(f"{args.stored} stored torrents, durability {args.durability}:")
+        for backend in ('pickle', 'journal', 'sqlite'):
+            run(backend, args.stored, args.mutations)
+    finally:
+        shutil.rmtree(import_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
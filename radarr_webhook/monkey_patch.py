@@ -5,7 +5,6 @@ Monkey-patch script to force logging to work by creating the logger before the a
 import os
 import sys
 import logging
-import subprocess
 from logging.handlers import RotatingFileHandler
 from datetime import datetime
 
@@ -55,14 +54,15 @@ print("===== MONKEY PATCH COMPLETE =====")
 # Log a test message
 root_logger.info("Logger monkey-patched successfully")
 
-# Now run the actual application as a subprocess
+# Now replace this process with the actual application, so it receives
+# the signals sent to the container (docker stop sends SIGTERM to PID 1)
 print("===== STARTING APPLICATION =====")
 sys.stdout.flush()
 sys.stderr.flush()
 
 # Run the application
 try:
-    result = subprocess.run(["python", "run.py"], check=True)
-except subprocess.CalledProcessError as e:
+    os.execvp("python", ["python", "run.py"])
+except OSError as e:
     print(f"Error running application: {e}")
     sys.exit(1) 
\ No newline at end of file
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Completion notifier for qBittorrent.
+Set "Run external program on torrent finished" in qBittorrent to:
+
+    python3 /path/to/notify_completed.py "%I" "%F"
+
+The script posts the torrent hash and content path to the webhook service,
+which links the remaining files and stops monitoring the download. It only
+uses the standard library so it runs wherever qBittorrent runs.
+
+Environment variables:
+    WEBHOOK_URL: Base URL of the webhook service (default http://localhost:5000)
+    AUTH_TOKEN: Bearer token, or WEBHOOK_USERNAME/WEBHOOK_PASSWORD for basic auth
+"""
+import os
+import sys
+import json
+import base64
+import argparse
+import urllib.error
+import urllib.request
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Notify the webhook service that a torrent completed")
+    parser.add_argument('hash', help="Torrent hash (%%I)")
+    parser.add_argument('content_path', nargs='?', default='', help="Content path (%%F)")
+    parser.add_argument('--url', default=os.getenv('WEBHOOK_URL', 'http://localhost:5000'),
+                        help="Base URL of the webhook service")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Request timeout in seconds")
+    args = parser.parse_args()
+
+    body = json.dumps({'hash': args.hash, 'content_path': args.content_path}).encode('utf-8')
+    headers = {'Content-Type': 'application/json'}
+
+    token = os.getenv('AUTH_TOKEN')
+    username = os.getenv('WEBHOOK_USERNAME')
+    if token:
+        headers['Authorization'] = f"Bearer {token}"
+    elif username:
+        credentials = f"{username}:{os.getenv('WEBHOOK_PASSWORD', '')}".encode('utf-8')
+        headers['Authorization'] = f"Basic {base64.b64encode(credentials).decode('ascii')}"
+
+    request = urllib.request.Request(
+        args.url.rstrip('/') + '/hooks/qbittorrent/completed',
+        data=body,
+        headers=headers,
+        method='POST'
+    )
+
+    try:
+        with urllib.request.urlopen(request, timeout=args.timeout) as response:
+            print(response.read().decode('utf-8'))
+        return 0
+    except urllib.error.HTTPError as e:
+        print(f"Webhook service returned {e.code}: {e.read().decode('utf-8', 'replace')}", file=sys.stderr)
+    except (urllib.error.URLError, OSError) as e:
+        print(f"Could not reach webhook service at {args.url}: {e}", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())